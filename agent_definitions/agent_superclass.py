@@ -4,12 +4,13 @@ from agent_definitions.agent_utilities import get_client_wrapper_for_llm_api_pro
 # Agent Superclass Definition
 class Agent:
     def __init__(self, llm='gpt-4o-mini', llm_api_provider='openai', embedding_model='text-embedding-3-small',
-                 embedding_api_provider='openai', system_prompt=None, skill_library_db=None):
+                 embedding_api_provider='openai', system_prompt=None, skill_library_db=None, async_llm_client=False):
         # Declare attributes for generating LLM responses
         # self.openai_api_wrapper = get_client_wrapper_for_llm_api_provider('openai')
         # self.anthropic_api_wrapper = get_client_wrapper_for_llm_api_provider('anthropic')
         self.llm_api_provider = llm_api_provider
-        self.llm_api_wrapper = get_client_wrapper_for_llm_api_provider(llm_api_provider)
+        # With `async_llm_client`, the wrapper's query methods are coroutines for agents running on an event loop
+        self.llm_api_wrapper = get_client_wrapper_for_llm_api_provider(llm_api_provider, asynchronous=async_llm_client)
         self.model = llm
 
         # Declare attributes for generating embeddings
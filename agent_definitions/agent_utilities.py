@@ -5,6 +5,7 @@ import sys
 import threading
 import time
 import warnings
+import weakref
 from typing import Optional
 
 from dotenv import load_dotenv
@@ -14,12 +15,14 @@ import pickle
 import types
 
 import openai
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 import anthropic
 from colorama import Fore, Style
 from pydantic import BaseModel
 
 from load_env import openai_api_key
+from utils.llm_response_cache import (CACHEABLE_FINISH_REASONS, LLM_RESPONSE_CACHE_ENABLED,
+                                      get_shared_llm_response_cache, is_deterministic_query, llm_cache_key)
 
 # Load environment variables from the .env file
 load_dotenv()
@@ -520,16 +523,43 @@ def make_comment_arg_required(skill_tool: dict, api_provider: str, structured_ou
         raise ValueError(f"api_provider argument {repr(api_provider)} not supported by make_comment_arg_required()")
 
 
-def get_client_wrapper_for_llm_api_provider(model_api_provider):
-    # Get the key for the correct tools list in bedrock_tools
+def create_client_wrapper_for_llm_api_provider(model_api_provider, api_key=None, asynchronous=False):
+    # Build a new client wrapper, with its own SDK client and connection pool
     if model_api_provider == 'openai':
-        return OpenAIClientWrapper(api_key=openai_api_key)
+        if asynchronous:
+            return AsyncOpenAIClientWrapper(api_key=api_key or openai_api_key)
+        return OpenAIClientWrapper(api_key=api_key or openai_api_key)
     # elif model_api_provider == 'anthropic':
-    #     return AnthropicClientWrapper(api_key=anthropic_api_key)
+    #     return AnthropicClientWrapper(api_key=api_key or anthropic_api_key)
     else:
         raise ValueError("ActionAgent's self.model_api_provider does not have a valid value")
 
 
+# (provider, api key, asynchronous) -> client wrapper shared by every agent in the process
+_shared_client_wrappers = {}
+_shared_client_wrappers_lock = threading.Lock()
+
+
+def get_client_wrapper_for_llm_api_provider(model_api_provider, api_key=None, asynchronous=False):
+    """
+    Return the process-wide client wrapper for an LLM API provider and API key, creating it on first use.
+
+    The SDK clients are thread-safe and pool their HTTP connections, so agents
+    borrow one shared wrapper instead of each building its own client; creating
+    an agent then costs little more than its message context. With `asynchronous`,
+    the wrapper's query methods are coroutines (see AsyncOpenAIClientWrapper).
+    """
+    registry_key = (model_api_provider, api_key or (openai_api_key if model_api_provider == 'openai' else None),
+                    asynchronous)
+    with _shared_client_wrappers_lock:
+        client_wrapper = _shared_client_wrappers.get(registry_key)
+        if client_wrapper is None:
+            client_wrapper = create_client_wrapper_for_llm_api_provider(model_api_provider, api_key=api_key,
+                                                                        asynchronous=asynchronous)
+            _shared_client_wrappers[registry_key] = client_wrapper
+        return client_wrapper
+
+
 def sanitize_function_response(function_response):
     # Create a string function response if one is not returned by the method
     if not function_response:
@@ -623,6 +653,8 @@ def async_to_sync_generator(agen):
     except StopAsyncIteration:
         pass
     finally:
+        # Let the async generator clean up (e.g. cancel its tasks) if the consumer stopped early.
+        loop.run_until_complete(agen.aclose())
         loop.close()
 
 
@@ -644,8 +676,11 @@ class LLMClientWrapper:
 
 class OpenAIClientWrapper:
     # Wrapper for OpenAI ChatCompletions API
-    def __init__(self, api_key):
+    def __init__(self, api_key, use_response_cache=True, response_cache=None):
+        # Temperature-0 query() responses are replayed from the LLM response cache unless use_response_cache is
+        # False (or LLM_RESPONSE_CACHE=0 is set); response_cache defaults to the process-wide one
         self.client = OpenAI(api_key=api_key)
+        self.response_cache = self.open_response_cache(use_response_cache, response_cache)
         self.message_type = openai_message_class
         self.delta_type = openai_delta_type
         self.spinner_running = False
@@ -663,7 +698,58 @@ class OpenAIClientWrapper:
             return text_embedding
 
     def query(self, model, context, response_format=None, temperature=1.0, tools=None, tool_choice=None,
-              parallel_tool_calls=True, prediction=None, reasoning_effort=None, verbose=False):
+              parallel_tool_calls=True, prediction=None, reasoning_effort=None, use_cache=True, verbose=False):
+        query_args = self.build_query_args(model, context, response_format=response_format, temperature=temperature,
+                                           tools=tools, tool_choice=tool_choice,
+                                           parallel_tool_calls=parallel_tool_calls, prediction=prediction,
+                                           reasoning_effort=reasoning_effort)
+
+        cache_key = self.get_response_cache_key(query_args) if use_cache else None
+        if cache_key is not None:
+            cached_message = self.get_cached_response(cache_key)
+            if cached_message is not None:
+                return cached_message
+
+        completion = self.client.chat.completions.create(**query_args)
+
+        response_message = completion.choices[0].message
+
+        if cache_key is not None:
+            self.cache_response(cache_key, completion.choices[0])
+
+        return response_message  # returns ChatCompletionMessage object
+
+    @staticmethod
+    def open_response_cache(use_response_cache=True, response_cache=None):
+        if not (use_response_cache and LLM_RESPONSE_CACHE_ENABLED):
+            return None
+        return response_cache if response_cache is not None else get_shared_llm_response_cache()
+
+    def get_response_cache_key(self, query_args):
+        # Content address of a deterministic (temperature-0) query, or None if its response is not cached
+        if self.response_cache is None or not is_deterministic_query(query_args):
+            return None
+        return llm_cache_key(query_args)
+
+    def get_cached_response(self, cache_key):
+        # A new message object per hit, so callers may change it without touching the cached copy
+        cached_message_json = self.response_cache.get(cache_key)
+        if cached_message_json is None:
+            return None
+        return self.message_type.model_validate_json(cached_message_json)
+
+    def cache_response(self, cache_key, choice):
+        if choice.finish_reason in CACHEABLE_FINISH_REASONS:
+            self.response_cache.set(cache_key, choice.message.model_dump_json(exclude_none=True))
+
+    def get_response_cache_stats(self) -> dict:
+        # LLM response cache hits, misses and hit rate ({} when the cache is off)
+        return self.response_cache.get_stats() if self.response_cache is not None else {}
+
+    @staticmethod
+    def build_query_args(model, context, response_format=None, temperature=1.0, tools=None, tool_choice=None,
+                         parallel_tool_calls=True, prediction=None, reasoning_effort=None) -> dict:
+        # Build the chat.completions.create() arguments for query()
         if response_format == "text":
             response_format = None
         if isinstance(response_format, str):
@@ -674,7 +760,9 @@ class OpenAIClientWrapper:
             "messages": context,
         }
 
-        if temperature:
+        # Sent whenever given, including 0: omitting it would run temperature-0 queries at the API default of 1,
+        # and the LLM response cache relies on those queries being deterministic
+        if temperature is not None:
             query_args["temperature"] = temperature
         if response_format:
             query_args["response_format"] = response_format
@@ -690,12 +778,7 @@ class OpenAIClientWrapper:
             query_args["prediction"] = {"type": "content", "content": prediction}
         if reasoning_effort:
             query_args["reasoning_effort"] = reasoning_effort
-
-        completion = self.client.chat.completions.create(**query_args)
-
-        response_message = completion.choices[0].message
-
-        return response_message  # returns ChatCompletionMessage object
+        return query_args
 
     def stream_query(self, model, context, response_format="text", temperature=1.0, tools=None, tool_choice=None,
                      parallel_tool_calls=True, verbose=False):
@@ -855,7 +938,23 @@ class OpenAIClientWrapper:
         """
         Query method for structured outputs
         """
+        query_args = self.build_schema_query_args(model, context, response_format, temperature=temperature,
+                                                  tools=tools, tool_choice=tool_choice,
+                                                  parallel_tool_calls=parallel_tool_calls)
+
+        completion = self.client.beta.chat.completions.parse(**query_args)
 
+        response_message = completion.choices[0].message
+
+        if verbose:
+            self.print_schema_response_summary(response_message)
+
+        return response_message
+
+    @staticmethod
+    def build_schema_query_args(model, context, response_format, temperature=1.0, tools=None, tool_choice=None,
+                                parallel_tool_calls=True) -> dict:
+        # Build the beta.chat.completions.parse() arguments for query_with_schema()
         query_args = {
             "model": model,
             "messages": context,
@@ -868,22 +967,18 @@ class OpenAIClientWrapper:
             query_args["parallel_tool_calls"] = parallel_tool_calls  # Specify whether to limit output to maximum one function call at a time
             if tool_choice:
                 query_args["tool_choice"] = tool_choice
-
-        completion = self.client.beta.chat.completions.parse(**query_args)
-
-        response_message = completion.choices[0].message
-
-        if verbose:
-            if response_message.refusal:
-                print("OpenAI model refused to respond to query.")
-                print(response_message.refusal)
-            elif hasattr(response_message, "tool_calls"):
-                if response_message.tool_calls is not None:
-                    print(f"OpenAI model called a tool: {response_message.tool_calls[0].function}")
-            elif response_message.parsed:
-                print("OpenAI model successfully returned a parsed object.")
-
-        return response_message
+        return query_args
+
+    @staticmethod
+    def print_schema_response_summary(response_message):
+        if response_message.refusal:
+            print("OpenAI model refused to respond to query.")
+            print(response_message.refusal)
+        elif hasattr(response_message, "tool_calls"):
+            if response_message.tool_calls is not None:
+                print(f"OpenAI model called a tool: {response_message.tool_calls[0].function}")
+        elif response_message.parsed:
+            print("OpenAI model successfully returned a parsed object.")
 
     def get_tool_name_from_definition(self, tool_def: dict):
         return tool_def["function"]["name"]
@@ -1146,6 +1241,110 @@ class OpenAIClientWrapper:
             return tool_response_message
 
 
+class AsyncOpenAIClientWrapper(OpenAIClientWrapper):
+    """
+    Wrapper for the OpenAI ChatCompletions API on asyncio, built on AsyncOpenAI.
+
+    embed, query and query_with_schema are coroutines and stream_query is an async
+    generator; the tool call and message helpers (get_tool_calls,
+    get_arguments_from_tool_call, create_tool_response_message, ...) are shared with
+    OpenAIClientWrapper. AsyncOpenAI's connection pool is bound to the event loop it
+    was first used on, so one client is kept per running loop. query replays
+    temperature-0 responses from the same LLM response cache as OpenAIClientWrapper.
+    """
+
+    def __init__(self, api_key, use_response_cache=True, response_cache=None):
+        self.api_key = api_key
+        self._clients = weakref.WeakKeyDictionary()
+        self._clients_lock = threading.Lock()
+        self.response_cache = self.open_response_cache(use_response_cache, response_cache)
+        self.message_type = openai_message_class
+        self.delta_type = openai_delta_type
+        self.spinner_running = False
+        self.last_tool_call_comments = ""
+        self.last_message_role = ""
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        loop = asyncio.get_running_loop()
+        with self._clients_lock:
+            client = self._clients.get(loop)
+            if client is None:
+                client = AsyncOpenAI(api_key=self.api_key)
+                self._clients[loop] = client
+            return client
+
+    async def embed(self, model, text_to_embed):
+        text_embedding = None
+        try:
+            embedding_response = await self.client.embeddings.create(input=text_to_embed, model=model)
+            text_embedding = embedding_response.data[0].embedding
+        except Exception as e:
+            print("Unable to generate OpenAI embedding")
+            print(f"Exception: {e}")
+        finally:
+            return text_embedding
+
+    async def query(self, model, context, response_format=None, temperature=1.0, tools=None, tool_choice=None,
+                    parallel_tool_calls=True, prediction=None, reasoning_effort=None, use_cache=True,
+                    verbose=False):
+        query_args = self.build_query_args(model, context, response_format=response_format, temperature=temperature,
+                                           tools=tools, tool_choice=tool_choice,
+                                           parallel_tool_calls=parallel_tool_calls, prediction=prediction,
+                                           reasoning_effort=reasoning_effort)
+        cache_key = self.get_response_cache_key(query_args) if use_cache else None
+        if cache_key is not None:
+            cached_message = await self.get_cached_response(cache_key)
+            if cached_message is not None:
+                return cached_message
+        completion = await self.client.chat.completions.create(**query_args)
+        if cache_key is not None:
+            await self.cache_response(cache_key, completion.choices[0])
+        return completion.choices[0].message  # returns ChatCompletionMessage object
+
+    async def get_cached_response(self, cache_key):
+        # The disk tier is read on a worker thread, so a slow SQLite read does not stall the event loop
+        cached_message_json = await self.response_cache.get_async(cache_key)
+        if cached_message_json is None:
+            return None
+        return self.message_type.model_validate_json(cached_message_json)
+
+    async def cache_response(self, cache_key, choice):
+        if choice.finish_reason in CACHEABLE_FINISH_REASONS:
+            await self.response_cache.set_async(cache_key, choice.message.model_dump_json(exclude_none=True))
+
+    async def query_with_schema(self, model, context, response_format, temperature=1.0, tools=None, tool_choice=None,
+                                parallel_tool_calls=True, verbose=False):
+        query_args = self.build_schema_query_args(model, context, response_format, temperature=temperature,
+                                                  tools=tools, tool_choice=tool_choice,
+                                                  parallel_tool_calls=parallel_tool_calls)
+        completion = await self.client.beta.chat.completions.parse(**query_args)
+        response_message = completion.choices[0].message
+        if verbose:
+            self.print_schema_response_summary(response_message)
+        return response_message
+
+    async def stream_query(self, model, context, response_format="text", temperature=1.0, tools=None,
+                           tool_choice=None, parallel_tool_calls=True, verbose=False):
+        if isinstance(response_format, str):
+            response_format = {"type": response_format}
+        query_args = {
+            "model": model,
+            "messages": context,
+            "response_format": response_format,
+            "temperature": temperature,
+            "stream": True,
+        }
+        if tools:
+            query_args["tools"] = tools
+            query_args["tool_choice"] = tool_choice
+            query_args["parallel_tool_calls"] = parallel_tool_calls
+
+        stream = await self.client.chat.completions.create(**query_args)
+        async for chunk in stream:
+            yield chunk
+
+
 class AnthropicClientWrapper:
     # Wrapper for Anthropic Messages API
     def __init__(self, api_key):
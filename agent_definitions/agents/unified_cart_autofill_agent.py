@@ -1,14 +1,24 @@
 import asyncio
 import copy
 import json
+import re
+import threading
 import yaml
 
 from agent_definitions.agent_superclass import Agent
 from agent_definitions.recipe_processing import select_file_and_extract_text
-from walmart_affiliate_api_utils import WalmartAPI, filter_walmart_search_result_props
+from utils.ingredient_normalization import canonical_ingredient_name, group_ingredients
+from utils.pack_sizes import packages_to_buy
+from utils.product_records import is_available_in_store, shared_product_record
+from utils.search_cache import normalize_query
+from utils.serialization import serialize_product_selection
+from walmart_affiliate_api_utils import AsyncWalmartAPI, filter_walmart_search_result_props
 
 from load_env import walmart_consumer_id, walmart_key_version, walmart_private_key_path
 
+# Symbols normalize_query keeps inside words; results_match_search_term splits on them instead.
+_WORD_JOINER_PATTERN = re.compile(r"[-'&%]")
+
 output_shopping_list_tool_def = {
     "type": "function",
     "function": {
@@ -88,40 +98,54 @@ select_best_item_tool_def = {
             "properties": {
                 "rationale": {
                     "type": "string",
-                    "description": "Brief 1-2 sentence rationale for selecting this product and its quantity."
+                    "description": "Brief 1-2 sentence rationale for selecting this product."
                 },
                 "itemId": {
                     "type": "integer",
                     "description": "'itemId' of the selected product."
-                },
-                "quantity": {
-                    "type": "integer",
-                    "description": "Quantity to order of the selected product."
                 }
             },
-            "required": ["rationale", "itemId", "quantity"],
+            "required": ["rationale", "itemId"],
             "additionalProperties": False
         }
     }
 }
 
 
+_shared_walmart_api = None
+_shared_walmart_api_lock = threading.Lock()
+
+
+def get_shared_walmart_api() -> AsyncWalmartAPI:
+    """Return the Walmart API client shared by every UnifiedCartAutofillAgent, creating it on first use."""
+    global _shared_walmart_api
+    with _shared_walmart_api_lock:
+        if _shared_walmart_api is None:
+            _shared_walmart_api = AsyncWalmartAPI(
+                consumer_id=walmart_consumer_id,
+                key_version=walmart_key_version,
+                key_file_path=rf'{walmart_private_key_path}'
+            )
+        return _shared_walmart_api
+
+
 class UnifiedCartAutofillAgent(Agent):
-    def __init__(self, llm='gpt-4o-mini', llm_api_provider='openai', max_retries=1):
+    def __init__(self, llm='gpt-4o-mini', llm_api_provider='openai', max_retries=1, use_category_search=True,
+                 search_page_size=8):
         system_prompt = "You are an agent in charge of finding items from an online shopping website to put in the user's cart based on a recipe."
-        super().__init__(llm=llm, llm_api_provider=llm_api_provider, system_prompt=system_prompt)
+        super().__init__(llm=llm, llm_api_provider=llm_api_provider, system_prompt=system_prompt, async_llm_client=True)
         # self.walmart_api_wrapper = WalmartAPI(
         #     consumer_id="fe944cf5-2cd6-4664-8d8a-1a6e0882d722",
         #     key_version="1",
         #     key_file_path=r"C:\Users\Stephen Pierson\.ssh\rsa_key_20250410_v2"
         # )
-        self.walmart_api_wrapper = WalmartAPI(
-            consumer_id=walmart_consumer_id,
-            key_version=walmart_key_version,
-            key_file_path=rf'{walmart_private_key_path}'
-        )
+        self.walmart_api_wrapper = get_shared_walmart_api()
         # Set the maximum retries for a single shopping list item.
         self.max_retries = max_retries
+        # Scope searches to the ingredient's grocery category from the local taxonomy index.
+        self.use_category_search = use_category_search
+        # Number of search results requested per page; every one of them is shown to the LLM.
+        self.search_page_size = search_page_size
         self.ingredient_extraction_context = None
         self.reset()
 
@@ -129,8 +153,8 @@ class UnifiedCartAutofillAgent(Agent):
         self.ingredient_extraction_context = []
         self.reset_context()
 
-    async def get_cart_from_recipe(self, recipe: str, batch_size: str = "1", verbose=False):
-        shopping_list = self.extract_shopping_list_from_recipe(recipe, batch_size)
+    async def get_cart_from_recipe(self, recipe: str, batch_size: str = "1", zip_code=None, verbose=False):
+        shopping_list = await self.extract_shopping_list_from_recipe(recipe, batch_size)
         # Example shopping list:
         #  [{"ingredient": "flour", "prep_work_reasoning": "None required", "product": "all-purpose flour", "quantity": "1 cup"}, ...]
         print(f"Shopping List ({len(shopping_list)} items):\n"
@@ -139,10 +163,12 @@ class UnifiedCartAutofillAgent(Agent):
             shopping_list,
             initial_agent_context=self.ingredient_extraction_context,
             verbose=verbose,
-            bypass_retry=True
+            bypass_retry=True,
+            zip_code=zip_code
         )
 
-    async def get_cart_from_shopping_list(self, shopping_list: list, initial_agent_context=None, bypass_retry=True, verbose=False):
+    async def get_cart_from_shopping_list(self, shopping_list: list, initial_agent_context=None, bypass_retry=True, verbose=False,
+                                          zip_code=None):
         """
         Generate an online cart URL from a shopping list.
 
@@ -168,33 +194,32 @@ class UnifiedCartAutofillAgent(Agent):
                 Defaults to False.
             bypass_retry (bool, optional): If True, do not retry on failures and instead
                 warn the user and skip the item. Defaults to True.
+            zip_code (str, optional): If given, search for products in stock at the
+                store nearest this zip code. Defaults to None.
 
         Returns:
             str: A cart URL containing the selected products.
         """
-        if not initial_agent_context:
-            initial_agent_context = []
-        branching_context_threads = [copy.deepcopy(initial_agent_context) for _ in shopping_list]
-        tasks = [
-            self.process_shopping_list_item(item_data,
-                                            context_thread=branching_context_threads[i],
-                                            verbose=verbose,
-                                            retry_count=0,
-                                            bypass_retry=bypass_retry)
-            for i, item_data in enumerate(shopping_list)
-        ]
-        # Gather results from processing each shopping list item.
-        items = await asyncio.gather(*tasks)
+        # Gather results from processing each shopping list item, in shopping list order.
+        items = [None] * len(shopping_list)
+        async for i, item in self.iter_cart_from_shopping_list(shopping_list,
+                                                               initial_agent_context=initial_agent_context,
+                                                               bypass_retry=bypass_retry, verbose=verbose,
+                                                               zip_code=zip_code):
+            items[i] = item
 
         print("Proposed Cart:")
         for item in items:
-            print(json.dumps(item, sort_keys=False))
+            print(json.dumps(serialize_product_selection(item), sort_keys=False))
         print()
 
         # Identify and print out items that have quantity == 0, and filter them out from the proposed cart
         skipped_item_names = []
         cart = []
         for idx, result in enumerate(items):
+            if 'duplicate_of' in result:
+                # Bought once, with the merged quantity, on the first line naming the product.
+                continue
             if result.get("quantity", 0) == 0:
                 # Use the ingredient name from the original shopping list for reporting.
                 skipped_item_names.append(shopping_list[idx].get("product", "Unknown"))
@@ -209,7 +234,58 @@ class UnifiedCartAutofillAgent(Agent):
 
         return cart
 
-    def extract_shopping_list_from_recipe(self, recipe: str, batch_size: str = "1"):
+    async def iter_cart_from_shopping_list(self, shopping_list: list, initial_agent_context=None, bypass_retry=True,
+                                           verbose=False, zip_code=None):
+        """
+        Select a product for every shopping list item concurrently, yielding each selection as soon as it resolves.
+
+        Takes the same parameters as get_cart_from_shopping_list.
+
+        Items naming the same product (see utils.ingredient_normalization.group_ingredients)
+        are merged first, so each product is searched (under the first item's product term)
+        and selected once for the summed quantity.
+
+        Yields:
+            tuple: (index of the item in `shopping_list`, selection dict as returned by
+                process_shopping_list_item), in completion order. Skipped items have quantity 0.
+                Every later item of a merged product gets a copy of the first item's selection
+                with 'duplicate_of' set to the first item's index.
+        """
+        if not initial_agent_context:
+            initial_agent_context = []
+        store = await self.walmart_api_wrapper.get_nearest_store(zip_code) if zip_code else None
+        # Passed down with every call rather than kept on the agent, which concurrent items and requests share.
+        store_id = store['storeId'] if store else None
+        if verbose and store:
+            print(f"Searching stock at store {store['storeId']} ({store['name']})")
+
+        async def process_group(group, context_thread):
+            # group.name only keys the merge; the first line's own product term is what gets searched.
+            item_data = dict(shopping_list[group.line_indices[0]], quantity=group.quantity)
+            return group, await self.process_shopping_list_item(item_data,
+                                                                context_thread=context_thread,
+                                                                verbose=verbose,
+                                                                retry_count=0,
+                                                                bypass_retry=bypass_retry,
+                                                                store_id=store_id)
+
+        tasks = [
+            asyncio.create_task(process_group(group, copy.deepcopy(initial_agent_context)))
+            for group in group_ingredients(shopping_list, name_key="product")
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                group, selection = await next_done
+                first_index, *duplicate_indices = group.line_indices
+                yield first_index, selection
+                for i in duplicate_indices:
+                    yield i, dict(selection, duplicate_of=first_index)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def extract_shopping_list_from_recipe(self, recipe: str, batch_size: str = "1"):
         # Example Output:
         #  [{"ingredient": "flour", "prep_work_reasoning": "None required", "product": "all-purpose flour", "quantity": "1 cup"}, ...]
         recipe_message_content = (
@@ -217,7 +293,7 @@ class UnifiedCartAutofillAgent(Agent):
             f"likely to yield relevant results. The user wants to make {batch_size} batches:" 
             f"\n\n<recipe>\n{recipe}\n</recipe>")
         context = [self.system_message, {'role': 'user', 'content': recipe_message_content}]
-        response_message = self.llm_api_wrapper.query(
+        response_message = await self.llm_api_wrapper.query(
             model=self.model,
             context=context,
             temperature=0.0,
@@ -246,14 +322,54 @@ class UnifiedCartAutofillAgent(Agent):
         else:
             raise Exception(f"Unexpected tool call name: {tool_call_name}")
 
-    async def process_shopping_list_item(self, item_search_data, context_thread, verbose=False, retry_count=0, bypass_retry=True):
-        """Process a single ingredient asynchronously."""
+    async def process_shopping_list_item(self, item_search_data, context_thread, verbose=False, retry_count=0, bypass_retry=True,
+                                         store_id=None, next_search_start=None):
+        """
+        Process a single ingredient asynchronously.
+
+        `store_id` is the store whose stock searches report. `next_search_start` maps this item's
+        normalized search terms to the index of their next unseen result, so a retry with the same
+        term pages forward; it is created on the first call and passed along to retries.
+        """
+        if next_search_start is None:
+            next_search_start = {}
         product_search_term = item_search_data.get("product")
         quantity = item_search_data.get("quantity")
-        search_results_str = await asyncio.to_thread(self.walmart_api_wrapper.get_walmart_search_results,
-                                                     product_search_term)
-        search_results = json.loads(search_results_str)
+        search_key = normalize_query(product_search_term)
+        start = next_search_start.get(search_key, 1)
+        search_options = {'num_items': self.search_page_size}
+        if start > 1:
+            search_options['start'] = start
+        if store_id:
+            search_options['store_id'] = store_id
+
+        search_results = {}
+        category = await self.lookup_search_category(product_search_term, verbose=verbose)
+        if category:
+            if verbose:
+                print(f"Searching '{product_search_term}' in category {category['path']}")
+            search_options['category_id'] = category['id']
+            search_results_str = await self.walmart_api_wrapper.get_walmart_search_results(
+                product_search_term, **search_options)
+            search_results = json.loads(search_results_str or "{}")
+        if not self.results_match_search_term(search_results.get('items'), product_search_term):
+            # The category was wrong or too narrow: fall back to an unscoped search before asking the LLM for a
+            # new search term, keeping the scoped results if it finds nothing.
+            if verbose and category:
+                print(f"No result in category {category['path']} matches '{product_search_term}', searching all categories")
+            search_options.pop('category_id', None)
+            search_results_str = await self.walmart_api_wrapper.get_walmart_search_results(product_search_term,
+                                                                                           **search_options)
+            unscoped_results = json.loads(search_results_str or "{}")
+            if unscoped_results.get('items') or not search_results.get('items'):
+                search_results = unscoped_results
         products = search_results.get('items', [])
+        if store_id:
+            # Stock was reported for the user's store, so only offer products available there.
+            products = [product for product in products
+                        if is_available_in_store(product.get('stock'), product.get('offerType'))]
+
+        next_search_start[search_key] = start + self.search_page_size
         if not products:
             if bypass_retry:
                 if verbose:
@@ -267,11 +383,11 @@ class UnifiedCartAutofillAgent(Agent):
                         'itemId': 0, 'quantity': 0}
             if verbose:
                 print(f"No products found for search term '{product_search_term}'. Retrying product search. Retry count: {retry_count + 1}")
-            return await self.retry_product_selection(context_thread, retry_count=retry_count + 1)
+            return await self.retry_product_selection(context_thread, retry_count=retry_count + 1, store_id=store_id,
+                                                      next_search_start=next_search_start)
 
         # Pass the bypass flag along to select_product.
-        selected_product = await asyncio.to_thread(
-            self.select_product,
+        selected_product = await self.select_product(
             products,
             product_search_term,
             quantity,
@@ -279,10 +395,39 @@ class UnifiedCartAutofillAgent(Agent):
             bypass_retry,
             retry_count,
             verbose,
+            store_id=store_id,
+            next_search_start=next_search_start,
         )
         return selected_product
 
-    def select_product(self, available_products, item_name, item_quantity, context, bypass_retry=True, retry_count=0, verbose=False):
+    @staticmethod
+    def results_match_search_term(products, product_search_term):
+        """
+        Whether some product's name contains every word of the search term ("bell pepper" is not matched by black pepper).
+
+        Hyphens, apostrophes and other in-word symbols separate words on both sides,
+        so "all-purpose flour" matches "All Purpose Flour".
+        """
+        term_words = set(canonical_ingredient_name(_WORD_JOINER_PATTERN.sub(" ", product_search_term)).split())
+        return any(term_words <= set(normalize_query(_WORD_JOINER_PATTERN.sub(" ", product.get('name') or "")).split())
+                   for product in products or ())
+
+    async def lookup_search_category(self, product_search_term, verbose=False):
+        """Return the taxonomy category to scope a product search to, or None to search all of Walmart."""
+        if not self.use_category_search:
+            return None
+        try:
+            taxonomy_index = await self.walmart_api_wrapper.get_taxonomy_index()
+        except Exception as e:
+            # Category scoping only narrows results; never let it fail the item.
+            if verbose:
+                print(f"Taxonomy index unavailable, searching without a category: {e}")
+            self.use_category_search = False
+            return None
+        return taxonomy_index.lookup_category(product_search_term) if taxonomy_index else None
+
+    async def select_product(self, available_products, item_name, item_quantity, context, bypass_retry=True, retry_count=0, verbose=False,
+                             store_id=None, next_search_start=None):
         itemIds = [product.get('itemId') for product in available_products if 'itemId' in product]
         products_filtered_props = filter_walmart_search_result_props(available_products)
         products_str = yaml.dump(products_filtered_props, sort_keys=False)
@@ -294,7 +439,7 @@ class UnifiedCartAutofillAgent(Agent):
                   f"{products_str}\n")
         user_message = {"role": "user", "content": prompt}
         context.append(user_message)
-        response_message = self.llm_api_wrapper.query(
+        response_message = await self.llm_api_wrapper.query(
             model=self.model,
             context=context,
             temperature=0.0,
@@ -312,7 +457,6 @@ class UnifiedCartAutofillAgent(Agent):
         tool_call_args = self.llm_api_wrapper.get_arguments_from_tool_call(tool_call)
         if tool_call_name == self.llm_api_wrapper.get_tool_name_from_definition(select_best_item_tool_def):
             chosen_itemId = tool_call_args.get('itemId')
-            chosen_quantity = tool_call_args.get('quantity')
             rationale = tool_call_args.get('rationale')
             # Check for invalid selections.
             retry_flag = False
@@ -321,10 +465,6 @@ class UnifiedCartAutofillAgent(Agent):
                 tool_call_response_content = f"Product selection failed: itemId \"{chosen_itemId}\" not a valid selection."
                 retry_reason = "invalid_itemId"
                 retry_flag = True
-            elif chosen_quantity < 1:
-                tool_call_response_content = f"Product selection failed: quantity \"{chosen_quantity}\" is invalid (cannot be < 1)."
-                retry_reason = "invalid_quantity"
-                retry_flag = True
             else:
                 tool_call_response_content = "Product selection successful."
 
@@ -345,20 +485,26 @@ class UnifiedCartAutofillAgent(Agent):
                     return {'itemId': 0, 'quantity': 0, 'seller': 'walmart', 'rationale': f'Failed to select product for {item_name} after {retry_count} attempts.'}
                 if verbose:
                     print(f"Retrying product selection for \"{item_name}\". Reason: {retry_reason}. Retry count: {retry_count+1}")
-                selected_product = asyncio.run(self.retry_product_selection(context, retry_count=retry_count+1))
+                selected_product = await self.retry_product_selection(context, retry_count=retry_count+1, store_id=store_id,
+                                                                      next_search_start=next_search_start)
                 return selected_product
             else:
                 # Return the product choice and its info.
                 chosen_index = next((i for i, product in enumerate(available_products) if product.get('itemId') == chosen_itemId), None)
                 try:
-                    item_details = available_products[chosen_index]
+                    # Keep shared compact records rather than the raw search result items.
+                    item_details = shared_product_record(available_products[chosen_index])
                     substitutes = []
                     for i, item in enumerate(available_products):
                         if i != chosen_index:
-                            substitutes.append({'item_details': item})
-                except IndexError:
+                            substitutes.append({'item_details': shared_product_record(item)})
+                except (IndexError, TypeError):
                     item_details = None
                     substitutes = None
+                # The package count is computed from the recipe quantity and the product's size, not asked of the LLM.
+                chosen_product = available_products[chosen_index] if chosen_index is not None else {}
+                chosen_quantity = packages_to_buy(item_quantity, item_name, chosen_product.get('size'),
+                                                  chosen_product.get('name'))
 
                 return {
                     'itemId': chosen_itemId,
@@ -371,9 +517,9 @@ class UnifiedCartAutofillAgent(Agent):
         else:
             raise Exception(f"Unexpected tool call name: {tool_call_name}")
 
-    async def retry_product_selection(self, context, retry_count):
-        """Retry product selection with the current context (async version)"""
-        response_message = self.llm_api_wrapper.query(
+    async def retry_product_selection(self, context, retry_count, store_id=None, next_search_start=None):
+        """Retry product selection with the current context (async version), searching like the failed attempt"""
+        response_message = await self.llm_api_wrapper.query(
             model=self.model,
             context=context,
             temperature=0.0,
@@ -397,7 +543,8 @@ class UnifiedCartAutofillAgent(Agent):
             )
             context.append(tool_message)
             return await self.process_shopping_list_item(item_search_data=tool_call_args, context_thread=context,
-                                                         verbose=False, retry_count=retry_count)
+                                                         verbose=False, retry_count=retry_count, store_id=store_id,
+                                                         next_search_start=next_search_start)
         else:
             raise Exception(f"Unexpected tool call name: {tool_call_name}")
 
@@ -1,7 +1,7 @@
 import os
 import logging
 from agent_definitions.agents.RecipeChatAgent import RecipeChatAgent
-from walmart_affiliate_api_utils import WalmartAPI
+from walmart_affiliate_api_utils import AsyncWalmartAPI, WalmartAPI
 
 # Active conversations dictionary - shared across routes
 active_conversations = {}
@@ -17,6 +17,16 @@ def get_walmart_api():
         key_file_path=rf'{rsa_key}'
     )
 
+def get_async_walmart_api():
+    """Initialize and return the asyncio-native Walmart API client"""
+    consumer_id = os.environ["CONSUMER_ID"]
+    rsa_key = os.environ["RSA_KEY_PATH"]
+    return AsyncWalmartAPI(
+        consumer_id=consumer_id,
+        key_version="1",
+        key_file_path=rf'{rsa_key}'
+    )
+
 # Create a new chat agent
 def create_chat_agent():
     """Create a new RecipeChatAgent instance"""
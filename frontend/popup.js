@@ -20,6 +20,7 @@ document.addEventListener('DOMContentLoaded', () => {
     conversationHistory: [],
     conversationId: null,
     cartItems: [],
+    cartVersion: null, // Server cart version once the server holds this cart
     messageCount: 0, // Track number of messages
     ingredientsList: null, // Store ingredients when found in messages
     cartGenerationRequested: false, // Flag to track if cart generation was already requested
@@ -152,6 +153,7 @@ document.addEventListener('DOMContentLoaded', () => {
           // Show cart items if available
           if (data.cart_items && data.cart_items.length > 0) {
             state.cartItems = data.cart_items;
+            state.cartVersion = null;
             addProductMessage(data.cart_items);
           } else {
             addBotMessage("I couldn't find matching products for these ingredients at Walmart.");
@@ -190,9 +192,20 @@ document.addEventListener('DOMContentLoaded', () => {
   }
   
   function resetConversation() {
+    if (state.conversationId) {
+      // Let the server release the conversation and its cart; nothing here waits on it.
+      const conversationId = state.conversationId;
+      getBackendUrl(backendUrl => {
+        if (backendUrl) {
+          fetch(`${backendUrl}/api/chat/${encodeURIComponent(conversationId)}`, { method: 'DELETE' })
+            .catch(error => console.error('Error ending conversation:', error));
+        }
+      });
+    }
     state.conversationHistory = [];
     state.conversationId = null;
     state.cartItems = [];
+    state.cartVersion = null;
     state.messageCount = 0;
     state.ingredientsList = null;
     state.cartGenerationRequested = false;
@@ -329,28 +342,35 @@ document.addEventListener('DOMContentLoaded', () => {
       
       console.log("Sending ingredients to backend:", formattedIngredients);
       
-      // Send to backend for processing
-      fetch(`${backendUrl}/api/chat`, {
+      // Stream the cart so each ingredient shows up as soon as its search resolves
+      fetch(`${backendUrl}/api/stream-cart`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json'
         },
         body: JSON.stringify({
-          isText: true,
-          recipe_text: "Please find these ingredients for me",
-          conversation_id: state.conversationId,
-          conversation_history: state.conversationHistory,
-          // Send the extracted ingredients directly to help the backend
-          extracted_ingredients: formattedIngredients,
-          // Make sure we don't accidentally create duplicate carts
-          skip_cart_generation: false // We explicitly want to generate a cart here
+          ingredients: formattedIngredients,
+          // The server stores the finished cart on the conversation, if there is one
+          ...(state.conversationId ? { conversation_id: state.conversationId } : {})
         })
       })
       .then(response => {
         if (!response.ok) throw new Error('Network response was not ok');
-        return response.json();
+        
+        const cartItems = new Array(formattedIngredients.length);
+        const progress = addCartProgressMessage(formattedIngredients.length);
+        return readServerSentEvents(response, (event, data) => {
+          if (event === 'cart_item') {
+            cartItems[data.index] = data.cart_item;
+            progress.update(data.cart_item);
+          }
+        }).then(() => {
+          progress.remove();
+          // Items are indexed by ingredient, so keep the ingredient order
+          return cartItems.filter(item => item);
+        });
       })
-      .then(data => {
+      .then(cartItems => {
         hideLoading();
         
         // Re-enable buttons
@@ -358,28 +378,15 @@ document.addEventListener('DOMContentLoaded', () => {
           btn.disabled = false;
         });
         
-        if (data.success) {
-          if (data.conversation_id) {
-            state.conversationId = data.conversation_id;
-          }
-          
-          if (data.conversation_history) {
-            state.conversationHistory = data.conversation_history;
-          }
-          
-          if (data.cart_items && data.cart_items.length > 0) {
-            console.log(`Successfully received ${data.cart_items.length} cart items from backend`);
-            state.cartItems = data.cart_items;
-            addProductMessage(data.cart_items);
-          } else {
-            console.warn("Backend didn't return any cart items");
-            state.cartGenerationRequested = false; // Reset the flag so we can try again
-            addBotMessage("I couldn't find all the ingredients for your recipe. Could you try describing it again?");
-          }
+        if (cartItems.length > 0) {
+          console.log(`Successfully received ${cartItems.length} cart items from backend`);
+          state.cartItems = cartItems;
+          state.cartVersion = null;
+          addProductMessage(cartItems);
         } else {
-          console.error("Backend returned error:", data.message);
-          // If the call failed, don't reset cartGenerationRequested
-          addBotMessage(data.message || "I had trouble processing your ingredients. Could you describe your recipe again?");
+          console.warn("Backend didn't return any cart items");
+          state.cartGenerationRequested = false; // Reset the flag so we can try again
+          addBotMessage("I couldn't find all the ingredients for your recipe. Could you try describing it again?");
         }
       })
       .catch(error => {
@@ -397,6 +404,62 @@ document.addEventListener('DOMContentLoaded', () => {
     });
   }
   
+  // Read a text/event-stream response, calling onEvent(event, data) for each event as it arrives
+  function readServerSentEvents(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    function dispatch(rawEvent) {
+      let event = 'message';
+      const dataLines = [];
+      rawEvent.split('\n').forEach(line => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+      });
+      if (dataLines.length > 0) onEvent(event, JSON.parse(dataLines.join('\n')));
+    }
+    
+    function read() {
+      return reader.read().then(({ done, value }) => {
+        buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+        const rawEvents = buffer.split('\n\n');
+        buffer = done ? '' : rawEvents.pop();
+        rawEvents.filter(rawEvent => rawEvent.trim()).forEach(dispatch);
+        return done ? undefined : read();
+      });
+    }
+    
+    return read();
+  }
+  
+  // A bot message listing products as the cart streams in; replaced by the product grid once it is complete
+  function addCartProgressMessage(total) {
+    let found = 0;
+    const messageElement = document.createElement('div');
+    messageElement.className = 'message bot';
+    messageElement.innerHTML = `<div class="message-content"><div class="cart-progress-count"></div><ul class="cart-progress-items"></ul></div>`;
+    const countElement = messageElement.querySelector('.cart-progress-count');
+    const itemsElement = messageElement.querySelector('.cart-progress-items');
+    countElement.textContent = `Searching Walmart for ${total} ingredients...`;
+    elements.chatMessages.appendChild(messageElement);
+    scrollToBottom();
+    
+    return {
+      update(cartItem) {
+        found++;
+        countElement.textContent = `Found ${found} of ${total} ingredients...`;
+        const itemElement = document.createElement('li');
+        itemElement.textContent = cartItem.main && cartItem.main.name ? cartItem.main.name : 'Unknown product';
+        itemsElement.appendChild(itemElement);
+        scrollToBottom();
+      },
+      remove() {
+        messageElement.remove();
+      }
+    };
+  }
+  
   function ensureValidImageUrl(url) {
     if (!url) return '/images/placeholder.png';
     
@@ -431,6 +494,10 @@ document.addEventListener('DOMContentLoaded', () => {
     
     // Update state with filtered products only
     state.cartItems = validProducts.length > 0 ? validProducts : products;
+    // If products were filtered out, the server's cart no longer matches, so the next substitution sends it along.
+    if (state.cartItems.length !== products.length) {
+      state.cartVersion = null;
+    }
     
     const messageElement = document.createElement('div');
     messageElement.className = 'product-grid';
@@ -619,6 +686,7 @@ document.addEventListener('DOMContentLoaded', () => {
           // Show cart items only if we don't already have cart items
           if (data.cart_items && data.cart_items.length > 0 && !state.cartItems.length) {
             state.cartItems = data.cart_items;
+            state.cartVersion = null;
             addProductMessage(data.cart_items);
             state.cartGenerationRequested = true; // Mark that we have completed cart generation
           }
@@ -652,10 +720,10 @@ document.addEventListener('DOMContentLoaded', () => {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
-          ingredient_index: productIndex,
-          substitute_index: alternativeIndex,
+          substitutions: [{ ingredient_index: productIndex, substitute_index: alternativeIndex }],
           conversation_id: state.conversationId,
-          cart_items: state.cartItems // Include cart items in request for better reliability
+          // Send the cart only until the server holds this version of it
+          ...(state.cartVersion === null ? { cart_items: state.cartItems } : { version: state.cartVersion })
         })
       })
       .then(response => {
@@ -666,7 +734,10 @@ document.addEventListener('DOMContentLoaded', () => {
         hideLoading();
         
         if (data.success) {
-          state.cartItems = data.cart_items;
+          data.changes.forEach(change => {
+            state.cartItems[change.index] = change.cart_item;
+          });
+          state.cartVersion = data.version;
           updateProductDisplay();
           addBotMessage("I've updated your selection. Is there anything else you'd like to change?");
         } else {
@@ -3,10 +3,12 @@ import traceback
 from flask import Blueprint, request
 
 from config import active_conversations
-from utils.response import success_response, error_response
-from utils.conversation import get_cart_items
+from utils.response import success_response, error_response, format_sse_event, sse_response
+from utils.conversation import get_cart_items, store_cart_items
+from utils.event_loop import iterate_async
 from services.cart_service import create_cart_url, format_cart_items_for_walmart
-from agent_definitions.agents.unified_cart_autofill_agent import UnifiedCartAutofillAgent
+from services.walmart_service import iter_process_ingredients
+from walmart_affiliate_api_utils import WalmartAPIBase
 
 
 logger = logging.getLogger(__name__)
@@ -43,12 +45,11 @@ def generate_cart():
             return error_response('No valid items to add to cart')
         
         try:
-            # First try using UnifiedCartAutofillAgent if available
-            agent = UnifiedCartAutofillAgent()
-            cart_url = agent.walmart_api_wrapper.generate_walmart_cart_url(formatted_items)
-            logger.info("Generated cart URL using UnifiedCartAutofillAgent")
+            # The affiliate cart URL builder is static, so no agent or API client is needed.
+            cart_url = WalmartAPIBase.generate_walmart_cart_url(formatted_items)
+            logger.info("Generated affiliate cart URL")
         except Exception as e:
-            logger.warning(f"Error using UnifiedCartAutofillAgent: {e}")
+            logger.warning(f"Error generating affiliate cart URL: {e}")
             
             cart_url = create_cart_url(cart_items)
             if not cart_url:
@@ -61,4 +62,44 @@ def generate_cart():
     except Exception as e:
         logger.error(f"Error generating cart: {e}")
         logger.error(traceback.format_exc())
-        return error_response(f"Error generating cart: {str(e)}", 500)
\ No newline at end of file
+        return error_response(f"Error generating cart: {str(e)}", 500)
+
+@cart_bp.route('/stream-cart', methods=['POST'])
+def stream_cart():
+    """
+    Stream cart items as server-sent events while their ingredients are searched
+
+    Takes 'ingredients' ([{'ingredient', 'quantity'}, ...]) or a 'conversation_id'
+    whose extracted ingredients are used, and an optional 'zip_code'. Events:
+        start:     {'conversation_id', 'ingredient_count'}
+        cart_item: {'index', 'cart_item'} for each ingredient, in the order they resolve
+        done:      {'conversation_id', 'cart_item_count'}
+    The finished cart is stored on the conversation, like /api/chat does.
+    """
+    data = request.json
+    if not data:
+        return error_response('No JSON data received')
+    
+    conversation_id = data.get('conversation_id')
+    chat_agent = active_conversations.get(conversation_id) if conversation_id else None
+    if conversation_id and not chat_agent:
+        return error_response('Conversation not found', 404)
+    
+    ingredients = data.get('ingredients') or getattr(chat_agent, 'extracted_ingredients', None)
+    if not ingredients:
+        return error_response('Missing ingredients parameter')
+    zip_code = data.get('zip_code')
+    
+    logger.info(f"Streaming cart for {len(ingredients)} ingredients")
+    
+    def generate():
+        yield format_sse_event('start', {'conversation_id': conversation_id, 'ingredient_count': len(ingredients)})
+        cart_items = [None] * len(ingredients)
+        for index, cart_item in iterate_async(iter_process_ingredients(ingredients, zip_code=zip_code)):
+            cart_items[index] = cart_item
+            yield format_sse_event('cart_item', {'index': index, 'cart_item': cart_item.to_dict()})
+        if chat_agent:
+            store_cart_items(chat_agent, cart_items, conversation_id)
+        yield format_sse_event('done', {'conversation_id': conversation_id, 'cart_item_count': len(cart_items)})
+    
+    return sse_response(generate())
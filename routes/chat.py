@@ -2,18 +2,19 @@ import os
 import logging
 import tempfile
 import time
-import asyncio
 from flask import Blueprint, request
 
 from utils.response import success_response, error_response
 from utils.conversation import (
+    end_conversation,
     get_or_create_conversation, 
     load_conversation_history, 
     process_agent_message,
     store_cart_items,
     parse_request_data
 )
-from utils.serialization import serialize_context
+from utils.event_loop import run_async
+from utils.serialization import serialize_cart_items, serialize_context
 from services.walmart_service import process_ingredients
 
 logger = logging.getLogger(__name__)
@@ -84,10 +85,10 @@ def chat():
     if should_process_ingredients:
         try:
             logger.info("Generating products for ingredients")
-            cart_items = asyncio.run(process_ingredients(response.get('ingredients')))
+            cart_items = run_async(process_ingredients(response.get('ingredients'), zip_code=data['zip_code']))
             
             # Store cart items on the agent
-            store_cart_items(chat_agent, cart_items)
+            store_cart_items(chat_agent, cart_items, conversation_id)
             
             response_data = {
                 'conversation_complete': True,
@@ -100,7 +101,8 @@ def chat():
             if hasattr(chat_agent, 'last_response_data'):
                 chat_agent.last_response_data = response_data
             
-            return success_response(response['message'], response_data)
+            return success_response(response['message'],
+                                    dict(response_data, cart_items=serialize_cart_items(cart_items)))
         except Exception as e:
             logger.error(f"Error processing ingredients: {e}")
             return error_response(f"Error finding products: {str(e)}", 500)
@@ -130,8 +132,19 @@ def chat():
     if hasattr(chat_agent, 'last_response_data'):
         chat_agent.last_response_data = response_data
     
+    if existing_cart_items:
+        # The agent keeps the CartItems themselves; only the response gets their JSON shape.
+        response_data = dict(response_data, cart_items=serialize_cart_items(existing_cart_items))
+    
     return success_response(response['message'], response_data)
 
+@chat_bp.route('/chat/<conversation_id>', methods=['DELETE'])
+def end_chat(conversation_id):
+    """End a conversation, releasing its agent and server-side cart"""
+    if not end_conversation(conversation_id):
+        return error_response('Conversation not found', 404)
+    return success_response('Conversation ended')
+
 def handle_pdf_upload(request, chat_agent, conversation_id):
     """Handle PDF file upload"""
     pdf_file = request.files['recipe_pdf']
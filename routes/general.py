@@ -1,7 +1,12 @@
 import logging
 from flask import Blueprint
 from config import active_conversations
+from utils.circuit_breaker import get_shared_circuit_breaker
+from utils.llm_response_cache import LLM_RESPONSE_CACHE_ENABLED, get_shared_llm_response_cache
+from utils.rate_limiter import get_shared_rate_limiter
 from utils.response import success_response
+from utils.search_cache import search_cache
+from utils.single_flight import async_search_single_flight, search_single_flight
 
 logger = logging.getLogger(__name__)
 general_bp = Blueprint('general', __name__, url_prefix='/api')
@@ -14,15 +19,30 @@ def health_check():
         'active_conversations': len(active_conversations)
     })
 
+@general_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Walmart API rate limiter, circuit breaker, search cache and request coalescing metrics, and LLM response cache hit rate"""
+    return success_response('Walmart API metrics', {
+        'rate_limiter': get_shared_rate_limiter().get_stats(),
+        'circuit_breaker': get_shared_circuit_breaker().get_stats(),
+        'search_cache': search_cache.get_stats(),
+        'search_single_flight': search_single_flight.get_stats(),
+        'async_search_single_flight': async_search_single_flight.get_stats(),
+        'llm_response_cache': get_shared_llm_response_cache().get_stats() if LLM_RESPONSE_CACHE_ENABLED else {}
+    })
+
 @general_bp.route('/', methods=['GET'])
 def index():
     """Root endpoint with API information"""
     return success_response('Walmart Recipe API is running', {
         'endpoints': [
             '/api/health',
+            '/api/metrics',
             '/api/chat',
             '/api/substitute',
             '/api/generate-cart',
-            '/api/search-product'
+            '/api/stream-cart',
+            '/api/search-product',
+            '/api/search-products'
         ]
     })
\ No newline at end of file
@@ -2,10 +2,11 @@ import os
 import logging
 import tempfile
 import time
-import asyncio
 from flask import Blueprint, request
 from utils.response import success_response, error_response
+from utils.event_loop import run_async
 from utils.conversation import get_or_create_conversation, serialize_context, store_cart_items
+from utils.serialization import serialize_cart_items
 from ..agent_definitions.agents.ingredient_extractor_agent import IngredientExtractorAgent
 from services.walmart_service import process_ingredients
 from pdfminer.high_level import extract_text
@@ -15,7 +16,7 @@ logger = logging.getLogger(__name__)
 pdf_bp = Blueprint('pdf', __name__, url_prefix='/api')
 
 @pdf_bp.route('/process-pdf', methods=['POST'])
-async def process_pdf():
+def process_pdf():
     """Process a PDF file and extract ingredients directly"""
     if 'recipe_pdf' not in request.files:
         return error_response('Missing recipe_pdf file')
@@ -44,10 +45,10 @@ async def process_pdf():
         
         logger.info(f"Successfully extracted {len(ingredients)} ingredients from PDF")
         
-        cart_items = await process_ingredients(ingredients)
+        cart_items = run_async(process_ingredients(ingredients, zip_code=request.form.get('zip_code')))
         
         chat_agent.extracted_ingredients = ingredients
-        store_cart_items(chat_agent, cart_items)
+        store_cart_items(chat_agent, cart_items, conversation_id)
         
         chat_agent.context.append({
             'role': 'user',
@@ -66,7 +67,7 @@ async def process_pdf():
         response_data = {
             'conversation_complete': True,
             'ingredients': ingredients,
-            'cart_items': cart_items,
+            'cart_items': serialize_cart_items(cart_items),
             'conversation_id': conversation_id,
             'conversation_history': serializable_context,
             'pdf_filename': pdf_file.filename
@@ -1,13 +1,18 @@
 import logging
-import asyncio
+import time
 from flask import Blueprint, request
 
+from utils.cart_records import CartProduct
+from utils.event_loop import run_async
 from utils.response import success_response, error_response
-from services.walmart_service import search_product
+from services.walmart_service import PRODUCTS_PER_INGREDIENT, search_product, search_products
 
 logger = logging.getLogger(__name__)
 search_bp = Blueprint('search', __name__, url_prefix='/api')
 
+# Most queries accepted by one /api/search-products request.
+MAX_BATCH_QUERIES = 50
+
 @search_bp.route('/search-product', methods=['POST'])
 def handle_search_product():
     """Search for a single product"""
@@ -18,9 +23,10 @@ def handle_search_product():
     
     query = data.get('query')
     quantity = data.get('quantity', '')
+    zip_code = data.get('zip_code')
     
     try:
-        search_results = asyncio.run(search_product(query))
+        search_results = run_async(search_product(query, zip_code=zip_code, num_items=PRODUCTS_PER_INGREDIENT))
         products = search_results.get('items', [])
         
         if not products:
@@ -29,33 +35,54 @@ def handle_search_product():
                 'query': query
             })
         
-        main_product = products[0]
-        alternatives = products[1:4] if len(products) > 1 else []
-        
-        main_item = {
-            'id': main_product.get('itemId'),
-            'name': main_product.get('name', 'Unknown product'),
-            'image': main_product.get('image', ''),
-            'price': main_product.get('price', {}).get('priceString', 'Price unavailable')
-        }
-        
-        alt_items = []
-        for alt in alternatives:
-            alt_items.append({
-                'item_details': alt,
-                'id': alt.get('itemId'),
-                'name': alt.get('name', 'Unknown product'),
-                'image': alt.get('image', ''),
-                'price': alt.get('price', {}).get('priceString', 'Price unavailable')
-            })
+        cart_products = [CartProduct.from_item(product) for product in products[:PRODUCTS_PER_INGREDIENT]]
         
         return success_response(f"Found products for {query}", {
             'success': True,
-            'product': main_item,
-            'alternatives': alt_items,
+            'product': cart_products[0].to_dict(),
+            'alternatives': [alt.to_dict() for alt in cart_products[1:]],
             'query': query,
             'quantity': quantity
         })
     except Exception as e:
         logger.error(f"Error searching for product {query}: {e}")
-        return error_response(f"Error searching for product: {str(e)}", 500)
\ No newline at end of file
+        return error_response(f"Error searching for product: {str(e)}", 500)
+
+@search_bp.route('/search-products', methods=['POST'])
+def handle_search_products():
+    """
+    Search for several products at once
+
+    Takes `queries`, a list of query strings or {query, quantity} objects, and an optional `zip_code`.
+    Queries run concurrently; results come back in query order, each with its own status and timing.
+    """
+    data = request.json
+    
+    if not data or not isinstance(data.get('queries'), list) or not data['queries']:
+        return error_response('Missing queries parameter')
+    
+    queries = [query if isinstance(query, dict) else {'query': query} for query in data['queries']]
+    if any(not isinstance(query.get('query'), str) or not query['query'].strip() for query in queries):
+        return error_response('Every query needs a non-empty query string')
+    if len(queries) > MAX_BATCH_QUERIES:
+        return error_response(f"Too many queries: {len(queries)}, at most {MAX_BATCH_QUERIES} are allowed")
+    
+    start = time.perf_counter()
+    try:
+        results = run_async(search_products(queries, zip_code=data.get('zip_code')))
+    except Exception as e:
+        logger.error(f"Error searching for {len(queries)} products: {e}")
+        return error_response(f"Error searching for products: {str(e)}", 500)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    
+    for result in results:
+        cart_products = result.pop('products')
+        result['product'] = cart_products[0].to_dict() if cart_products else None
+        result['alternatives'] = [alt.to_dict() for alt in cart_products[1:]]
+    
+    found = sum(result['status'] == 'found' for result in results)
+    logger.info(f"Batch search found products for {found} of {len(results)} queries in {elapsed_ms:.0f} ms")
+    return success_response(f"Found products for {found} of {len(results)} queries", {
+        'results': results,
+        'elapsed_ms': round(elapsed_ms, 1)
+    })
@@ -3,15 +3,26 @@ from flask import Blueprint, request
 
 from config import active_conversations
 from utils.response import success_response, error_response
+from utils.cart_store import CartVersionConflict, get_shared_cart_store
+from utils.cart_records import to_cart_items
 from utils.conversation import get_cart_items, store_cart_items
-from services.cart_service import substitute_product
+from services.cart_service import substitute_products
 
 logger = logging.getLogger(__name__)
 substitute_bp = Blueprint('substitute', __name__, url_prefix='/api')
 
 @substitute_bp.route('/substitute', methods=['POST'])
 def handle_substitute():
-    """Substitute a product with an alternative"""
+    """
+    Substitute products with alternatives
+
+    Takes `substitutions`, a list of {ingredient_index, substitute_index}, or a single
+    `ingredient_index` and `substitute_index`. With `version`, the substitutions apply to
+    the conversation's stored cart only if it is still at that version (409 otherwise).
+    Without it, `cart_items` sent by the frontend replace the stored cart first, and the
+    cart is seeded from the conversation (see get_cart_items) if none is stored yet.
+    Responds with only the changed items, as `changes` [{index, cart_item}], and the cart's new `version`.
+    """
     data = request.json
     
     if not data:
@@ -19,31 +30,50 @@ def handle_substitute():
     
     logger.info(f"Substitute request received")
     
-    required_fields = ['ingredient_index', 'substitute_index', 'conversation_id']
-    if not all(field in data for field in required_fields):
-        return error_response('Missing required parameters')
+    if 'substitutions' in data:
+        if not isinstance(data['substitutions'], list) or not all(
+                isinstance(substitution, dict) for substitution in data['substitutions']):
+            return error_response('Missing required parameters')
+        substitutions = [(substitution.get('ingredient_index'), substitution.get('substitute_index'))
+                         for substitution in data['substitutions']]
+    else:
+        substitutions = [(data.get('ingredient_index'), data.get('substitute_index'))]
     
-    ingredient_index = data['ingredient_index']
-    substitute_index = data['substitute_index']
-    conversation_id = data['conversation_id']
+    conversation_id = data.get('conversation_id')
+    if conversation_id is None or not substitutions or any(
+            not isinstance(index, int) for substitution in substitutions for index in substitution):
+        return error_response('Missing required parameters')
     
     chat_agent = active_conversations.get(conversation_id)
     if not chat_agent:
         return error_response('Conversation not found', 404)
     
-    cart_items = get_cart_items(chat_agent, data.get('cart_items'))
-    if not cart_items:
-        return error_response('No cart items found for this conversation', 404)
+    cart_store = get_shared_cart_store()
+    expected_version = data.get('version')
+    cart = cart_store.get(conversation_id)
+    if cart is None or (expected_version is None and data.get('cart_items')):
+        if expected_version is not None:
+            return error_response('Cart version not found, send cart_items without a version', 409)
+        cart_items = get_cart_items(chat_agent, data.get('cart_items'))
+        if not cart_items:
+            return error_response('No cart items found for this conversation', 404)
+        expected_version = store_cart_items(chat_agent, to_cart_items(cart_items), conversation_id)
+        cart = cart_store.get(conversation_id)
     
     try:
-        result = substitute_product(cart_items, ingredient_index, substitute_index)
+        result = substitute_products(cart.items, substitutions)
         
         if not result['success']:
             return error_response(result['message'])
         
-        store_cart_items(chat_agent, result['cart_items'])
+        version = cart_store.apply(conversation_id, result['changes'], expected_version=expected_version)
+        changes = [{'index': index, 'cart_item': cart_item.to_dict()} for index, cart_item in result['changes'].items()]
         
-        return success_response('Product substituted successfully', {'cart_items': result['cart_items']})
+        return success_response('Product substituted successfully', {'changes': changes, 'version': version})
+    except CartVersionConflict as e:
+        logger.info(f"Rejected substitution for conversation {conversation_id}: {e}")
+        return error_response(f"Cart has changed since version {e.expected_version}, it is now at version "
+                              f"{e.current_version}", 409)
     except Exception as e:
         logger.error(f"Error substituting product: {e}", exc_info=True)
-        return error_response(f"Error substituting product: {str(e)}", 500)
\ No newline at end of file
+        return error_response(f"Error substituting product: {str(e)}", 500)
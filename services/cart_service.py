@@ -1,34 +1,38 @@
 import logging
+from dataclasses import replace
+from utils.cart_records import to_cart_items
+from utils.ingredient_normalization import sum_quantities
+from utils.pack_sizes import packages_for_cart
 
 logger = logging.getLogger(__name__)
 
 def format_cart_items_for_walmart(cart_items):
     """
-    Format cart items for Walmart cart URL generation
+    Format cart items (CartItems or their JSON shape) for Walmart cart URL generation
+
+    Rows with the same product (e.g. "butter, softened" and "melted butter") become one
+    entry, bought for their summed ingredient quantity. Each product's quantity is the
+    number of packages covering it (see utils.pack_sizes).
     """
+    items_by_id = {}
+    for item in to_cart_items(cart_items):
+        if item.item_id:
+            items_by_id.setdefault(item.item_id, []).append(item)
+    quantities = packages_for_cart(
+        (sum_quantities([item.ingredient_quantity for item in items]), items[0].ingredient_name,
+         items[0].main.details.size if items[0].main.details is not None else None, items[0].main.name)
+        for items in items_by_id.values()
+    )
     formatted_items = []
-    for item in cart_items:
-        main_item = item.get('main', {})
-        
-        item_id = None
-        
-        if main_item.get('id') and main_item.get('id') != 0:
-            item_id = main_item.get('id')
-        
-        elif main_item.get('itemId') and main_item.get('itemId') != 0:
-            item_id = main_item.get('itemId')
-            
-        elif main_item.get('item_details', {}).get('itemId') and main_item.get('item_details', {}).get('itemId') != 0:
-            item_id = main_item.get('item_details', {}).get('itemId')
-        
-        if item_id and item_id != 0:
-            formatted_items.append({
-                'itemId': item_id,
-                'quantity': 1,
-                'seller': 'walmart',
-                'item_details': main_item,
-                'rationale': f"Selected for {item.get('original_ingredient', {}).get('name', 'recipe')}"
-            })
+    for (item_id, items), quantity in zip(items_by_id.items(), quantities):
+        ingredient_names = ", ".join(dict.fromkeys(item.ingredient_name for item in items if item.ingredient_name))
+        formatted_items.append({
+            'itemId': item_id,
+            'quantity': quantity,
+            'seller': 'walmart',
+            'item_details': items[0].main,
+            'rationale': f"Selected for {ingredient_names or 'recipe'}"
+        })
     
     return formatted_items
 
@@ -47,7 +51,7 @@ def create_cart_url(cart_items):
     for item in formatted_items:
         item_id = item.get('itemId')
         if item_id:
-            item_params.append(f"items={item_id}:1:walmart")
+            item_params.append(f"items={item_id}:{item.get('quantity', 1)}:walmart")
             logger.debug(f"Added item {item_id} to cart URL")
     
     if not item_params:
@@ -57,51 +61,55 @@ def create_cart_url(cart_items):
     logger.info(f"Creating cart URL with {len(item_params)} valid items")
     return f"https://www.walmart.com/cart?" + "&".join(item_params)
 
+def substitute_products(cart_items, substitutions):
+    """
+    Work out several substitutions at once, without changing `cart_items`
+
+    `substitutions` is a list of (ingredient_index, substitute_index) pairs. Either
+    every substitution is valid, or none is applied and the first problem is reported.
+    Returns {'success': True, 'changes': {ingredient_index: CartItem}} with a new
+    CartItem for each changed row; alternatives become the main product as-is,
+    without copying their details.
+    """
+    changes = {}
+    for ingredient_index, substitute_index in substitutions:
+        if ingredient_index < 0 or ingredient_index >= len(cart_items):
+            return {
+                'success': False,
+                'message': f'Invalid ingredient index: {ingredient_index}, max index is {len(cart_items)-1}'
+            }
+        
+        item = changes.get(ingredient_index, cart_items[ingredient_index])
+        substitutes = item.alternatives
+        
+        if substitute_index < 0 or substitute_index >= len(substitutes):
+            return {
+                'success': False,
+                'message': f'Invalid substitute index: {substitute_index}, max index is {len(substitutes)-1}'
+            }
+        
+        changes[ingredient_index] = replace(item, main=substitutes[substitute_index])
+    
+    logger.info(f"Substitution successful for ingredients {sorted(changes)}")
+    return {
+        'success': True,
+        'changes': changes
+    }
+
 def substitute_product(cart_items, ingredient_index, substitute_index):
     """
     Substitute a product with an alternative
+
+    The alternative's CartProduct becomes the main product as-is, without copying its details.
     """
-    if ingredient_index < 0 or ingredient_index >= len(cart_items):
-        return {
-            'success': False,
-            'message': f'Invalid ingredient index: {ingredient_index}, max index is {len(cart_items)-1}'
-        }
-    
-    item = cart_items[ingredient_index]
-    substitutes = item.get('alternatives', [])
-    
-    if substitute_index < 0 or substitute_index >= len(substitutes):
-        return {
-            'success': False,
-            'message': f'Invalid substitute index: {substitute_index}, max index is {len(substitutes)-1}'
-        }
-    
-    substitute = substitutes[substitute_index]
-    
-    #two possible structures i think so handling both in case
-    if 'item_details' in substitute:
-        substitute_details = substitute['item_details']
-        new_main_item = {
-            'id': substitute_details.get('itemId'),
-            'name': substitute_details.get('name', 'Unknown product'),
-            'image': substitute_details.get('image', ''),
-            'quantity': item['main']['quantity'],
-            'price': substitute_details.get('price', {}).get('priceString', 'Price unavailable'),
-            'item_details': substitute_details  # Keep the full details for cart generation
-        }
-    else:
-        new_main_item = {
-            'id': substitute.get('id'),
-            'name': substitute.get('name', 'Unknown product'),
-            'image': substitute.get('image', ''),
-            'quantity': item['main']['quantity'],
-            'price': substitute.get('price', 'Price unavailable')
-        }
+    cart_items = to_cart_items(cart_items)
+    result = substitute_products(cart_items, [(ingredient_index, substitute_index)])
+    if not result['success']:
+        return result
     
-    cart_items[ingredient_index]['main'] = new_main_item
-    logger.info(f"Substitution successful for ingredient {ingredient_index}")
+    cart_items[ingredient_index] = result['changes'][ingredient_index]
     
     return {
         'success': True,
         'cart_items': cart_items
-    }
\ No newline at end of file
+    }
@@ -1,100 +1,147 @@
-import json
 import asyncio
+import json
 import logging
-from config import get_walmart_api
+import os
+import time
+from config import get_async_walmart_api
+from utils.cart_records import CartItem, CartProduct
+from utils.ingredient_normalization import group_ingredients
+from utils.product_records import is_available_in_store
+from walmart_affiliate_api_utils import WALMART_SEARCH_MAX_NUM_ITEMS
 
 logger = logging.getLogger(__name__)
-walmart_api = get_walmart_api()
+walmart_api = get_async_walmart_api()
+
+# Each ingredient shows one product and up to three alternatives.
+PRODUCTS_PER_INGREDIENT = 4
+# Store-scoped searches drop items out of stock at the store, so ask for more to keep enough.
+STORE_SEARCH_OVERFETCH = 3
+# How many ingredients process_ingredients searches at once; the shared rate limiter still paces the requests.
+INGREDIENT_SEARCH_CONCURRENCY = int(os.getenv("INGREDIENT_SEARCH_CONCURRENCY", "8"))
 
-async def search_product(query):
+async def search_product(query, zip_code=None, num_items=None):
     """
     Search for a product in Walmart's API
+
+    With a zip code, stock is reported for the nearest store and only items
+    available there are returned. `num_items` limits how many results are requested.
+    A failed search raises, so callers can tell it apart from one that found nothing.
+    """
+    store = await walmart_api.get_nearest_store(zip_code) if zip_code else None
+    if not store:
+        return json.loads(await walmart_api.get_walmart_search_results(query, num_items=num_items))
+    store_num_items = min(num_items * STORE_SEARCH_OVERFETCH, WALMART_SEARCH_MAX_NUM_ITEMS) if num_items else None
+    search_results = json.loads(await walmart_api.get_walmart_search_results(
+        query, store_id=store['storeId'], num_items=store_num_items))
+    search_results['items'] = [
+        item for item in search_results.get('items', [])
+        if is_available_in_store(item.get('stock'), item.get('offerType'))
+    ]
+    search_results['store'] = store
+    return search_results
+
+async def find_ingredient_products(search_term, zip_code=None):
+    """
+    Search for one ingredient and return up to PRODUCTS_PER_INGREDIENT CartProducts
+
+    Returns an empty list if nothing is found, or None if the search fails.
     """
     try:
-        search_results_str = await asyncio.to_thread(
-            walmart_api.get_walmart_search_results,
-            query
-        )
-        return json.loads(search_results_str)
+        search_results = await search_product(search_term, zip_code=zip_code,
+                                              num_items=PRODUCTS_PER_INGREDIENT)
+        products = search_results.get('items', [])
+        return [CartProduct.from_item(product) for product in products[:PRODUCTS_PER_INGREDIENT]]
     except Exception as e:
-        logger.error(f"Error searching for product {query}: {e}")
-        return {"items": []}
+        logger.error(f"Error processing ingredient {search_term}: {e}")
+        return None
+
+def build_cart_item(ingredient, cart_products):
+    """
+    Build one ingredient line's CartItem from the products found for it (see find_ingredient_products),
+    or a placeholder row if nothing was found or the search failed
+    """
+    ingredient_name = ingredient.get('ingredient', '')
+    ingredient_quantity = ingredient.get('quantity', '')
+    
+    if cart_products is None:
+        return CartItem.placeholder(ingredient_name, ingredient_quantity, 'Error finding product')
+    if not cart_products:
+        return CartItem.placeholder(ingredient_name, ingredient_quantity, 'Not found')
+    return CartItem(
+        main=cart_products[0],
+        quantity=ingredient_quantity,
+        alternatives=cart_products[1:],
+        ingredient_name=ingredient_name,
+        ingredient_quantity=ingredient_quantity
+    )
 
-async def process_ingredients(ingredients):
+async def iter_process_ingredients(ingredients, zip_code=None, max_concurrency=None):
     """
-    Process ingredients to find Walmart products
+    Search for ingredients concurrently, yielding (index, CartItem) as each one resolves
+
+    Lines naming the same product (see utils.ingredient_normalization.group_ingredients)
+    are searched once, under the first line's ingredient name; every line still gets its own
+    CartItem with its own name and quantity, and the cart URL buys the product once
+    for the lines' summed quantity (see format_cart_items_for_walmart). At most
+    `max_concurrency` (default INGREDIENT_SEARCH_CONCURRENCY) searches run at once.
+    Items arrive in completion order; `index` is the line's position in `ingredients`.
+    Searches still running when the consumer stops are cancelled.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or INGREDIENT_SEARCH_CONCURRENCY)
+    
+    async def search_limited(group):
+        async with semaphore:
+            search_term = ingredients[group.line_indices[0]].get('ingredient', '')
+            return group, await find_ingredient_products(search_term, zip_code=zip_code)
+    
+    tasks = [asyncio.create_task(search_limited(group)) for group in group_ingredients(ingredients)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            group, cart_products = await next_done
+            for index in group.line_indices:
+                yield index, build_cart_item(ingredients[index], cart_products)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def search_products(queries, zip_code=None, max_concurrency=None):
     """
-    cart_items = []
+    Search for several products concurrently, returning one result per query in order
+
+    Each query is a dict with 'query' and optional 'quantity'. Searches share the
+    API client's search cache and rate limiter, and at most `max_concurrency`
+    (default INGREDIENT_SEARCH_CONCURRENCY) run at once. Each result is
+    {'query', 'quantity', 'status', 'elapsed_ms', 'products'}, where status is
+    'found', 'not_found' or 'error' and products is a list of CartProducts.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or INGREDIENT_SEARCH_CONCURRENCY)
     
-    for ingredient in ingredients:
-        ingredient_name = ingredient.get('ingredient', '')
-        ingredient_quantity = ingredient.get('quantity', '')
-        
-        try:
-            search_results = await search_product(ingredient_name)
-            products = search_results.get('items', [])
-            
-            if not products:
-                cart_items.append({
-                    'main': {
-                        'id': 0,
-                        'name': f"{ingredient_name} (Not found)",
-                        'image': '',
-                        'quantity': ingredient_quantity,
-                        'price': 'Not available'
-                    },
-                    'alternatives': [],
-                    'original_ingredient': {
-                        'name': ingredient_name,
-                        'quantity': ingredient_quantity
-                    }
-                })
-                continue
-            
-            main_product = products[0]
-            alternatives = products[1:4] if len(products) > 1 else []
-            
-            main_item = {
-                'id': main_product.get('itemId'),
-                'name': main_product.get('name', 'Unknown product'),
-                'image': main_product.get('image', ''),
-                'quantity': ingredient_quantity,
-                'price': main_product.get('price', {}).get('priceString', 'Price unavailable')
-            }
-            
-            alt_items = []
-            for alt in alternatives:
-                alt_items.append({
-                    'item_details': alt,
-                    'id': alt.get('itemId'),
-                    'name': alt.get('name', 'Unknown product'),
-                    'image': alt.get('image', ''),
-                    'price': alt.get('price', {}).get('priceString', 'Price unavailable')
-                })
-            
-            cart_items.append({
-                'main': main_item,
-                'alternatives': alt_items,
-                'original_ingredient': {
-                    'name': ingredient_name,
-                    'quantity': ingredient_quantity
-                }
-            })
-        except Exception as e:
-            logger.error(f"Error processing ingredient {ingredient_name}: {e}")
-            cart_items.append({
-                'main': {
-                    'id': 0,
-                    'name': f"{ingredient_name} (Error finding product)",
-                    'image': '',
-                    'quantity': ingredient_quantity,
-                    'price': 'Not available'
-                },
-                'alternatives': [],
-                'original_ingredient': {
-                    'name': ingredient_name,
-                    'quantity': ingredient_quantity
-                }
-            })
+    async def search_limited(query):
+        async with semaphore:
+            start = time.perf_counter()
+            cart_products = await find_ingredient_products(query['query'], zip_code=zip_code)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        status = 'error' if cart_products is None else 'found' if cart_products else 'not_found'
+        return {
+            'query': query['query'],
+            'quantity': query.get('quantity', ''),
+            'status': status,
+            'elapsed_ms': round(elapsed_ms, 1),
+            'products': cart_products or []
+        }
     
-    return cart_items
\ No newline at end of file
+    return await asyncio.gather(*(search_limited(query) for query in queries))
+
+async def process_ingredients(ingredients, zip_code=None, max_concurrency=None):
+    """
+    Process ingredients to find Walmart products, in stock at the store nearest `zip_code` if given
+
+    Ingredients are searched concurrently (see iter_process_ingredients) and the cart keeps their order.
+    Returns a list of CartItems (see utils.cart_records); serialize them with to_dict().
+    """
+    cart_items = [None] * len(ingredients)
+    async for index, cart_item in iter_process_ingredients(ingredients, zip_code=zip_code,
+                                                           max_concurrency=max_concurrency):
+        cart_items[index] = cart_item
+    return cart_items
@@ -13,7 +13,7 @@ class FakeWalmartAPIWrapper:
     def __init__(self):
         self.get_count = 0
 
-    def get_walmart_search_results(self, term):
+    async def get_walmart_search_results(self, term, **search_options):
         """Always return an empty list to force the retry path."""
         self.get_count += 1
         return json.dumps({"items": []})
@@ -29,7 +29,7 @@ class DummyToolCall:
         self.args = args
 
 class FakeLLMWrapper:
-    def query(self, model, context, temperature, tools, tool_choice, parallel_tool_calls):
+    async def query(self, model, context, temperature, tools, tool_choice, parallel_tool_calls):
         """
         Return a dummy response.
         In our tests the actual content is irrelevant because our fake
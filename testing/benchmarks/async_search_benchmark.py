@@ -0,0 +1,71 @@
+"""
+Compare concurrent Walmart searches through asyncio.to_thread(WalmartAPI) and AsyncWalmartAPI.
+
+A local server adds a fixed latency to every request. For each concurrency level
+the script reports wall time, peak requests actually in flight upstream and peak
+threads alive in the benchmark process.
+The thread-based path is capped by the default executor (min(32, cpu + 4)
+workers); the native async path runs every search on the event loop thread.
+
+Usage:
+    python testing/benchmarks/async_search_benchmark.py [latency_seconds]
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from testing.benchmarks.benchmark_utils import latency_server, temporary_rsa_key
+from utils.http_transport import AsyncHTTPTransport, HTTPTransport
+from walmart_affiliate_api_utils import AsyncWalmartAPI, WalmartAPI
+
+CONCURRENCY_LEVELS = [8, 32, 64, 128]
+UNMANAGED_API_OPTIONS = dict(use_search_cache=False, use_response_cache=False, use_rate_limiter=False,
+                             use_circuit_breaker=False)
+
+
+async def run_searches(search_coroutine_factory, concurrency, term_prefix):
+    peak_threads = threading.active_count()
+
+    async def sample_threads():
+        nonlocal peak_threads
+        while True:
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.005)
+
+    sampler = asyncio.create_task(sample_threads())
+    start = time.perf_counter()
+    await asyncio.gather(*(search_coroutine_factory(f"{term_prefix} ingredient {i}") for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    sampler.cancel()
+    return elapsed, peak_threads
+
+
+def main(latency_seconds=0.2):
+    with temporary_rsa_key() as key_path, latency_server(latency_seconds) as base_url:
+        print(f"Server latency: {latency_seconds * 1000:.0f} ms")
+        print(f"{'mode':<12}{'searches':>10}{'wall (s)':>12}{'peak in flight':>16}{'peak threads':>14}")
+        for concurrency in CONCURRENCY_LEVELS:
+            # Caching, rate limiting and the breaker would measure cache hits and throttling, not the threading model.
+            sync_api = WalmartAPI("consumer", "1", key_path, base_url=base_url,
+                                  transport=HTTPTransport(pool_maxsize=concurrency), **UNMANAGED_API_OPTIONS)
+            async_api = AsyncWalmartAPI("consumer", "1", key_path, base_url=base_url,
+                                        transport=AsyncHTTPTransport(pool_maxsize=concurrency), **UNMANAGED_API_OPTIONS)
+
+            async def threaded_search(term):
+                return await asyncio.to_thread(sync_api.get_walmart_search_results, term)
+
+            for mode, api, factory in (("to_thread", sync_api, threaded_search),
+                                       ("async", async_api, async_api.get_walmart_search_results)):
+                # Run each mode on a fresh loop so the default executor starts empty.
+                # Terms are unique per mode and level, so no search is answered by an earlier one.
+                elapsed, peak_threads = asyncio.run(run_searches(factory, concurrency, f"{mode} {concurrency}"))
+                peak_in_flight = api.get_transport_stats()["peak_in_flight"]
+                print(f"{mode:<12}{concurrency:>10}{elapsed:>12.2f}{peak_in_flight:>16}{peak_threads:>14}")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 0.2)
@@ -0,0 +1,72 @@
+"""
+Shared fixtures for the scripts in testing/benchmarks.
+"""
+import contextlib
+import http.server
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+@contextlib.contextmanager
+def temporary_rsa_key():
+    """Yield the path of a freshly generated, unencrypted PEM RSA key that is deleted afterwards."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        key_path = os.path.join(temp_dir, "rsa_key")
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        with open(key_path, "wb") as key_file:
+            key_file.write(private_key.private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.TraditionalOpenSSL,
+                encryption_algorithm=serialization.NoEncryption(),
+            ))
+        yield key_path
+
+
+def _serve_with_latency(latency_seconds, body, port_queue):
+    class LatencyHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency_seconds)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    class LatencyServer(http.server.ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 1024
+
+    server = LatencyServer(("127.0.0.1", 0), LatencyHandler)
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+@contextlib.contextmanager
+def latency_server(latency_seconds: float, payload: dict = None):
+    """
+    Run a local HTTP server that answers every GET with `payload` after `latency_seconds`.
+
+    The server runs in a child process so its handler threads do not show up in
+    the benchmark process's thread counts. Yields the server's base URL.
+    """
+    body = json.dumps(payload if payload is not None else {"items": []}).encode("utf-8")
+    port_queue = multiprocessing.Queue()
+    server_process = multiprocessing.Process(target=_serve_with_latency, args=(latency_seconds, body, port_queue),
+                                             daemon=True)
+    server_process.start()
+    try:
+        yield f"http://127.0.0.1:{port_queue.get(timeout=10)}"
+    finally:
+        server_process.terminate()
+        server_process.join()
@@ -0,0 +1,104 @@
+"""
+Memory benchmark for the carts kept on each conversation.
+
+Builds the carts of many conversations from Walmart-shaped search responses in
+two ways. The previous way used nested dicts, with every alternative keeping
+its raw search item. The current way uses utils.cart_records: slotted
+CartItem/CartProduct objects that point at pooled ProductRecords. For each, it
+reports the bytes still allocated per conversation once every cart is stored,
+measured with tracemalloc. Searches draw from a shared pool of popular
+products, like real recipes do, so pooled records are shared across conversations.
+
+Usage:
+    python testing/benchmarks/cart_memory_benchmark.py [conversations]
+"""
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from testing.benchmarks.search_parsing_benchmark import fake_search_item
+from utils.cart_records import CartItem, CartProduct
+from utils.serialization import serialize_cart_items
+
+INGREDIENTS_PER_RECIPE = 12
+PRODUCTS_PER_INGREDIENT = 4
+POPULAR_PRODUCTS = 400
+
+
+def search_responses(rng, conversations):
+    """One response text per ingredient of every conversation, drawn from a pool of popular products."""
+    pool = [fake_search_item(random.Random(item_id), 10_000_000 + item_id) for item_id in range(POPULAR_PRODUCTS)]
+    return [
+        [json.dumps({"items": rng.sample(pool, PRODUCTS_PER_INGREDIENT)}) for _ in range(INGREDIENTS_PER_RECIPE)]
+        for _ in range(conversations)
+    ]
+
+
+def dict_cart(responses):
+    """The cart as process_ingredients used to build it: nested dicts holding raw search items."""
+    cart_items = []
+    for i, response_text in enumerate(responses):
+        products = json.loads(response_text)["items"]
+        main_product = products[0]
+        cart_items.append({
+            'main': {
+                'id': main_product.get('itemId'),
+                'name': main_product.get('name', 'Unknown product'),
+                'image': main_product.get('image', ''),
+                'quantity': '1 cup',
+                'price': main_product.get('price', {}).get('priceString', 'Price unavailable')
+            },
+            'alternatives': [{
+                'item_details': alt,
+                'id': alt.get('itemId'),
+                'name': alt.get('name', 'Unknown product'),
+                'image': alt.get('image', ''),
+                'price': alt.get('price', {}).get('priceString', 'Price unavailable')
+            } for alt in products[1:]],
+            'original_ingredient': {'name': f"ingredient {i}", 'quantity': '1 cup'}
+        })
+    return cart_items
+
+
+def record_cart(responses):
+    """The cart as process_ingredients builds it now."""
+    cart_items = []
+    for i, response_text in enumerate(responses):
+        cart_products = [CartProduct.from_item(product) for product in json.loads(response_text)["items"]]
+        cart_items.append(CartItem(cart_products[0], '1 cup', cart_products[1:], f"ingredient {i}", '1 cup'))
+    return cart_items
+
+
+def bytes_per_conversation(build_cart, conversations_responses):
+    gc.collect()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    # Each conversation keeps its cart on the agent; last_response_data references the same list.
+    conversations = [{"cart_items": build_cart(responses)} for responses in conversations_responses]
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del conversations
+    return (retained - baseline) / len(conversations_responses)
+
+
+def main(conversations=200):
+    conversations_responses = search_responses(random.Random(0), conversations)
+    sample = serialize_cart_items(record_cart(conversations_responses[0]))
+    assert [sorted(item) for item in sample] == [sorted(item) for item in dict_cart(conversations_responses[0])]
+
+    before = bytes_per_conversation(dict_cart, conversations_responses)
+    after = bytes_per_conversation(record_cart, conversations_responses)
+    print(f"{conversations} conversations, {INGREDIENTS_PER_RECIPE} ingredients x {PRODUCTS_PER_INGREDIENT} products")
+    print(f"{'nested dicts with raw items':<36} {before / 1024:>8,.1f} KiB/conversation")
+    print(f"{'CartItem + pooled ProductRecord':<36} {after / 1024:>8,.1f} KiB/conversation")
+    print(f"\nReduction: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,90 @@
+"""
+Throughput of /api/search-product with an event loop per request against the worker's shared loop.
+
+Concurrent clients post to the Flask app (through its test client, one thread
+per client, like a threaded server) while searches go to the offline Walmart
+stand-in server with a fixed injected latency. The view runs its search coroutine
+either with `asyncio.run` (the old way: a new loop, and so a new httpx connection
+pool, for every request) or with utils.event_loop.run_async (one long-lived loop
+whose pool stays warm). The search cache is disabled, so every request reaches
+the server. Importing the app loads its settings (load_env), so the .env file or
+its variables must be present.
+
+Usage:
+    python testing/benchmarks/event_loop_benchmark.py [latency_seconds]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from testing.benchmarks.benchmark_utils import temporary_rsa_key
+from testing.walmart_standin_server import load_catalog, run_standin_server
+
+CONCURRENT_CLIENTS = [1, 8, 32]
+REQUESTS_PER_CLIENT = 20
+
+
+def run_per_request_loop(coro, timeout=None):
+    return asyncio.run(coro)
+
+
+def main(latency_seconds=0.02):
+    with temporary_rsa_key() as key_path, run_standin_server(latency=str(latency_seconds), seed=0) as server:
+        os.environ.setdefault("CONSUMER_ID", "consumer")
+        os.environ.setdefault("RSA_KEY_PATH", key_path)
+        from app import app
+        from routes import search
+        from services import walmart_service
+        from utils.event_loop import run_async
+        from utils.http_transport import AsyncHTTPTransport
+        from walmart_affiliate_api_utils import AsyncWalmartAPI
+
+        class CountingTransport(AsyncHTTPTransport):
+            """Counts the httpx clients, and so the connection pools, it creates."""
+            pools_created = 0
+
+            def _get_client(self):
+                clients = len(self._clients)
+                client = super()._get_client()
+                self.pools_created += len(self._clients) > clients
+                return client
+
+        names = sorted({item["name"].split(",")[0].split(" ", 1)[1] for item in load_catalog()})
+        print(f"Server latency: {latency_seconds * 1000:.0f} ms, {REQUESTS_PER_CLIENT} requests per client")
+        print(f"{'clients':>8}{'mode':>18}{'req/s':>10}{'p50 (ms)':>10}{'p95 (ms)':>10}{'pools':>8}")
+        for clients in CONCURRENT_CLIENTS:
+            for mode, runner in (("loop per request", run_per_request_loop), ("shared loop", run_async)):
+                transport = CountingTransport()
+                walmart_service.walmart_api = AsyncWalmartAPI(
+                    "consumer", "1", key_path, base_url=server.base_url, transport=transport,
+                    use_search_cache=False, use_response_cache=False, use_rate_limiter=False)
+                search.run_async = runner
+
+                def client(client_index):
+                    test_client = app.test_client()
+                    latencies = []
+                    for i in range(REQUESTS_PER_CLIENT):
+                        start = time.perf_counter()
+                        response = test_client.post("/api/search-product", json={
+                            "query": names[(client_index * REQUESTS_PER_CLIENT + i) % len(names)]})
+                        latencies.append(time.perf_counter() - start)
+                        assert response.status_code == 200, response.get_data(as_text=True)
+                    return latencies
+
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=clients) as executor:
+                    latencies = [latency for result in executor.map(client, range(clients)) for latency in result]
+                elapsed = time.perf_counter() - start
+                percentiles = statistics.quantiles(latencies, n=20)
+                print(f"{clients:>8}{mode:>18}{len(latencies) / elapsed:>10.1f}{percentiles[9] * 1000:>10.1f}"
+                      f"{percentiles[18] * 1000:>10.1f}{transport.pools_created:>8}")
+        search.run_async = run_async
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 0.02)
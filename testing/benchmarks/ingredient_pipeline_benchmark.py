@@ -0,0 +1,55 @@
+"""
+Wall time of services.walmart_service.process_ingredients against ingredient count.
+
+Searches go to the offline Walmart stand-in server with a fixed injected
+latency. The script compares one search at a time (max_concurrency=1, the old
+for loop) with the default INGREDIENT_SEARCH_CONCURRENCY. Caches and the rate
+limiter are disabled, so every ingredient costs one full round trip.
+Importing the service loads the app's settings (load_env), so the .env file or
+its variables must be present.
+
+Usage:
+    python testing/benchmarks/ingredient_pipeline_benchmark.py [latency_seconds]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from testing.benchmarks.benchmark_utils import temporary_rsa_key
+from testing.walmart_standin_server import load_catalog, run_standin_server
+
+INGREDIENT_COUNTS = [1, 5, 10, 20, 40]
+
+
+def main(latency_seconds=0.1):
+    with temporary_rsa_key() as key_path, run_standin_server(latency=str(latency_seconds), seed=0) as server:
+        os.environ.setdefault("CONSUMER_ID", "consumer")
+        os.environ.setdefault("RSA_KEY_PATH", key_path)
+        from services import walmart_service
+        from utils.http_transport import AsyncHTTPTransport
+        from walmart_affiliate_api_utils import AsyncWalmartAPI
+
+        names = sorted({item["name"].split(",")[0].split(" ", 1)[1] for item in load_catalog()})
+        print(f"Server latency: {latency_seconds * 1000:.0f} ms, "
+              f"concurrency limit: {walmart_service.INGREDIENT_SEARCH_CONCURRENCY}")
+        print(f"{'ingredients':>12}{'sequential (s)':>16}{'concurrent (s)':>16}{'speedup':>10}")
+        for count in INGREDIENT_COUNTS:
+            ingredients = [{"ingredient": names[i % len(names)], "quantity": "1"} for i in range(count)]
+            timings = []
+            for max_concurrency in (1, None):
+                walmart_service.walmart_api = AsyncWalmartAPI(
+                    "consumer", "1", key_path, base_url=server.base_url, transport=AsyncHTTPTransport(),
+                    use_search_cache=False, use_response_cache=False, use_rate_limiter=False)
+                start = time.perf_counter()
+                cart_items = asyncio.run(walmart_service.process_ingredients(ingredients,
+                                                                             max_concurrency=max_concurrency))
+                timings.append(time.perf_counter() - start)
+                assert [item.ingredient_name for item in cart_items] == [i["ingredient"] for i in ingredients]
+            print(f"{count:>12}{timings[0]:>16.2f}{timings[1]:>16.2f}{timings[0] / timings[1]:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 0.1)
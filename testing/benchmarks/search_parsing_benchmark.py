@@ -0,0 +1,123 @@
+"""
+Micro-benchmark for parsing Walmart search responses.
+
+Compares the current path (json.loads of the whole payload, then
+filter_walmart_search_result_props) with utils.product_records, which decodes
+only the needed fields (msgspec when installed, else orjson/json) and filters
+while decoding. Responses mimic real 25-item affiliate search payloads.
+
+Usage:
+    python testing/benchmarks/search_parsing_benchmark.py [iterations]
+"""
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from utils import product_records
+from utils.product_records import parse_search_response, prompt_props
+from walmart_affiliate_api_utils import filter_walmart_search_result_props
+
+STOCK_VALUES = ["Available", "Available", "Available", "Limited Supply", "Not available"]
+OFFER_TYPES = ["ONLINE_AND_STORE", "ONLINE_AND_STORE", "STORE_ONLY", "ONLINE_ONLY"]
+
+
+def fake_search_item(rng, item_id):
+    name = f"Great Value Product {item_id}, {rng.randint(4, 64)} oz"
+    image_base = f"https://i5.walmartimages.com/asr/{item_id:08x}-{rng.getrandbits(64):016x}.jpeg"
+    return {
+        "itemId": item_id,
+        "parentItemId": item_id,
+        "name": name,
+        "msrp": round(rng.uniform(1, 30), 2),
+        "salePrice": round(rng.uniform(1, 25), 2),
+        "upc": f"{rng.getrandbits(40):012d}",
+        "categoryPath": "Food/Pantry/Canned Goods/Canned Vegetables",
+        "shortDescription": "&lt;p&gt;" + "Wholesome pantry staple. " * 12 + "&lt;/p&gt;",
+        "longDescription": "&lt;ul&gt;" + "&lt;li&gt;Non-GMO, no artificial flavors&lt;/li&gt;" * 15 + "&lt;/ul&gt;",
+        "brandName": "Great Value",
+        "thumbnailImage": f"{image_base}?odnHeight=100&odnWidth=100",
+        "mediumImage": f"{image_base}?odnHeight=180&odnWidth=180",
+        "largeImage": f"{image_base}?odnHeight=450&odnWidth=450",
+        "productTrackingUrl": f"https://linksynergy.walmart.com/fs-bin/click?id=x&offerid=223073.{item_id}",
+        "ninetySevenCentShipping": False,
+        "standardShipRate": 0.0,
+        "size": f"{rng.randint(4, 64)} oz",
+        "color": "",
+        "marketplace": False,
+        "shipToStore": True,
+        "freeShipToStore": True,
+        "modelNumber": f"GV{item_id}",
+        "productUrl": f"https://www.walmart.com/ip/{item_id}",
+        "customerRating": f"{rng.uniform(3, 5):.3f}",
+        "numReviews": rng.randint(0, 5000),
+        "customerRatingImage": "https://i2.walmartimages.com/i/CustRating/4.5.gif",
+        "categoryNode": "976759_976794_7981826",
+        "rhid": "1234567",
+        "bundle": False,
+        "clearance": False,
+        "preOrder": False,
+        "stock": rng.choice(STOCK_VALUES),
+        "attributes": {"replenishmentEnabled": "true", "foodForm": "Canned", "isSortable": "true"},
+        "addToCartUrl": f"https://affil.walmart.com/cart/addToCart?items={item_id}",
+        "affiliateAddToCartUrl": f"https://linksynergy.walmart.com/fs-bin/click?id=x&offerid=223073.{item_id}&type=14",
+        "freeShippingOver35Dollars": True,
+        "giftOptions": {},
+        "imageEntities": [
+            {"thumbnailImage": f"{image_base}?odnHeight=100&odnWidth=100",
+             "mediumImage": f"{image_base}?odnHeight=180&odnWidth=180",
+             "largeImage": f"{image_base}?odnHeight=450&odnWidth=450",
+             "entityType": "PRIMARY"}
+            for _ in range(3)
+        ],
+        "offerType": rng.choice(OFFER_TYPES),
+        "isTwoDayShippingEligible": True,
+        "availableOnline": True,
+    }
+
+
+def fake_search_response(rng, num_items=25):
+    items = [fake_search_item(rng, rng.randint(10_000_000, 999_999_999)) for _ in range(num_items)]
+    return json.dumps({"query": "canned corn", "sort": "relevance", "responseGroup": "base",
+                       "totalResults": 1000, "start": 1, "numItems": num_items, "items": items})
+
+
+def baseline_parse(response_text):
+    """The path callers use today: decode everything, then keep a few fields of available items."""
+    return filter_walmart_search_result_props(json.loads(response_text).get("items", []))
+
+
+def projected_parse(response_text):
+    return [prompt_props(record) for record in parse_search_response(response_text)]
+
+
+def time_parser(label, parser, responses, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        parser(responses[i % len(responses)])
+    elapsed = time.perf_counter() - start
+    print(f"{label:<44} {iterations / elapsed:>10,.0f} responses/s   {elapsed / iterations * 1e6:>8,.1f} us/response")
+    return elapsed
+
+
+def main(iterations=5000):
+    rng = random.Random(0)
+    responses = [fake_search_response(rng) for _ in range(50)]
+    print(f"Average response size: {sum(map(len, responses)) / len(responses) / 1024:.1f} KiB, 25 items")
+    assert all(baseline_parse(response) == projected_parse(response) for response in responses)
+
+    baseline = time_parser("json.loads + filter_walmart_search_result_props", baseline_parse, responses, iterations)
+    fast_path = "msgspec" if product_records.msgspec is not None else "orjson" if product_records.orjson else "json"
+    projected = time_parser(f"parse_search_response ({fast_path})", projected_parse, responses, iterations)
+    generic = time_parser("parse_search_response (without msgspec)",
+                          lambda text: [prompt_props(record) for record in product_records._project_items(text)
+                                        if product_records.is_available_in_store(record.stock, record.offerType)],
+                          responses, iterations)
+    print(f"\nSpeedup: {baseline / projected:.1f}x ({fast_path}), {baseline / generic:.1f}x (without msgspec)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,64 @@
+"""
+Micro-benchmark for Walmart request header signing throughput.
+
+Compares the original per-call path (read key file, parse PEM, sign) with the
+cached WalmartRequestSigner, with and without signature reuse.
+
+Usage:
+    python testing/benchmarks/signing_benchmark.py [iterations]
+"""
+import base64
+import os
+import sys
+import time
+
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from testing.benchmarks.benchmark_utils import temporary_rsa_key
+from utils.walmart_signing import WalmartRequestSigner
+
+
+def uncached_headers(consumer_id, key_version, key_file_path):
+    """The signing path WalmartAPI used before the signer cache: one file read and PEM parse per call."""
+    timestamp = str(int(time.time() * 1000))
+    with open(key_file_path, "rb") as key_file:
+        private_key = serialization.load_pem_private_key(key_file.read(), password=None)
+    headers = {
+        "WM_CONSUMER.ID": consumer_id,
+        "WM_CONSUMER.INTIMESTAMP": timestamp,
+        "WM_SEC.KEY_VERSION": key_version,
+    }
+    canonicalized_str = "".join(headers[key].strip() + "\n" for key in sorted(headers.keys()))
+    signature_bytes = private_key.sign(canonicalized_str.encode("utf-8"), padding.PKCS1v15(), hashes.SHA256())
+    headers["WM_SEC.AUTH_SIGNATURE"] = base64.b64encode(signature_bytes).decode("ascii")
+    return headers
+
+
+def time_calls(label, func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {iterations / elapsed:>12,.0f} headers/s   {elapsed / iterations * 1e6:>10,.1f} us/call")
+
+
+def main(iterations=200):
+    with temporary_rsa_key() as key_path:
+        time_calls("uncached (read + parse + sign)", lambda: uncached_headers("consumer", "1", key_path), iterations)
+
+        signing_signer = WalmartRequestSigner("consumer", "1", key_path, reuse_fraction=0.0)
+        time_calls("cached key, sign every call", signing_signer.get_headers, iterations)
+
+        reusing_signer = WalmartRequestSigner("consumer", "1", key_path)
+        time_calls("cached key, reused signature", reusing_signer.get_headers, iterations)
+
+        print()
+        print("Signer stats (sign every call):", signing_signer.get_stats())
+        print("Signer stats (reused signature):", reusing_signer.get_stats())
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,54 @@
+import json
+import unittest
+
+from services.cart_service import format_cart_items_for_walmart, substitute_product
+from utils.cart_records import CartItem, CartProduct, to_cart_items
+from utils.serialization import serialize_cart_items
+
+
+def search_item(item_id, name, sale_price=2.5):
+    return {"itemId": item_id, "name": name, "salePrice": sale_price, "thumbnailImage": f"{item_id}.jpeg",
+            "stock": "Available", "offerType": "ONLINE_AND_STORE", "longDescription": "x" * 500}
+
+
+class TestCartRecords(unittest.TestCase):
+    def build_cart(self):
+        products = [CartProduct.from_item(search_item(item_id, f"Milk {item_id}")) for item_id in (1, 2, 3)]
+        return [CartItem(products[0], "1 gal", products[1:], "milk", "1 gal"),
+                CartItem.placeholder("saffron", "1 pinch", "Not found")]
+
+    def test_serializes_to_the_cart_json_shape(self):
+        cart_json = serialize_cart_items(self.build_cart())
+        self.assertEqual(cart_json[0]["main"]["id"], 1)
+        self.assertEqual(cart_json[0]["main"]["quantity"], "1 gal")
+        self.assertEqual(cart_json[0]["main"]["price"], "$2.50")
+        self.assertEqual(cart_json[0]["alternatives"][0]["item_details"]["itemId"], 2)
+        # Only the record fields of the raw item are kept.
+        self.assertNotIn("longDescription", cart_json[0]["alternatives"][0]["item_details"])
+        self.assertEqual(cart_json[0]["original_ingredient"], {"name": "milk", "quantity": "1 gal"})
+        self.assertEqual(cart_json[1]["main"], {"id": 0, "name": "saffron (Not found)", "image": "",
+                                                "price": "Not available", "quantity": "1 pinch"})
+        self.assertEqual(serialize_cart_items(to_cart_items(json.loads(json.dumps(cart_json)))), cart_json)
+
+    def test_equal_products_share_one_record(self):
+        first = CartProduct.from_item(search_item(7, "Eggs"))
+        second = CartProduct.from_dict({"id": 7, "name": "Eggs", "item_details": search_item(7, "Eggs")})
+        self.assertIs(first.details, second.details)
+
+    def test_substitution_and_cart_formatting(self):
+        cart_items = self.build_cart()
+        alternative = cart_items[0].alternatives[1]
+        result = substitute_product(cart_items, 0, 1)
+        self.assertTrue(result["success"])
+        self.assertIs(result["cart_items"][0].main, alternative)
+        self.assertEqual(result["cart_items"][0].to_dict()["main"]["quantity"], "1 gal")
+        self.assertFalse(substitute_product(cart_items, 0, 5)["success"])
+
+        # Carts sent back by the frontend in the JSON shape are accepted too.
+        formatted_items = format_cart_items_for_walmart(serialize_cart_items(result["cart_items"]))
+        self.assertEqual([item["itemId"] for item in formatted_items], [3])
+        self.assertEqual(formatted_items[0]["rationale"], "Selected for milk")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+from app import app
+from config import active_conversations
+from utils.cart_records import CartItem, CartProduct
+from utils.cart_store import CartStore, CartVersionConflict, get_shared_cart_store
+from utils.serialization import serialize_cart_items
+
+
+def build_cart(count=3):
+    cart_items = []
+    for i in range(count):
+        products = [CartProduct.from_item({"itemId": i * 10 + j, "name": f"Product {i}-{j}"}) for j in range(3)]
+        cart_items.append(CartItem(products[0], "1", products[1:], f"ingredient {i}", "1"))
+    return cart_items
+
+
+class FakeChatAgent:
+    pass
+
+
+class TestCartStore(unittest.TestCase):
+    def test_versions_and_conflicts(self):
+        store = CartStore()
+        cart_items = build_cart()
+        self.assertEqual(store.put("c", cart_items), 1)
+        replacement = build_cart(1)[0]
+        self.assertEqual(store.apply("c", {2: replacement}, expected_version=1), 2)
+        self.assertIs(cart_items[2], replacement)
+        with self.assertRaises(CartVersionConflict):
+            store.apply("c", {0: replacement}, expected_version=1)
+        self.assertEqual(store.put("c", build_cart()), 3)
+
+
+class TestSubstituteRoute(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        self.conversation_id = "cart-store-test"
+        active_conversations[self.conversation_id] = FakeChatAgent()
+
+    def tearDown(self):
+        active_conversations.pop(self.conversation_id, None)
+        get_shared_cart_store().drop(self.conversation_id)
+
+    def substitute(self, **body):
+        return self.client.post("/api/substitute", json=dict(body, conversation_id=self.conversation_id))
+
+    def test_batch_substitution_returns_only_changes(self):
+        response = self.substitute(substitutions=[{"ingredient_index": 0, "substitute_index": 1},
+                                                  {"ingredient_index": 2, "substitute_index": 0}],
+                                   cart_items=serialize_cart_items(build_cart()))
+        data = response.get_json()
+        self.assertTrue(data["success"])
+        self.assertEqual([(change["index"], change["cart_item"]["main"]["id"]) for change in data["changes"]],
+                         [(0, 2), (2, 21)])
+        self.assertNotIn("cart_items", data)
+
+        # The next substitution only needs the version.
+        data = self.substitute(ingredient_index=1, substitute_index=0, version=data["version"]).get_json()
+        self.assertEqual([change["index"] for change in data["changes"]], [1])
+        stored = get_shared_cart_store().get(self.conversation_id)
+        self.assertEqual(stored.version, data["version"])
+        self.assertEqual([item.main.id for item in stored.items], [2, 11, 21])
+
+        # Stale versions and invalid batches change nothing.
+        self.assertEqual(self.substitute(ingredient_index=0, substitute_index=0, version=1).status_code, 409)
+        response = self.substitute(substitutions=[{"ingredient_index": 0, "substitute_index": 0},
+                                                  {"ingredient_index": 9, "substitute_index": 0}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([item.main.id for item in stored.items], [2, 11, 21])
+        for substitutions in ([1], {"ingredient_index": 0, "substitute_index": 0}, "0:0"):
+            self.assertEqual(self.substitute(substitutions=substitutions, version=data["version"]).status_code, 400)
+
+    def test_ending_the_conversation_drops_its_cart(self):
+        self.assertEqual(self.substitute(ingredient_index=0, substitute_index=1,
+                                         cart_items=serialize_cart_items(build_cart())).status_code, 200)
+        self.assertEqual(self.client.delete(f"/api/chat/{self.conversation_id}").status_code, 200)
+        self.assertNotIn(self.conversation_id, active_conversations)
+        self.assertIsNone(get_shared_cart_store().get(self.conversation_id))
+        self.assertEqual(self.client.delete(f"/api/chat/{self.conversation_id}").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import json
+import time
+import unittest
+
+from testing.benchmarks.benchmark_utils import temporary_rsa_key
+from testing.walmart_standin_server import run_standin_server
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from utils.http_transport import HTTPTransport
+from utils.local_catalog import LOCAL_CATALOG_SOURCE, SAMPLE_CATALOG_PATH, LocalCatalog
+from walmart_affiliate_api_utils import WalmartAPI
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_on_failure_rate(self):
+        breaker = CircuitBreaker(window_size=4, min_calls=4, failure_rate_threshold=0.5)
+        for status_code in (200, 500, 200):
+            self.assertTrue(breaker.allow_request())
+            breaker.record_response(status_code, 0.1)
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        self.assertFalse(breaker.allow_request())
+        self.assertEqual(breaker.get_stats()["rejected"], 1)
+
+    def test_opens_on_slow_calls(self):
+        breaker = CircuitBreaker(window_size=2, min_calls=2, slow_call_seconds=1.0, slow_call_rate_threshold=1.0)
+        for _ in range(2):
+            breaker.allow_request()
+            breaker.record_response(200, 2.5)
+        self.assertEqual(breaker.state, OPEN)
+
+    def test_half_open_probes_close_or_reopen(self):
+        breaker = CircuitBreaker(window_size=1, min_calls=1, open_seconds=0.05, half_open_probes=2)
+        breaker.allow_request()
+        breaker.record_failure()
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertTrue(breaker.allow_request())
+        self.assertTrue(breaker.allow_request())
+        # Only two probes are let through until they report back.
+        self.assertFalse(breaker.allow_request())
+        breaker.record_response(200, 0.1)
+        breaker.record_response(503, 0.1)
+        self.assertEqual(breaker.state, OPEN)
+
+        time.sleep(0.06)
+        for _ in range(2):
+            self.assertTrue(breaker.allow_request())
+            breaker.record_response(200, 0.1)
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertEqual(breaker.get_stats()["closed"], 1)
+
+
+class TestLocalCatalogFallback(unittest.TestCase):
+    def test_local_catalog_search(self):
+        catalog = LocalCatalog.load(SAMPLE_CATALOG_PATH)
+        response = catalog.search("Cheese", num_items=3)
+        self.assertEqual(len(response["items"]), 3)
+        self.assertGreater(response["totalResults"], 3)
+        # Plain "Cheese" products rank ahead of "Cottage Cheese" and "Cream Cheese".
+        self.assertTrue(all(item["name"].endswith(" Cheese") and "Cottage" not in item["name"]
+                            and "Cream" not in item["name"] for item in response["items"]))
+        self.assertEqual(catalog.search("cheese", num_items=3, start=4)["start"], 4)
+        self.assertEqual(catalog.search("unobtainium")["items"], [])
+
+    def test_failing_api_trips_breaker_and_searches_fall_back(self):
+        with temporary_rsa_key() as key_path, run_standin_server(seed=1, error_rate=1.0) as server:
+            breaker = CircuitBreaker(window_size=3, min_calls=3, open_seconds=60)
+            walmart_api = WalmartAPI("consumer", "1", key_path, base_url=server.base_url, use_search_cache=False,
+                                     use_response_cache=False, transport=HTTPTransport(max_retries=0),
+                                     use_rate_limiter=False, circuit_breaker=breaker,
+                                     local_catalog=LocalCatalog.load(SAMPLE_CATALOG_PATH))
+            for term in ["milk", "eggs", "bread", "rice", "butter"]:
+                response = json.loads(walmart_api.get_walmart_search_results(term))
+                self.assertEqual(response["source"], LOCAL_CATALOG_SOURCE)
+                self.assertTrue(response["items"])
+            self.assertEqual(breaker.state, OPEN)
+            # Once open, searches are answered locally without reaching the API.
+            self.assertEqual(server.get_stats()["by_endpoint"]["search"], 3)
+            self.assertEqual(walmart_api.search_products("butter", available_only=False)[0].name.split()[-1],
+                             "Butter")
+
+    def test_no_fallback_without_a_configured_catalog(self):
+        with temporary_rsa_key() as key_path, run_standin_server(seed=1, error_rate=1.0) as server:
+            walmart_api = WalmartAPI("consumer", "1", key_path, base_url=server.base_url, use_search_cache=False,
+                                     use_response_cache=False, transport=HTTPTransport(max_retries=0),
+                                     use_rate_limiter=False, use_circuit_breaker=False)
+            # The synthetic sample catalog is never used implicitly: its item ids would go into real cart URLs.
+            self.assertIsNone(walmart_api.local_catalog)
+            self.assertEqual(walmart_api.get_walmart_search_results("milk"), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
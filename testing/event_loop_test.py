@@ -0,0 +1,47 @@
+import asyncio
+import threading
+import unittest
+
+from utils.event_loop import EventLoopThread
+
+
+class TestEventLoopThread(unittest.TestCase):
+    def setUp(self):
+        self.event_loop = EventLoopThread("test-event-loop")
+
+    def tearDown(self):
+        self.event_loop.stop()
+
+    def test_coroutines_share_one_loop(self):
+        async def running_loop():
+            return asyncio.get_running_loop()
+
+        loops = set()
+        threads = [threading.Thread(target=lambda: loops.add(self.event_loop.run(running_loop()))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(loops, {self.event_loop.loop})
+        with self.assertRaises(TimeoutError):
+            self.event_loop.run(asyncio.sleep(1), timeout=0.01)
+
+    def test_iterate_closes_the_generator_when_stopped_early(self):
+        closed = []
+
+        async def numbers():
+            try:
+                for i in range(10):
+                    yield i
+            finally:
+                closed.append(True)
+
+        for i in self.event_loop.iterate(numbers()):
+            if i == 2:
+                break
+        self.assertEqual(closed, [True])
+        self.assertEqual(list(self.event_loop.iterate(numbers())), list(range(10)))
+
+
+if __name__ == "__main__":
+    unittest.main()
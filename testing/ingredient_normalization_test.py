@@ -0,0 +1,31 @@
+import unittest
+
+from utils.ingredient_normalization import canonical_ingredient_name, group_ingredients, sum_quantities
+
+
+class TestIngredientNormalization(unittest.TestCase):
+    def test_canonical_names_drop_preparation_notes(self):
+        self.assertEqual(canonical_ingredient_name("Butter, softened"), "butter")
+        self.assertEqual(canonical_ingredient_name("2 cloves garlic (minced)"), canonical_ingredient_name("2 cloves garlic"))
+        self.assertEqual(canonical_ingredient_name("Finely Chopped Onions"), "onion")
+        # Product forms sold as such are kept.
+        self.assertEqual(canonical_ingredient_name("ground beef"), "ground beef")
+
+    def test_sum_quantities(self):
+        self.assertEqual(sum_quantities(["1 tsp", "1/2 teaspoon"]), "1 1/2 tsp")
+        self.assertEqual(sum_quantities(["1½ cups", "½ cup"]), "2 cup")
+        self.assertEqual(sum_quantities(["2 tbsp", "1 cup"]), "2 tbsp + 1 cup")
+        self.assertEqual(sum_quantities(["to taste", ""]), "to taste")
+        # Mixed units are summed per unit before joining.
+        self.assertEqual(sum_quantities(["1 can", "1 can", "2 cups"]), "2 can + 2 cup")
+        self.assertEqual(sum_quantities(["1 cup", "to taste", "1/2 cup", "to taste"]), "1 1/2 cup + to taste")
+
+    def test_group_ingredients_keeps_line_indices(self):
+        lines = [{"product": "salt", "quantity": "1 tsp"}, {"product": "flour", "quantity": "2 cups"},
+                 {"product": "Salt", "quantity": "1 tsp"}]
+        self.assertEqual(group_ingredients(lines, name_key="product"),
+                         [("salt", "2 tsp", [0, 2]), ("flour", "2 cups", [1])])
+
+
+if __name__ == "__main__":
+    unittest.main()
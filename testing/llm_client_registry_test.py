@@ -0,0 +1,36 @@
+import threading
+import unittest
+
+from agent_definitions.agent_utilities import get_client_wrapper_for_llm_api_provider
+from agent_definitions.agents.RecipeChatAgent import RecipeChatAgent
+from agent_definitions.agents.unified_cart_autofill_agent import UnifiedCartAutofillAgent
+
+
+class TestLLMClientRegistry(unittest.TestCase):
+    def test_agents_borrow_shared_clients(self):
+        first, second = RecipeChatAgent(), RecipeChatAgent()
+        self.assertIs(first.llm_api_wrapper, second.llm_api_wrapper)
+        self.assertIs(first.llm_api_wrapper, first.embedding_api_wrapper)
+        self.assertIs(UnifiedCartAutofillAgent().llm_api_wrapper,
+                      get_client_wrapper_for_llm_api_provider("openai", asynchronous=True))
+        self.assertIs(UnifiedCartAutofillAgent().walmart_api_wrapper, UnifiedCartAutofillAgent().walmart_api_wrapper)
+        # Conversations still keep their own message context.
+        first.context.append({"role": "user", "content": "hi"})
+        self.assertNotEqual(first.context, second.context)
+
+    def test_registry_is_keyed_by_credentials_and_thread_safe(self):
+        wrappers = []
+        threads = [threading.Thread(target=lambda: wrappers.append(
+            get_client_wrapper_for_llm_api_provider("openai", api_key="registry-test-key"))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(wrapper) for wrapper in wrappers}), 1)
+        self.assertIsNot(wrappers[0], get_client_wrapper_for_llm_api_provider("openai"))
+        with self.assertRaises(ValueError):
+            get_client_wrapper_for_llm_api_provider("unknown")
+
+
+if __name__ == "__main__":
+    unittest.main()
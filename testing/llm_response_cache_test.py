@@ -0,0 +1,135 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+
+from openai.types.chat.chat_completion_message import ChatCompletionMessage
+
+from agent_definitions.agent_utilities import AsyncOpenAIClientWrapper, OpenAIClientWrapper
+from utils.llm_response_cache import LLMResponseCache, llm_cache_key
+
+SELECT_TOOL = {"type": "function", "function": {"name": "select_best_item", "parameters": {"type": "object"}}}
+
+
+def tool_call_message(call_id, arguments='{"index": 2}'):
+    return ChatCompletionMessage.model_validate({
+        "role": "assistant", "content": None,
+        "tool_calls": [{"id": call_id, "type": "function",
+                        "function": {"name": "select_best_item", "arguments": arguments}}]})
+
+
+class FakeCompletions:
+    def __init__(self, finish_reason="tool_calls"):
+        self.finish_reason = finish_reason
+        self.calls = []
+
+    def create(self, **query_args):
+        self.calls.append(query_args)
+        return SimpleNamespace(choices=[SimpleNamespace(message=tool_call_message(f"call_{len(self.calls)}"),
+                                                        finish_reason=self.finish_reason)])
+
+
+class FakeAsyncCompletions(FakeCompletions):
+    async def create(self, **query_args):
+        return super().create(**query_args)
+
+
+class FakeAsyncClientWrapper(AsyncOpenAIClientWrapper):
+    client = None  # replaces the per-loop AsyncOpenAI client property
+
+
+class TestLLMResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "llm.sqlite3")
+        self.cache = LLMResponseCache(db_path=self.db_path)
+        self.context = [{"role": "system", "content": "Pick a product."}, {"role": "user", "content": "milk"}]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def make_wrapper(self, completions, **kwargs):
+        wrapper = OpenAIClientWrapper(api_key="test-key", response_cache=self.cache, **kwargs)
+        wrapper.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        return wrapper
+
+    def query(self, wrapper, **kwargs):
+        return wrapper.query(model="gpt-4o-mini", context=list(self.context), tools=[SELECT_TOOL],
+                             tool_choice="required", parallel_tool_calls=False, **kwargs)
+
+    def test_key_ignores_message_representation_and_tool_call_ids(self):
+        def query_args(call_id, as_object):
+            message = tool_call_message(call_id)
+            return {"model": "gpt-4o-mini", "temperature": 0.0, "messages": [
+                self.context[1], message if as_object else message.model_dump(),
+                {"role": "tool", "tool_call_id": call_id, "content": "ok"}]}
+
+        self.assertEqual(llm_cache_key(query_args("call_abc", True)), llm_cache_key(query_args("call_xyz", False)))
+        self.assertNotEqual(llm_cache_key(query_args("call_abc", True)),
+                            llm_cache_key(dict(query_args("call_abc", True), model="gpt-4o")))
+
+    def test_temperature_zero_queries_are_replayed(self):
+        completions = FakeCompletions()
+        wrapper = self.make_wrapper(completions)
+        first = self.query(wrapper, temperature=0.0)
+        second = self.query(wrapper, temperature=0.0)
+        self.assertEqual(len(completions.calls), 1)
+        self.assertEqual(completions.calls[0]["temperature"], 0.0)
+        self.assertIsInstance(second, ChatCompletionMessage)
+        self.assertEqual(second, first)
+        self.assertIsNot(second, first)
+        self.assertEqual(self.cache.get_stats()["hit_rate"], 0.5)
+
+        # The disk tier serves a new process (here, a new cache on the same file).
+        self.cache = LLMResponseCache(db_path=self.db_path)
+        self.assertEqual(self.query(self.make_wrapper(completions), temperature=0.0), first)
+        self.assertEqual(len(completions.calls), 1)
+        self.assertEqual(self.cache.get_stats()["disk_hits"], 1)
+
+    def test_uncacheable_queries_reach_the_api(self):
+        completions = FakeCompletions()
+        wrapper = self.make_wrapper(completions)
+        self.query(wrapper, temperature=1.0)
+        self.query(wrapper, temperature=1.0)
+        self.query(wrapper, temperature=0.0, use_cache=False)
+        self.query(wrapper, temperature=0.0, use_cache=False)
+        self.assertEqual(len(completions.calls), 4)
+        self.query(self.make_wrapper(completions, use_response_cache=False), temperature=0.0)
+        self.query(self.make_wrapper(completions, use_response_cache=False), temperature=0.0)
+        self.assertEqual(len(completions.calls), 6)
+
+        truncated = FakeCompletions(finish_reason="length")
+        wrapper = self.make_wrapper(truncated)
+        self.query(wrapper, temperature=0.0)
+        self.query(wrapper, temperature=0.0)
+        self.assertEqual(len(truncated.calls), 2)
+        self.assertEqual(self.cache.get_stats()["writes"], 0)
+
+    def test_async_wrapper_shares_the_cache(self):
+        completions = FakeCompletions()
+        self.query(self.make_wrapper(completions), temperature=0.0)
+
+        # A new process: the response is only on disk, which is read off the event loop.
+        self.cache = LLMResponseCache(db_path=self.db_path)
+        disk_threads = []
+        disk_get = self.cache.disk.get
+        self.cache.disk.get = lambda cache_key: disk_threads.append(threading.current_thread()) or disk_get(cache_key)
+
+        async_completions = FakeAsyncCompletions()
+        wrapper = FakeAsyncClientWrapper(api_key="test-key", response_cache=self.cache)
+        wrapper.client = SimpleNamespace(chat=SimpleNamespace(completions=async_completions))
+
+        async def main():
+            return await self.query(wrapper, temperature=0.0), threading.current_thread()
+
+        message, loop_thread = asyncio.run(main())
+        self.assertEqual(message.tool_calls[0].function.arguments, '{"index": 2}')
+        self.assertEqual(async_completions.calls, [])
+        self.assertEqual(len(disk_threads), 1)
+        self.assertIsNot(disk_threads[0], loop_thread)
+
+
+if __name__ == "__main__":
+    unittest.main()
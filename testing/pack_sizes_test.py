@@ -0,0 +1,44 @@
+import unittest
+
+from services.cart_service import create_cart_url
+from utils.cart_records import CartItem, CartProduct
+from utils.pack_sizes import package_amount, packages_for_cart, packages_to_buy, recipe_amount
+
+
+class TestPackSizes(unittest.TestCase):
+    def test_parses_recipe_quantities_and_package_sizes(self):
+        self.assertEqual(recipe_amount("2 1/2 cups").dimension, "ml")
+        self.assertAlmostEqual(recipe_amount("2 1/2 cups").value, 591.47)
+        self.assertEqual(recipe_amount("3 large"), ("count", 3.0))
+        self.assertIsNone(recipe_amount("to taste"))
+        self.assertAlmostEqual(package_amount("12 x 12 fl oz").value, 12 * 12 * 29.5735)
+        self.assertEqual(package_amount(None, "Great Value Large White Eggs, 12 Count"), ("count", 12.0))
+        self.assertIsNone(package_amount(None, "Fresh Banana, Each"))
+
+    def test_packages_to_buy(self):
+        self.assertEqual(packages_to_buy("1 lb", "ground beef", "16 oz"), 1)
+        self.assertEqual(packages_to_buy("4 lb", "chicken breasts", "2.5 lb"), 2)
+        # Volume to mass through the density of flour.
+        self.assertEqual(packages_to_buy("16 cups", "all-purpose flour", "2 lb"), 3)
+        # Count to mass through the weight of an onion.
+        self.assertEqual(packages_to_buy("8", "onions", "3 lb"), 1)
+        self.assertEqual(packages_to_buy("18", "eggs", None, "Large White Eggs, 12 Count"), 2)
+        self.assertEqual(packages_to_buy("3", "bananas", None, "Fresh Banana, Each"), 3)
+        self.assertEqual(packages_to_buy("2 cans", "black beans", "15 oz"), 2)
+        self.assertEqual(packages_to_buy("to taste", "salt", "26 oz"), 1)
+        self.assertEqual(packages_to_buy("6 cups", "mystery powder", "8 oz"), 1)
+        # Summed quantities with mixed units add up each part's packages before rounding up.
+        self.assertEqual(packages_to_buy("1 can + 2 cup", "black beans", "15 oz"), 2)
+        self.assertEqual(packages_to_buy("1 lb + 8 oz", "ground beef", "1 lb"), 2)
+
+    def test_whole_cart(self):
+        lines = [("2 cups", "milk", "0.5 gal", None), ("1 gal", "milk", "0.5 gal", None), ("2 cups", "milk", "0.5 gal", None)]
+        self.assertEqual(packages_for_cart(lines), [1, 2, 1])
+
+        eggs = CartProduct.from_item({"itemId": 5, "name": "Eggs", "size": "12 ct"})
+        cart_url = create_cart_url([CartItem(eggs, "30", [], "eggs", "30")])
+        self.assertEqual(cart_url, "https://www.walmart.com/cart?items=5:3:walmart")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import json
+import unittest
+from unittest import mock
+
+from utils import product_records
+from utils.product_records import ProductRecord, parse_search_response, prompt_props
+from walmart_affiliate_api_utils import filter_walmart_search_result_props
+
+SEARCH_RESPONSE = json.dumps({"query": "corn", "items": [
+    {"itemId": 1, "name": "Corn", "salePrice": 1.5, "size": "15 oz", "stock": "Available",
+     "offerType": "ONLINE_AND_STORE", "longDescription": "x" * 100, "imageEntities": [{"entityType": "PRIMARY"}]},
+    {"itemId": 2, "name": "Corn Online", "salePrice": 2, "stock": "Available", "offerType": "ONLINE_ONLY"},
+    {"itemId": 3, "name": "Corn Out", "salePrice": 3.0, "stock": "Not available", "offerType": "STORE_ONLY"},
+    {"itemId": 4, "name": "Corn Store", "stock": "Available", "offerType": "STORE_ONLY"},
+]})
+
+
+class TestParseSearchResponse(unittest.TestCase):
+    def test_matches_the_json_loads_path(self):
+        expected = filter_walmart_search_result_props(json.loads(SEARCH_RESPONSE)["items"])
+        self.assertEqual([prompt_props(record) for record in parse_search_response(SEARCH_RESPONSE)], expected)
+
+    def test_records_are_typed_and_unfiltered_on_request(self):
+        records = parse_search_response(SEARCH_RESPONSE, available_only=False)
+        self.assertEqual([record.itemId for record in records], [1, 2, 3, 4])
+        self.assertIsInstance(records[0], ProductRecord)
+        self.assertEqual(records[0].size, "15 oz")
+
+    def test_fallback_decoder_gives_the_same_records(self):
+        records = parse_search_response(SEARCH_RESPONSE, available_only=False)
+        with mock.patch.object(product_records, "_decode_items", product_records._project_items):
+            self.assertEqual(parse_search_response(SEARCH_RESPONSE, available_only=False), records)
+
+    def test_malformed_responses_are_empty(self):
+        for response_text in ["", "not json", "[]", '{"items": null}', '{"errors": [{"code": 4003}]}']:
+            self.assertEqual(parse_search_response(response_text), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
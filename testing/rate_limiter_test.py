@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from utils.rate_limiter import RateLimiter, RateLimiterTimeout
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_token_bucket_paces_requests_after_the_burst(self):
+        limiter = RateLimiter(rate_per_second=50, burst=2, initial_concurrency=4, max_concurrency=4)
+        started_at = time.monotonic()
+        for _ in range(7):
+            with limiter.limit() as permit:
+                permit.record(200)
+        # Two requests use the burst; the other five wait ~20ms each for a token.
+        self.assertGreaterEqual(time.monotonic() - started_at, 0.08)
+        self.assertEqual(limiter.get_stats()["acquired"], 7)
+
+    def test_concurrency_is_capped_and_waiters_queue(self):
+        limiter = RateLimiter(rate_per_second=1000, burst=100, initial_concurrency=2, max_concurrency=2)
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def worker():
+            with limiter.limit() as permit:
+                with lock:
+                    active.append(1)
+                    peak.append(len(active))
+                time.sleep(0.02)
+                with lock:
+                    active.pop()
+                permit.record(200)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = limiter.get_stats()
+        self.assertLessEqual(max(peak), 2)
+        self.assertEqual(stats["acquired"], 8)
+        self.assertGreater(stats["peak_queue_depth"], 1)
+        self.assertEqual(stats["queue_depth"], 0)
+
+    def test_throttled_response_halves_the_limit(self):
+        limiter = RateLimiter(rate_per_second=1000, burst=100, initial_concurrency=8)
+        with limiter.limit() as permit:
+            permit.record(429)
+        stats = limiter.get_stats()
+        self.assertEqual(stats["concurrency_limit"], 4)
+        self.assertEqual(stats["throttled_responses"], 1)
+
+    def test_successes_increase_the_limit(self):
+        limiter = RateLimiter(rate_per_second=1000, burst=100, initial_concurrency=2, max_concurrency=4)
+        for _ in range(10):
+            with limiter.limit() as permit:
+                permit.record(200)
+        self.assertGreater(limiter.get_stats()["concurrency_limit"], 2)
+
+    def test_timeout_leaves_the_queue(self):
+        limiter = RateLimiter(rate_per_second=1000, burst=100, initial_concurrency=1, max_concurrency=1)
+        permit = limiter.acquire()
+        with self.assertRaises(RateLimiterTimeout):
+            limiter.acquire(timeout=0.02)
+        limiter.release(permit)
+        self.assertEqual(limiter.get_stats()["queue_depth"], 0)
+
+    def test_async_waiters_share_the_limit(self):
+        limiter = RateLimiter(rate_per_second=1000, burst=100, initial_concurrency=3, max_concurrency=3)
+
+        async def request():
+            async with limiter.limit_async() as permit:
+                await asyncio.sleep(0.01)
+                permit.record(200)
+
+        async def main():
+            await asyncio.gather(*(request() for _ in range(12)))
+
+        asyncio.run(main())
+        stats = limiter.get_stats()
+        self.assertEqual(stats["acquired"], 12)
+        self.assertLessEqual(stats["peak_in_flight"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
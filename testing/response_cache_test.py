@@ -0,0 +1,134 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from utils.response_cache import PersistentResponseCache
+from walmart_affiliate_api_utils import AsyncWalmartAPI, WalmartAPI
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+
+
+class CountingTransport:
+    def __init__(self):
+        self.request_count = 0
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        self.request_count += 1
+        return FakeResponse(json.dumps({"query": params["query"], "version": self.request_count}))
+
+
+class CountingAsyncTransport(CountingTransport):
+    async def get(self, url, headers=None, params=None, timeout=None):
+        return super().get(url, headers=headers, params=params, timeout=timeout)
+
+
+class ThreadRecordingCache(PersistentResponseCache):
+    """Records the threads its SQLite reads and writes run on."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = []
+
+    def get(self, cache_key):
+        self.threads.append(threading.current_thread())
+        return super().get(cache_key)
+
+    def set(self, cache_key, kind, value):
+        self.threads.append(threading.current_thread())
+        super().set(cache_key, kind, value)
+
+
+class FakeSigner:
+    def get_headers(self):
+        return {}
+
+
+class TestPersistentResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "responses.sqlite3")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_entries_survive_reopening(self):
+        PersistentResponseCache(db_path=self.db_path).set(("search", "milk"), "search", "{}")
+        cached_response = PersistentResponseCache(db_path=self.db_path).get(("search", "milk"))
+        self.assertEqual(cached_response.value, "{}")
+        self.assertFalse(cached_response.is_stale)
+
+    def test_fresh_stale_and_expired(self):
+        response_cache = PersistentResponseCache(db_path=self.db_path, ttls={"search": (0.01, 0.05)})
+        response_cache.set(("search", "milk"), "search", "{}")
+        time.sleep(0.02)
+        self.assertTrue(response_cache.get(("search", "milk")).is_stale)
+        time.sleep(0.04)
+        self.assertIsNone(response_cache.get(("search", "milk")))
+        self.assertEqual(response_cache.purge(expired_only=True), 1)
+
+    def test_lru_eviction(self):
+        response_cache = PersistentResponseCache(db_path=self.db_path, max_entries=2)
+        for term in ("a", "b", "c"):
+            response_cache.set(("search", term), "search", "{}")
+            time.sleep(0.001)
+        response_cache.get(("search", "a"))
+        self.assertEqual(response_cache.evict(), 1)
+        self.assertIsNone(response_cache.get(("search", "b")))
+
+    def test_hits_write_access_times_in_batches(self):
+        response_cache = PersistentResponseCache(db_path=self.db_path)
+        response_cache.set(("search", "milk"), "search", "{}")
+
+        def last_access():
+            return response_cache._connection().execute("SELECT last_access FROM responses").fetchone()[0]
+
+        stored_at = last_access()
+        time.sleep(0.01)
+        response_cache.get(("search", "milk"))
+        self.assertEqual(last_access(), stored_at)
+        response_cache.flush_accesses()
+        self.assertGreater(last_access(), stored_at)
+
+    def test_async_client_uses_sqlite_off_the_event_loop(self):
+        walmart_api = AsyncWalmartAPI("consumer", "1", "unused", transport=CountingAsyncTransport(),
+                                      use_search_cache=False, use_rate_limiter=False)
+        walmart_api.signer = FakeSigner()
+        walmart_api.response_cache = ThreadRecordingCache(db_path=self.db_path)
+
+        async def main():
+            first_response = await walmart_api.get_walmart_search_results("butter")
+            return first_response, await walmart_api.get_walmart_search_results("butter"), threading.current_thread()
+
+        first_response, second_response, loop_thread = asyncio.run(main())
+        self.assertEqual(first_response, second_response)
+        self.assertEqual(walmart_api.transport.request_count, 1)
+        self.assertEqual(len(walmart_api.response_cache.threads), 3)  # miss, store, hit
+        self.assertNotIn(loop_thread, walmart_api.response_cache.threads)
+
+    def test_stale_search_is_served_then_revalidated(self):
+        transport = CountingTransport()
+        walmart_api = WalmartAPI("consumer", "1", "unused", transport=transport, use_search_cache=False)
+        walmart_api.signer = FakeSigner()
+        walmart_api.response_cache = PersistentResponseCache(db_path=self.db_path, ttls={"search": (0.01, 60)})
+
+        first_response = walmart_api.get_walmart_search_results("butter")
+        time.sleep(0.02)
+        self.assertEqual(walmart_api.get_walmart_search_results("butter"), first_response)
+        for _ in range(100):
+            if transport.request_count == 2 and not walmart_api.response_cache._revalidating:
+                break
+            time.sleep(0.01)
+        self.assertEqual(transport.request_count, 2)
+        self.assertNotEqual(walmart_api.get_walmart_search_results("butter"), first_response)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import json
+import time
+import unittest
+
+from utils.search_cache import TTLLRUCache, normalize_query, search_cache_key
+from walmart_affiliate_api_utils import WalmartAPI
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+
+
+class CountingTransport:
+    def __init__(self):
+        self.request_count = 0
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        self.request_count += 1
+        return FakeResponse(json.dumps({"query": params["query"], "items": [{"itemId": self.request_count}]}))
+
+
+class FakeSigner:
+    def get_headers(self):
+        return {}
+
+
+class TestNormalizeQuery(unittest.TestCase):
+    def test_equivalent_queries_share_a_key(self):
+        self.assertEqual(normalize_query("Chicken%20Breasts "), "chicken breast")
+        self.assertEqual(normalize_query("  chicken   breast"), "chicken breast")
+        self.assertEqual(normalize_query("chicken+breasts"), "chicken breast")
+
+    def test_plural_rules(self):
+        self.assertEqual(normalize_query("eggs"), "egg")
+        self.assertEqual(normalize_query("Tomatoes"), "tomato")
+        self.assertEqual(normalize_query("strawberries"), "strawberry")
+        self.assertEqual(normalize_query("peaches"), "peach")
+        self.assertEqual(normalize_query("asparagus"), "asparagus")
+        self.assertEqual(normalize_query("molasses"), "molasses")
+        self.assertEqual(normalize_query("swiss cheese"), "swiss cheese")
+
+    def test_search_params_are_part_of_the_key(self):
+        self.assertNotEqual(search_cache_key("salt"), search_cache_key("salt", categoryId="976759"))
+        self.assertEqual(search_cache_key("salt", categoryId=None), search_cache_key("Salt"))
+
+
+class TestTTLLRUCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = TTLLRUCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get_stats()["evictions"], 1)
+
+    def test_ttl_expiry(self):
+        cache = TTLLRUCache(maxsize=2, ttl=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get_stats()["expirations"], 1)
+
+
+class TestWalmartAPISearchCache(unittest.TestCase):
+    def test_repeat_searches_are_served_from_cache(self):
+        transport = CountingTransport()
+        walmart_api = WalmartAPI("consumer", "1", "unused", transport=transport, use_response_cache=False)
+        walmart_api.signer = FakeSigner()
+        walmart_api.search_cache = TTLLRUCache(maxsize=8, ttl=60)
+
+        first_response = walmart_api.get_walmart_search_results("Butter")
+        self.assertEqual(walmart_api.get_walmart_search_results("butter "), first_response)
+        self.assertEqual(transport.request_count, 1)
+        self.assertEqual(walmart_api.get_search_cache_stats()["hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+
+from utils.single_flight import AsyncSingleFlight, SingleFlight
+from walmart_affiliate_api_utils import AsyncWalmartAPI, WalmartAPI
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+
+
+class SlowTransport:
+    def __init__(self):
+        self.request_count = 0
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        self.request_count += 1
+        time.sleep(0.05)
+        return FakeResponse(json.dumps({"query": params["query"], "items": []}))
+
+
+class SlowAsyncTransport:
+    def __init__(self):
+        self.request_count = 0
+
+    async def get(self, url, headers=None, params=None, timeout=None):
+        self.request_count += 1
+        await asyncio.sleep(0.05)
+        return FakeResponse(json.dumps({"query": params["query"], "items": []}))
+
+
+class FakeSigner:
+    def get_headers(self):
+        return {}
+
+
+def build_api(api_class, transport):
+    walmart_api = api_class("consumer", "1", "unused", transport=transport, use_search_cache=False,
+                            use_response_cache=False, use_rate_limiter=False)
+    walmart_api.signer = FakeSigner()
+    return walmart_api
+
+
+def failing_call():
+    raise ValueError("boom")
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_errors_are_shared_and_the_key_is_released(self):
+        single_flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            single_flight.do("key", failing_call)
+        self.assertEqual(single_flight.do("key", lambda: 1), 1)
+        self.assertEqual(single_flight.get_stats()["in_flight"], 0)
+
+    def test_concurrent_sync_searches_share_one_request(self):
+        transport = SlowTransport()
+        walmart_api = build_api(WalmartAPI, transport)
+        walmart_api.search_single_flight = SingleFlight()
+        results = []
+        threads = [
+            threading.Thread(target=lambda term=term: results.append(walmart_api.get_walmart_search_results(term)))
+            for term in ["ground beef", "Ground Beef", "ground  beef ", "ground beef"]
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(transport.request_count, 1)
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(walmart_api.get_single_flight_stats()["coalesced"], 3)
+
+    def test_concurrent_async_searches_share_one_request(self):
+        transport = SlowAsyncTransport()
+        walmart_api = build_api(AsyncWalmartAPI, transport)
+        walmart_api.search_single_flight = AsyncSingleFlight()
+
+        async def main():
+            return await asyncio.gather(*(
+                walmart_api.get_walmart_search_results(term) for term in ["ground beef"] * 5 + ["onions"]
+            ))
+
+        results = asyncio.run(main())
+        self.assertEqual(transport.request_count, 2)
+        self.assertEqual(len(set(results[:5])), 1)
+        self.assertEqual(walmart_api.get_single_flight_stats()["coalesced"], 4)
+
+    def test_cancelling_the_leader_leaves_followers_waiting(self):
+        single_flight = AsyncSingleFlight()
+        started = []
+
+        async def slow_call():
+            started.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        async def main():
+            leader = asyncio.create_task(single_flight.do("key", slow_call))
+            follower = asyncio.create_task(single_flight.do("key", slow_call))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await leader
+            return await follower
+
+        self.assertEqual(asyncio.run(main()), "result")
+        self.assertEqual(len(started), 1)
+
+    def test_call_is_cancelled_once_every_caller_is(self):
+        single_flight = AsyncSingleFlight()
+        cancelled = []
+
+        async def slow_call():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+            return "stale"
+
+        async def fast_call():
+            return "fresh"
+
+        async def main():
+            callers = [asyncio.create_task(single_flight.do("key", slow_call)) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            for caller in callers:
+                caller.cancel()
+            await asyncio.gather(*callers, return_exceptions=True)
+            # A later caller starts a new call rather than joining the cancelled one.
+            result = await single_flight.do("key", fast_call)
+            await asyncio.sleep(0)
+            return result
+
+        self.assertEqual(asyncio.run(main()), "fresh")
+        self.assertEqual(cancelled, [1])
+        self.assertEqual(single_flight.get_stats()["in_flight"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+import unittest
+
+from utils.taxonomy_index import TaxonomyIndex
+from walmart_affiliate_api_utils import WalmartAPI
+
+TAXONOMY = {
+    "categories": [
+        {"id": "976759", "name": "Food", "children": [
+            {"id": "976759_976780", "name": "Baking", "children": [
+                {"id": "976759_976780_1", "name": "Spices & Seasonings"},
+                {"id": "976759_976780_2", "name": "Flour"},
+            ]},
+            {"id": "976759_9176907", "name": "Dairy & Eggs", "children": [
+                {"id": "976759_9176907_1", "name": "Milk"},
+                {"id": "976759_9176907_2", "name": "Eggs"},
+            ]},
+            {"id": "976759_9569500", "name": "Meat & Seafood", "children": [
+                {"id": "976759_9569500_1", "name": "Chicken"},
+            ]},
+        ]},
+        {"id": "3944", "name": "Electronics", "children": [
+            {"id": "3944_1", "name": "Milk Frothers"},
+        ]},
+    ]
+}
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+
+
+class RecordingTransport:
+    def __init__(self):
+        self.requested_params = []
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        self.requested_params.append(params)
+        return FakeResponse(json.dumps({"items": []}))
+
+
+class FakeSigner:
+    def get_headers(self):
+        return {}
+
+
+class TestTaxonomyIndex(unittest.TestCase):
+    def setUp(self):
+        self.taxonomy_index = TaxonomyIndex.from_taxonomy(TAXONOMY)
+
+    def test_lookup_prefers_specific_grocery_categories(self):
+        self.assertEqual(self.taxonomy_index.lookup_category("whole milk")["id"], "976759_9176907_1")
+        self.assertEqual(self.taxonomy_index.lookup_category("Large Eggs")["name"], "Eggs")
+        self.assertEqual(self.taxonomy_index.lookup_category("boneless chicken breasts")["name"], "Chicken")
+
+    def test_hints_map_ingredients_to_categories(self):
+        category = self.taxonomy_index.lookup_category("fresh thyme")
+        self.assertEqual(category["path"], "Food/Baking/Spices & Seasonings")
+        self.assertIsNone(self.taxonomy_index.lookup_category("dish soap"))
+        # Hints match whole phrases: a bell pepper is not a spice.
+        self.assertEqual(self.taxonomy_index.lookup_category("ground black pepper")["name"], "Spices & Seasonings")
+        self.assertIsNone(self.taxonomy_index.lookup_category("bell pepper"))
+
+    def test_save_and_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "taxonomy.json")
+            self.taxonomy_index.save(path)
+            loaded_index = TaxonomyIndex.load(path)
+        self.assertEqual(len(loaded_index), len(self.taxonomy_index))
+        self.assertEqual(loaded_index.lookup_category("milk"), self.taxonomy_index.lookup_category("milk"))
+
+    def test_category_id_is_sent_and_cached_separately(self):
+        transport = RecordingTransport()
+        walmart_api = WalmartAPI("consumer", "1", "unused", transport=transport, use_search_cache=False,
+                                 use_response_cache=False, use_rate_limiter=False)
+        walmart_api.signer = FakeSigner()
+        walmart_api.get_walmart_search_results("thyme", category_id="976759_976780_1")
+        walmart_api.get_walmart_search_results("thyme")
+        self.assertEqual(transport.requested_params,
+                         [{"query": "thyme", "categoryId": "976759_976780_1"}, {"query": "thyme"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
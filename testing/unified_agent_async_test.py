@@ -0,0 +1,124 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from openai.types.chat import ChatCompletionMessage, ChatCompletionMessageToolCall
+from openai.types.chat.chat_completion_message_tool_call import Function
+
+from agent_definitions.agent_utilities import AsyncOpenAIClientWrapper
+from agent_definitions.agents.unified_cart_autofill_agent import UnifiedCartAutofillAgent
+
+LLM_LATENCY = 0.05
+
+
+class FakeWalmartAPIWrapper:
+    async def get_walmart_search_results(self, term, **search_options):
+        return json.dumps({"items": [{"itemId": i, "name": f"{term} {i}", "size": "1 lb"} for i in (1, 2, 3)]})
+
+
+class FakeAsyncLLMWrapper(AsyncOpenAIClientWrapper):
+    """Always selects itemId 2 after a delay, recording the thread each query ran on."""
+
+    def __init__(self):
+        super().__init__(api_key="unused")
+        self.query_threads = []
+
+    async def query(self, model, context, **query_options):
+        self.query_threads.append(threading.get_ident())
+        await asyncio.sleep(LLM_LATENCY)
+        arguments = json.dumps({"rationale": "Closest match.", "itemId": 2})
+        return ChatCompletionMessage(role="assistant", tool_calls=[ChatCompletionMessageToolCall(
+            id="call_1", type="function", function=Function(name="select_best_item", arguments=arguments))])
+
+
+class TestUnifiedAgentOnEventLoop(unittest.TestCase):
+    def test_selections_run_concurrently_on_the_event_loop(self):
+        agent = UnifiedCartAutofillAgent(use_category_search=False)
+        agent.walmart_api_wrapper = FakeWalmartAPIWrapper()
+        agent.llm_api_wrapper = FakeAsyncLLMWrapper()
+        shopping_list = [{"product": name, "quantity": "2 lb"} for name in ("ground beef", "potatoes", "carrots", "onions")]
+
+        start = time.perf_counter()
+        cart = asyncio.run(agent.get_cart_from_shopping_list(shopping_list))
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual([(item["itemId"], item["quantity"]) for item in cart], [(2, 2)] * len(shopping_list))
+        # Every LLM call ran on the event loop's thread, and they overlapped.
+        self.assertEqual(set(agent.llm_api_wrapper.query_threads), {threading.get_ident()})
+        self.assertLess(elapsed, LLM_LATENCY * len(shopping_list))
+
+
+class ScopedSearchWalmartAPIWrapper:
+    """A category that only holds black pepper, and no unscoped results for "unobtainium"."""
+
+    def __init__(self):
+        self.searches = []
+
+    async def get_taxonomy_index(self):
+        return SimpleNamespace(lookup_category=lambda term: {"id": "spices", "path": "Food/Spices"})
+
+    async def get_walmart_search_results(self, term, **search_options):
+        self.searches.append((term, search_options.get("category_id")))
+        if term == "unobtainium":
+            return ""
+        if search_options.get("category_id"):
+            return json.dumps({"items": [{"itemId": 1, "name": "Great Value Ground Black Pepper, 3 oz"}]})
+        return json.dumps({"items": [{"itemId": 2, "name": "Fresh Green Bell Pepper, Each"}]})
+
+
+class TestScopedSearchFallback(unittest.TestCase):
+    def test_irrelevant_or_empty_scoped_results_fall_back_to_an_unscoped_search(self):
+        agent = UnifiedCartAutofillAgent()
+        agent.walmart_api_wrapper = ScopedSearchWalmartAPIWrapper()
+        agent.llm_api_wrapper = FakeAsyncLLMWrapper()
+        selection = asyncio.run(agent.process_shopping_list_item({"product": "bell pepper", "quantity": "2"}, []))
+        self.assertEqual(agent.walmart_api_wrapper.searches, [("bell pepper", "spices"), ("bell pepper", None)])
+        self.assertEqual(selection["itemId"], 2)
+
+        # An empty response is no results, not a JSON error.
+        selection = asyncio.run(agent.process_shopping_list_item({"product": "unobtainium", "quantity": "1"}, []))
+        self.assertEqual(selection["quantity"], 0)
+
+    def test_relevance_check_splits_hyphenated_words(self):
+        match = UnifiedCartAutofillAgent.results_match_search_term
+        self.assertTrue(match([{"name": "Gold Medal All Purpose Flour, 5 lb"}], "all-purpose flour"))
+        self.assertTrue(match([{"name": "Great Value All-Purpose Flour, 5 lb"}], "all purpose flour"))
+        self.assertTrue(match([{"name": "Land O'Lakes Salted Butter"}], "land o lakes butter"))
+        self.assertFalse(match([{"name": "Great Value Self-Rising Flour"}], "all-purpose flour"))
+
+
+class RecordingWalmartAPIWrapper(FakeWalmartAPIWrapper):
+    def __init__(self):
+        self.search_options = []
+
+    async def get_walmart_search_results(self, term, **search_options):
+        self.search_options.append(search_options)
+        return await super().get_walmart_search_results(term, **search_options)
+
+
+class TestPerItemSearchState(unittest.TestCase):
+    def test_store_and_page_offsets_do_not_leak_between_items(self):
+        agent = UnifiedCartAutofillAgent(use_category_search=False, search_page_size=8)
+        agent.walmart_api_wrapper = RecordingWalmartAPIWrapper()
+        agent.llm_api_wrapper = FakeAsyncLLMWrapper()
+        item = {"product": "milk", "quantity": "1 gal"}
+
+        async def main():
+            # A retry of the same item with the same term pages forward...
+            next_search_start = {}
+            await agent.process_shopping_list_item(item, [], store_id="100", next_search_start=next_search_start)
+            await agent.process_shopping_list_item(item, [], retry_count=1, store_id="100",
+                                                   next_search_start=next_search_start)
+            # ...while another item (or request) sharing the agent starts afresh, without the first one's store.
+            await agent.process_shopping_list_item(item, [])
+
+        asyncio.run(main())
+        self.assertEqual(agent.walmart_api_wrapper.search_options, [
+            {"num_items": 8, "store_id": "100"}, {"num_items": 8, "start": 9, "store_id": "100"}, {"num_items": 8}])
+
+
+if __name__ == "__main__":
+    unittest.main()
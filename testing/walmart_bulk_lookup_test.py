@@ -0,0 +1,79 @@
+import asyncio
+import json
+import unittest
+
+from walmart_affiliate_api_utils import AsyncWalmartAPI, WALMART_LOOKUP_MAX_IDS, WalmartAPI, chunk_item_ids
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+
+
+def items_response(params, known_ids):
+    requested_ids = params["ids"].split(",")
+    items = [{"itemId": int(item_id), "name": f"Item {item_id}"} for item_id in requested_ids if item_id in known_ids]
+    return FakeResponse(json.dumps({"items": items}))
+
+
+class FakeTransport:
+    def __init__(self, known_ids):
+        self.known_ids = known_ids
+        self.requested_params = []
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        self.requested_params.append(params)
+        return items_response(params, self.known_ids)
+
+
+class FakeAsyncTransport(FakeTransport):
+    async def get(self, url, headers=None, params=None, timeout=None):
+        self.requested_params.append(params)
+        return items_response(params, self.known_ids)
+
+
+class FakeSigner:
+    def get_headers(self):
+        return {}
+
+
+class TestBulkLookup(unittest.TestCase):
+    def setUp(self):
+        self.item_ids = list(range(1000, 1045))
+        self.known_ids = {str(item_id) for item_id in self.item_ids if item_id % 10 != 0}
+
+    def test_chunk_item_ids_deduplicates_and_splits(self):
+        chunks = chunk_item_ids([1, "1", 2, 3] + list(range(4, 30)))
+        self.assertEqual(chunks[0][:3], ["1", "2", "3"])
+        self.assertTrue(all(len(chunk) <= WALMART_LOOKUP_MAX_IDS for chunk in chunks))
+        self.assertEqual(sum(len(chunk) for chunk in chunks), 29)
+
+    def test_sync_bulk_lookup_merges_and_reports_missing(self):
+        transport = FakeTransport(self.known_ids)
+        walmart_api = WalmartAPI("consumer", "1", "unused", transport=transport, use_response_cache=False)
+        walmart_api.signer = FakeSigner()
+
+        result = walmart_api.lookup_walmart_products(self.item_ids + self.item_ids[:5], storeId=5260)
+
+        self.assertEqual(len(transport.requested_params), 3)
+        self.assertTrue(all(params["storeId"] == 5260 for params in transport.requested_params))
+        self.assertEqual([str(item["itemId"]) for item in result["items"]],
+                         [str(item_id) for item_id in self.item_ids if str(item_id) in self.known_ids])
+        self.assertEqual(result["missing_ids"], ["1000", "1010", "1020", "1030", "1040"])
+
+    def test_async_bulk_lookup_matches_sync_result(self):
+        sync_api = WalmartAPI("consumer", "1", "unused", transport=FakeTransport(self.known_ids),
+                              use_response_cache=False)
+        sync_api.signer = FakeSigner()
+        async_api = AsyncWalmartAPI("consumer", "1", "unused", transport=FakeAsyncTransport(self.known_ids),
+                                    use_response_cache=False)
+        async_api.signer = FakeSigner()
+
+        async_result = asyncio.run(async_api.lookup_walmart_products(self.item_ids, zipCode="72701"))
+
+        self.assertEqual(async_result, sync_api.lookup_walmart_products(self.item_ids, zipCode="72701"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import base64
+import os
+import tempfile
+import time
+import unittest
+
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+
+from utils.walmart_signing import WalmartRequestSigner
+
+
+def write_private_key(path):
+    """Write a fresh RSA private key to `path` and return it."""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    with open(path, "wb") as key_file:
+        key_file.write(private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.TraditionalOpenSSL,
+            encryption_algorithm=serialization.NoEncryption(),
+        ))
+    return private_key
+
+
+class TestWalmartRequestSigner(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.key_path = os.path.join(self.temp_dir.name, "rsa_key")
+        self.private_key = write_private_key(self.key_path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_signature_verifies_against_public_key(self):
+        signer = WalmartRequestSigner("consumer", "1", self.key_path)
+        headers = signer.sign(timestamp="1700000000000")
+        canonicalized_str = "consumer\n1700000000000\n1\n"
+        # Raises InvalidSignature if the header was not signed with the key on disk.
+        self.private_key.public_key().verify(
+            base64.b64decode(headers["WM_SEC.AUTH_SIGNATURE"]),
+            canonicalized_str.encode("utf-8"),
+            padding.PKCS1v15(),
+            hashes.SHA256()
+        )
+
+    def test_key_is_parsed_once_and_headers_are_reused(self):
+        signer = WalmartRequestSigner("consumer", "1", self.key_path, reuse_fraction=0.5)
+        first_headers = signer.get_headers()
+        for _ in range(10):
+            self.assertEqual(signer.get_headers(), first_headers)
+        stats = signer.get_stats()
+        self.assertEqual(stats["key_loads"], 1)
+        self.assertEqual(stats["signatures"], 1)
+        self.assertEqual(stats["reused_headers"], 10)
+
+    def test_zero_reuse_fraction_signs_every_call_without_reloading_key(self):
+        signer = WalmartRequestSigner("consumer", "1", self.key_path, reuse_fraction=0.0)
+        for _ in range(3):
+            signer.get_headers()
+        stats = signer.get_stats()
+        self.assertEqual(stats["key_loads"], 1)
+        self.assertEqual(stats["signatures"], 3)
+
+    def test_key_is_reloaded_when_file_changes(self):
+        signer = WalmartRequestSigner("consumer", "1", self.key_path, reuse_fraction=0.0)
+        signer.get_headers()
+        write_private_key(self.key_path)
+        # Make sure the modification time moves even on coarse-grained filesystems.
+        future = time.time() + 5
+        os.utime(self.key_path, (future, future))
+        signer.get_headers()
+        self.assertEqual(signer.get_stats()["key_loads"], 2)
+
+    def test_missing_key_file_raises_runtime_error(self):
+        signer = WalmartRequestSigner("consumer", "1", os.path.join(self.temp_dir.name, "missing"))
+        with self.assertRaises(RuntimeError):
+            signer.get_headers()
+
+
+if __name__ == "__main__":
+    unittest.main()
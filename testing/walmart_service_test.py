@@ -0,0 +1,128 @@
+import asyncio
+import json
+import unittest
+
+from app import app
+from services import walmart_service
+from services.cart_service import format_cart_items_for_walmart
+
+
+class FakeAsyncWalmartAPI:
+    """Answers searches after a delay that shrinks with each call, so later searches finish first."""
+
+    def __init__(self, delays):
+        self.delays = list(delays)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.queries = []
+
+    async def get_walmart_search_results(self, query, num_items=None):
+        self.queries.append(query)
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays.pop(0))
+            if query == "offline":
+                raise ConnectionError("Walmart API unavailable")
+            if query == "broken":
+                # A malformed item fails while the cart row is built.
+                return json.dumps({"items": ["not an item"]})
+            items = [] if query == "unobtainium" else [
+                {"itemId": 100 * self.queries.index(query) + 100 + i, "name": f"{query} {i}", "salePrice": 1.0} for i in range(1, 6)
+            ]
+            return json.dumps({"items": items})
+        finally:
+            self.in_flight -= 1
+
+
+class TestProcessIngredients(unittest.TestCase):
+    def setUp(self):
+        self.original_walmart_api = walmart_service.walmart_api
+
+    def tearDown(self):
+        walmart_service.walmart_api = self.original_walmart_api
+
+    def test_concurrent_searches_keep_order_and_row_shapes(self):
+        names = ["flour", "unobtainium", "broken", "sugar", "eggs"]
+        walmart_service.walmart_api = FakeAsyncWalmartAPI([0.05, 0.04, 0.03, 0.02, 0.01])
+        ingredients = [{"ingredient": name, "quantity": "1 cup"} for name in names]
+        cart_items = asyncio.run(walmart_service.process_ingredients(ingredients, max_concurrency=3))
+
+        self.assertEqual([item.ingredient_name for item in cart_items], names)
+        self.assertEqual(walmart_service.walmart_api.peak_in_flight, 3)
+        flour = cart_items[0].to_dict()
+        self.assertEqual(flour["main"]["name"], "flour 1")
+        self.assertEqual(len(flour["alternatives"]), walmart_service.PRODUCTS_PER_INGREDIENT - 1)
+        self.assertEqual(cart_items[1].to_dict()["main"], {"id": 0, "name": "unobtainium (Not found)", "image": "",
+                                                           "quantity": "1 cup", "price": "Not available"})
+        self.assertEqual(cart_items[2].to_dict()["main"]["name"], "broken (Error finding product)")
+        self.assertEqual(cart_items[2].to_dict()["alternatives"], [])
+
+    def test_failed_search_keeps_an_error_row(self):
+        walmart_service.walmart_api = FakeAsyncWalmartAPI([0.01, 0.01])
+        ingredients = [{"ingredient": "offline", "quantity": "1 cup"}, {"ingredient": "unobtainium", "quantity": "1"}]
+        cart_items = asyncio.run(walmart_service.process_ingredients(ingredients))
+        self.assertEqual(cart_items[0].to_dict()["main"]["name"], "offline (Error finding product)")
+        self.assertEqual(cart_items[1].to_dict()["main"]["name"], "unobtainium (Not found)")
+
+    def test_iter_process_ingredients_yields_items_as_they_resolve(self):
+        walmart_service.walmart_api = FakeAsyncWalmartAPI([0.03, 0.02, 0.01])
+        ingredients = [{"ingredient": name, "quantity": "1"} for name in ["flour", "sugar", "eggs"]]
+
+        async def collect():
+            return [(index, item.ingredient_name)
+                    async for index, item in walmart_service.iter_process_ingredients(ingredients)]
+
+        self.assertEqual(asyncio.run(collect()), [(2, "eggs"), (1, "sugar"), (0, "flour")])
+
+    def test_duplicate_lines_are_searched_once(self):
+        walmart_service.walmart_api = FakeAsyncWalmartAPI([0.01, 0.01])
+        ingredients = [{"ingredient": "Butter, softened", "quantity": "2 tbsp"},
+                       {"ingredient": "sugar", "quantity": "1 cup"},
+                       {"ingredient": "melted butter", "quantity": "1 tablespoon"}]
+        cart_items = asyncio.run(walmart_service.process_ingredients(ingredients))
+
+        # Searched under the first line's own wording, not the lossy canonical key.
+        self.assertEqual(sorted(walmart_service.walmart_api.queries), ["Butter, softened", "sugar"])
+        # Every line keeps its own row, name and quantity.
+        self.assertEqual([(item.ingredient_name, item.quantity) for item in cart_items],
+                         [("Butter, softened", "2 tbsp"), ("sugar", "1 cup"), ("melted butter", "1 tablespoon")])
+        self.assertIs(cart_items[0].main, cart_items[2].main)
+        # The cart URL buys the product once, for the summed quantity.
+        formatted_items = format_cart_items_for_walmart(cart_items)
+        self.assertEqual([item["itemId"] for item in formatted_items],
+                         [cart_items[0].item_id, cart_items[1].item_id])
+        self.assertEqual(formatted_items[0]["rationale"], "Selected for Butter, softened, melted butter")
+
+    def test_stream_cart_sends_server_sent_events(self):
+        walmart_service.walmart_api = FakeAsyncWalmartAPI([0.02, 0.01])
+        response = app.test_client().post("/api/stream-cart", json={
+            "ingredients": [{"ingredient": "flour", "quantity": "1 cup"}, {"ingredient": "unobtainium", "quantity": "1"}]
+        })
+        self.assertEqual(response.mimetype, "text/event-stream")
+        events = [(lines[0].removeprefix("event: "), json.loads(lines[1].removeprefix("data: ")))
+                  for lines in (event.split("\n") for event in response.get_data(as_text=True).strip().split("\n\n"))]
+        self.assertEqual([event for event, _ in events], ["start", "cart_item", "cart_item", "done"])
+        self.assertEqual(events[1][1]["index"], 1)
+        self.assertEqual(events[1][1]["cart_item"]["main"]["name"], "unobtainium (Not found)")
+        self.assertEqual(events[2][1]["cart_item"]["main"]["name"], "flour 1")
+        self.assertEqual(events[3][1]["cart_item_count"], 2)
+
+
+    def test_search_products_returns_results_in_order(self):
+        walmart_service.walmart_api = FakeAsyncWalmartAPI([0.03, 0.02, 0.01])
+        response = app.test_client().post("/api/search-products", json={
+            "queries": [{"query": "flour", "quantity": "2 cups"}, "unobtainium", {"query": "broken"}]
+        })
+        results = response.get_json()["results"]
+        self.assertEqual([(result["query"], result["status"]) for result in results],
+                         [("flour", "found"), ("unobtainium", "not_found"), ("broken", "error")])
+        self.assertEqual(results[0]["quantity"], "2 cups")
+        self.assertEqual(results[0]["product"]["name"], "flour 1")
+        self.assertEqual(len(results[0]["alternatives"]), walmart_service.PRODUCTS_PER_INGREDIENT - 1)
+        self.assertIsNone(results[1]["product"])
+        self.assertGreater(results[0]["elapsed_ms"], results[2]["elapsed_ms"])
+        self.assertEqual(app.test_client().post("/api/search-products", json={"queries": [""]}).status_code, 400)
+
+if __name__ == "__main__":
+    unittest.main()
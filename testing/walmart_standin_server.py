@@ -0,0 +1,352 @@
+"""
+Offline stand-in for the Walmart affiliate product API.
+
+Serves the `search`, `items`, `stores` and `taxonomy` endpoints with the same
+response shapes as the real API. It is backed by grocery_DB/products.csv,
+optionally expanded into a larger generated catalog. Latency, 5xx errors and
+429 throttling can be injected, so the whole stack can be load-tested without
+credentials or network access.
+
+Point the app at it with the WALMART_API_BASE_URL environment variable (read by
+walmart_affiliate_api_utils), or pass `base_url=` to WalmartAPI/AsyncWalmartAPI.
+
+Command line usage:
+    python testing/walmart_standin_server.py --port 8099 --latency lognormal:0.15,0.5 --throttle-rate 0.02
+    WALMART_API_BASE_URL=http://127.0.0.1:8099 python app.py
+"""
+import argparse
+import contextlib
+import csv
+import hashlib
+import http.server
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.search_cache import normalize_query
+
+PRODUCTS_CSV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 "grocery_DB", "products.csv")
+GROCERY_ROOT_CATEGORY_ID = "976759"
+DEFAULT_NUM_ITEMS = 10
+MAX_NUM_ITEMS = 25
+MAX_LOOKUP_IDS = 20
+
+_STOCK_BY_AVAILABILITY = {
+    "In Stock": "Available",
+    "Limited Stock": "Limited Supply",
+    "Out of Stock": "Not available",
+}
+_OFFER_TYPES = ["ONLINE_AND_STORE", "ONLINE_AND_STORE", "ONLINE_AND_STORE", "STORE_ONLY", "ONLINE_ONLY"]
+_SIZES = ["8 oz", "12 oz", "16 oz", "24 oz", "32 oz", "1 lb", "2 lb", "5 lb", "1 gal", "12 ct"]
+_BRANDS = ["Great Value", "Marketside", "Freshness Guaranteed", "Sam's Choice", "Equate"]
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _stable_seed(*parts) -> int:
+    return int.from_bytes(hashlib.sha256("|".join(map(str, parts)).encode("utf-8")).digest()[:8], "big")
+
+
+def _category_id(category: str) -> str:
+    return f"{GROCERY_ROOT_CATEGORY_ID}_{_stable_seed(category) % 9_000_000 + 1_000_000}"
+
+
+def _catalog_item(item_id: int, name: str, brand: str, category: str, price: float, availability: str,
+                  rating: float, rng: random.Random) -> dict:
+    size = rng.choice(_SIZES)
+    image = f"https://i5.walmartimages.com/asr/{item_id:012x}.jpeg"
+    return {
+        "itemId": item_id,
+        "parentItemId": item_id,
+        "name": f"{brand} {name}, {size}",
+        "msrp": round(price * 1.15, 2),
+        "salePrice": price,
+        "upc": f"{_stable_seed('upc', item_id) % 10 ** 12:012d}",
+        "categoryPath": f"Food/{category}",
+        "categoryNode": _category_id(category),
+        "shortDescription": f"{brand} {name}. A pantry favorite for everyday cooking.",
+        "brandName": brand,
+        "thumbnailImage": f"{image}?odnHeight=100&odnWidth=100",
+        "mediumImage": f"{image}?odnHeight=180&odnWidth=180",
+        "largeImage": f"{image}?odnHeight=450&odnWidth=450",
+        "productTrackingUrl": f"https://goto.walmart.com/c/0/0/0?veh=aff&sourceid=0&u=https%3A%2F%2Fwww.walmart.com%2Fip%2F{item_id}",
+        "standardShipRate": 0.0,
+        "size": size,
+        "marketplace": False,
+        "productUrl": f"https://www.walmart.com/ip/{item_id}",
+        "customerRating": f"{rating:.1f}",
+        "numReviews": rng.randint(0, 4000),
+        "stock": _STOCK_BY_AVAILABILITY.get(availability, "Available"),
+        "offerType": rng.choice(_OFFER_TYPES),
+        "addToCartUrl": f"https://affil.walmart.com/cart/addToCart?items={item_id}",
+        "availableOnline": True,
+    }
+
+
+def load_catalog(csv_path: str = PRODUCTS_CSV_PATH, num_products: int = None, seed: int = 0) -> list[dict]:
+    """
+    Build a catalog of Walmart-shaped items from grocery_DB/products.csv.
+
+    Parameters:
+        csv_path (str): The products CSV.
+        num_products (int): If larger than the CSV, cycle through its rows with other
+            brands, sizes and prices until the catalog has this many items.
+        seed (int): Seed for the generated fields.
+    Returns:
+        list of dict: Items shaped like entries of a `search` response's "items".
+    """
+    with open(csv_path, newline="", encoding="utf-8") as csv_file:
+        rows = list(csv.DictReader(csv_file))
+    rng = random.Random(seed)
+    catalog = []
+    for i in range(max(num_products or len(rows), 1)):
+        row = rows[i % len(rows)]
+        generation = i // len(rows)
+        brand = row["Brand"] if generation == 0 else rng.choice(_BRANDS)
+        price = float(row["Price"]) if generation == 0 else round(float(row["Price"]) * rng.uniform(0.6, 1.4), 2)
+        catalog.append(_catalog_item(
+            item_id=100_000_000 + i + 1, name=row["item"], brand=brand, category=row["Category"], price=price,
+            availability=row["Availability"] if generation == 0 else rng.choice(list(_STOCK_BY_AVAILABILITY)),
+            rating=float(row["CustomerRating"] or 0), rng=rng,
+        ))
+    return catalog
+
+
+def parse_latency(spec: str):
+    """
+    Parse a latency distribution spec into a function returning seconds.
+
+    Supported specs: "0.05" or "fixed:0.05", "uniform:LOW,HIGH", "exponential:MEAN",
+    and "lognormal:MEDIAN,SIGMA" (a long-tailed distribution like real API latency).
+    """
+    kind, _, args = spec.partition(":") if ":" in spec else ("fixed", "", spec)
+    values = [float(value) for value in args.split(",") if value]
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "exponential":
+        return lambda rng: rng.expovariate(1.0 / values[0])
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class WalmartStandinServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, catalog: list[dict], latency: str = "0", error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, retry_after: float = 1.0, seed: int = None):
+        super().__init__(address, WalmartStandinHandler)
+        self.catalog = catalog
+        self.items_by_id = {str(item["itemId"]): item for item in catalog}
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "errors_injected": 0, "throttled": 0, "by_endpoint": {}}
+
+        self._words_by_item = [set(_WORD_PATTERN.findall(normalize_query(item["name"]))) for item in catalog]
+        categories = sorted({item["categoryPath"].split("/", 1)[1] for item in catalog})
+        self.taxonomy = {"categories": [{
+            "id": GROCERY_ROOT_CATEGORY_ID, "name": "Food", "path": "Food",
+            "children": [{"id": _category_id(category), "name": category, "path": f"Food/{category}"}
+                         for category in categories],
+        }]}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, endpoint: str, outcome: str = None):
+        with self._stats_lock:
+            self.stats["requests"] += 1
+            by_endpoint = self.stats["by_endpoint"]
+            by_endpoint[endpoint] = by_endpoint.get(endpoint, 0) + 1
+            if outcome:
+                self.stats[outcome] += 1
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            return dict(self.stats, by_endpoint=dict(self.stats["by_endpoint"]))
+
+    def draw_fault(self):
+        """Return (latency seconds, injected status or None) for one request."""
+        with self._rng_lock:
+            latency = max(self.sample_latency(self.rng), 0.0)
+            roll = self.rng.random()
+        if roll < self.throttle_rate:
+            return latency, 429
+        if roll < self.throttle_rate + self.error_rate:
+            return latency, 503
+        return latency, None
+
+    def at_store(self, item: dict, store_id: str) -> dict:
+        """Return `item` with its stock at `store_id`; about one in five items is out of stock at any store."""
+        if not store_id:
+            return item
+        in_stock = _stable_seed("stock", store_id, item["itemId"]) % 5 != 0
+        return dict(item, stock="Available" if in_stock else "Not available")
+
+    def search(self, params: dict) -> dict:
+        query = params.get("query", "")
+        query_words = set(_WORD_PATTERN.findall(normalize_query(query)))
+        category_id = params.get("categoryId")
+        num_items = min(max(int(params.get("numItems", DEFAULT_NUM_ITEMS)), 1), MAX_NUM_ITEMS)
+        start = max(int(params.get("start", 1)), 1)
+        matches = [
+            item for item, words in zip(self.catalog, self._words_by_item)
+            if query_words and query_words <= words
+            and (not category_id or category_id in (GROCERY_ROOT_CATEGORY_ID, item["categoryNode"]))
+        ]
+        page = [self.at_store(item, params.get("storeId")) for item in matches[start - 1:start - 1 + num_items]]
+        return {"query": query, "sort": "relevance", "responseGroup": "base", "totalResults": len(matches),
+                "start": start, "numItems": len(page), "items": page}
+
+    def lookup(self, params: dict):
+        item_ids = [item_id for item_id in params.get("ids", "").split(",") if item_id]
+        if not item_ids or len(item_ids) > MAX_LOOKUP_IDS:
+            return 400, {"errors": [{"code": 4000, "message": f"Between 1 and {MAX_LOOKUP_IDS} ids are required"}]}
+        items = [self.at_store(self.items_by_id[item_id], params.get("storeId"))
+                 for item_id in item_ids if item_id in self.items_by_id]
+        if not items:
+            return 400, {"errors": [{"code": 4002, "message": "Invalid itemId"}]}
+        return 200, {"items": items}
+
+    def stores(self, params: dict) -> list[dict]:
+        zip_code = params.get("zip", "")
+        rng = random.Random(_stable_seed("stores", zip_code))
+        latitude, longitude = rng.uniform(30, 45), rng.uniform(-120, -75)
+        return [{
+            "no": rng.randint(100, 5999),
+            "name": f"{zip_code} Supercenter" if i == 0 else f"{zip_code} Neighborhood Market {i}",
+            "country": "US",
+            "coordinates": [round(longitude + rng.uniform(-0.1, 0.1), 6), round(latitude + rng.uniform(-0.1, 0.1), 6)],
+            "streetAddress": f"{rng.randint(100, 9999)} Main St",
+            "city": "Springfield",
+            "stateProvCode": "AR",
+            "zip": zip_code,
+            "phoneNumber": f"479-555-{rng.randint(1000, 9999)}",
+            "sundayOpen": True,
+            "timezone": "CST",
+        } for i in range(rng.randint(2, 5))]
+
+
+class WalmartStandinHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: WalmartStandinServer
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        endpoint = url.path.rstrip("/").rsplit("/", 1)[-1]
+
+        if endpoint == "_stats":
+            return self._send_json(200, self.server.get_stats())
+        if endpoint not in ("search", "items", "stores", "taxonomy"):
+            self.server.count(endpoint)
+            return self._send_json(404, {"errors": [{"code": 404, "message": f"Unknown endpoint {url.path}"}]})
+
+        latency, injected_status = self.server.draw_fault()
+        time.sleep(latency)
+        if injected_status == 429:
+            self.server.count(endpoint, "throttled")
+            return self._send_json(429, {"errors": [{"code": 429, "message": "Too Many Requests"}]},
+                                   headers={"Retry-After": f"{self.server.retry_after:g}"})
+        if injected_status is not None:
+            self.server.count(endpoint, "errors_injected")
+            return self._send_json(injected_status, {"errors": [{"code": injected_status,
+                                                                 "message": "Service Unavailable"}]})
+
+        self.server.count(endpoint)
+        try:
+            if endpoint == "search":
+                return self._send_json(200, self.server.search(params))
+            if endpoint == "items":
+                return self._send_json(*self.server.lookup(params))
+            if endpoint == "stores":
+                return self._send_json(200, self.server.stores(params))
+            return self._send_json(200, self.server.taxonomy)
+        except ValueError as e:
+            return self._send_json(400, {"errors": [{"code": 4000, "message": str(e)}]})
+
+    def _send_json(self, status: int, payload, headers: dict = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextlib.contextmanager
+def run_standin_server(host: str = "127.0.0.1", port: int = 0, catalog: list[dict] = None, **server_options):
+    """
+    Run a stand-in server on a background thread for the duration of the block.
+
+    Parameters:
+        host (str): Interface to bind.
+        port (int): Port to bind; 0 picks a free port.
+        catalog (list of dict): Items to serve; defaults to load_catalog().
+        **server_options: latency, error_rate, throttle_rate, retry_after and seed for WalmartStandinServer.
+    Yields:
+        WalmartStandinServer: Use its `base_url` as the WalmartAPI base URL.
+    """
+    server = WalmartStandinServer((host, port), catalog if catalog is not None else load_catalog(), **server_options)
+    server_thread = threading.Thread(target=server.serve_forever, name="walmart-standin-server", daemon=True)
+    server_thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        server_thread.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve an offline stand-in for the Walmart affiliate API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--catalog-size", type=int, default=None,
+                        help="Number of items to generate from grocery_DB/products.csv (default: one per row).")
+    parser.add_argument("--latency", default="0",
+                        help="Latency distribution: SECONDS, uniform:LOW,HIGH, exponential:MEAN or lognormal:MEDIAN,SIGMA.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429.")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429 responses.")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    server = WalmartStandinServer((args.host, args.port), load_catalog(num_products=args.catalog_size),
+                                  latency=args.latency, error_rate=args.error_rate,
+                                  throttle_rate=args.throttle_rate, retry_after=args.retry_after, seed=args.seed)
+    print(f"Walmart stand-in serving {len(server.catalog)} items at {server.base_url}")
+    print(f"Use it with: WALMART_API_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
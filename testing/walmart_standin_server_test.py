@@ -0,0 +1,112 @@
+import asyncio
+import json
+import unittest
+
+from testing.benchmarks.benchmark_utils import temporary_rsa_key
+from testing.walmart_standin_server import load_catalog, run_standin_server
+from utils.http_transport import AsyncHTTPTransport, HTTPTransport
+from utils.rate_limiter import RateLimiter
+from utils.search_cache import TTLLRUCache
+from utils.store_index import store_index
+from utils.taxonomy_index import TaxonomyIndex
+from walmart_affiliate_api_utils import AsyncWalmartAPI, WalmartAPI
+
+
+class TestWalmartStandinServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.key_context = temporary_rsa_key()
+        cls.key_path = cls.key_context.__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.key_context.__exit__(None, None, None)
+
+    def build_api(self, base_url, api_class=WalmartAPI, transport=None, **api_options):
+        return api_class("consumer", "1", self.key_path, base_url=base_url, use_search_cache=False,
+                         use_response_cache=False, transport=transport or HTTPTransport(max_retries=0),
+                         **api_options)
+
+    def test_catalog_is_built_from_grocery_db(self):
+        catalog = load_catalog()
+        self.assertEqual(len(catalog), 300)
+        self.assertEqual(len(load_catalog(num_products=1000)), 1000)
+        self.assertIn("Sugar", catalog[0]["name"])
+
+    def test_endpoints_return_walmart_shapes(self):
+        with run_standin_server(seed=1) as server:
+            walmart_api = self.build_api(server.base_url, use_rate_limiter=False)
+            search_response = json.loads(walmart_api.get_walmart_search_results("butter"))
+            self.assertGreater(search_response["totalResults"], 0)
+            self.assertTrue(all("Butter" in item["name"] for item in search_response["items"]))
+
+            item_ids = [item["itemId"] for item in search_response["items"]]
+            lookup = walmart_api.lookup_walmart_products(item_ids + [1])
+            self.assertEqual([item["itemId"] for item in lookup["items"]], item_ids)
+            self.assertEqual(lookup["missing_ids"], ["1"])
+
+            stores = json.loads(walmart_api.get_stores_nearby("72701"))
+            self.assertEqual(stores[0]["zip"], "72701")
+
+            taxonomy_index = TaxonomyIndex.from_taxonomy(json.loads(walmart_api.get_walmart_taxonomy()))
+            dairy = taxonomy_index.lookup_category("butter")
+            scoped = json.loads(walmart_api.get_walmart_search_results("butter", category_id=dairy["id"]))
+            self.assertEqual(scoped["totalResults"], search_response["totalResults"])
+            self.assertEqual(server.get_stats()["by_endpoint"]["search"], 2)
+
+    def test_store_aware_search(self):
+        store_index.clear()
+        with run_standin_server(seed=1) as server:
+            walmart_api = self.build_api(server.base_url, use_rate_limiter=False)
+            walmart_api.search_cache = TTLLRUCache(maxsize=16, ttl=60)
+            store = walmart_api.get_nearest_store("72701-1234")
+            self.assertEqual(walmart_api.get_nearest_store("72701"), store)
+            self.assertIsNone(walmart_api.get_nearest_store("not a zip"))
+            self.assertEqual(server.get_stats()["by_endpoint"]["stores"], 1)
+
+            store_records = walmart_api.search_products("cheese", zip_code="72701", available_only=False)
+            unscoped_records = walmart_api.search_products("cheese", available_only=False)
+            self.assertEqual([record.itemId for record in store_records],
+                             [record.itemId for record in unscoped_records])
+            self.assertNotEqual([record.stock for record in store_records],
+                                [record.stock for record in unscoped_records])
+            walmart_api.search_products("cheese", zip_code="72701")
+            self.assertEqual(server.get_stats()["by_endpoint"]["search"], 2)
+
+    def test_paged_search(self):
+        with run_standin_server(seed=1) as server:
+            walmart_api = self.build_api(server.base_url, api_class=AsyncWalmartAPI,
+                                         transport=AsyncHTTPTransport(max_retries=0), use_rate_limiter=False)
+            walmart_api.search_cache = TTLLRUCache(maxsize=16, ttl=60)
+
+            async def search_pages():
+                first_page = json.loads(await walmart_api.get_walmart_search_results("cheese", num_items=2))
+                second_page = json.loads(await walmart_api.get_walmart_search_results("cheese", num_items=2, start=3))
+                return first_page, second_page
+
+            first_page, second_page = asyncio.run(search_pages())
+            self.assertEqual(len(first_page["items"]), 2)
+            self.assertEqual(second_page["start"], 3)
+            self.assertFalse({item["itemId"] for item in first_page["items"]}
+                             & {item["itemId"] for item in second_page["items"]})
+            self.assertEqual(server.get_stats()["by_endpoint"]["search"], 2)
+
+    def test_throttling_is_absorbed_by_the_rate_limiter(self):
+        # With seed 20, the 5th and 10th requests are throttled, so no search exhausts its retries.
+        with run_standin_server(seed=20, throttle_rate=0.3, retry_after=0) as server:
+            walmart_api = self.build_api(server.base_url, api_class=AsyncWalmartAPI,
+                                         transport=AsyncHTTPTransport(max_retries=0),
+                                         rate_limiter=RateLimiter(rate_per_second=500, burst=50))
+
+            async def search_all():
+                return await asyncio.gather(*(walmart_api.search_products(term, available_only=False)
+                                              for term in ["milk", "eggs", "bread", "rice", "salt", "soda"]))
+
+            results = asyncio.run(search_all())
+            self.assertTrue(all(results))
+            self.assertGreater(server.get_stats()["throttled"], 0)
+            self.assertGreater(walmart_api.get_rate_limiter_stats()["throttled_responses"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Compact cart records shared by the ingredient pipeline, substitutions and the chat agent.
+
+A cart used to be nested dicts, with every alternative carrying a full copy of
+its raw Walmart item. Here a cart is a list of slotted CartItem objects. Each
+CartItem holds CartProduct objects, and these point at shared ProductRecords
+(see utils.product_records.shared_product_record) instead of copying item data.
+`to_dict()` produces the JSON shape the frontend already uses:
+
+    {
+        'main': {'id', 'name', 'image', 'quantity', 'price', 'item_details'?},
+        'alternatives': [{'item_details'?, 'id', 'name', 'image', 'price'}, ...],
+        'original_ingredient': {'name', 'quantity'}
+    }
+
+Carts sent back by the frontend are read with `CartItem.from_dict`.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+from utils.product_records import ProductRecord, product_details, shared_product_record
+
+PRICE_UNAVAILABLE = "Price unavailable"
+
+
+def format_price(sale_price) -> str:
+    """Format a sale price for display, e.g. 3.5 -> "$3.50"."""
+    if sale_price is None:
+        return PRICE_UNAVAILABLE
+    try:
+        return f"${float(sale_price):.2f}"
+    except (TypeError, ValueError):
+        return PRICE_UNAVAILABLE
+
+
+@dataclass(slots=True)
+class CartProduct:
+    id: Optional[int]
+    name: str
+    image: str = ""
+    price: str = PRICE_UNAVAILABLE
+    details: Optional[ProductRecord] = None
+
+    @classmethod
+    def from_record(cls, record: ProductRecord) -> "CartProduct":
+        return cls(record.itemId, record.name or "Unknown product", record.thumbnailImage or "",
+                   format_price(record.salePrice), record)
+
+    @classmethod
+    def from_item(cls, item: dict) -> "CartProduct":
+        """Build a product from a raw Walmart item, keeping only its shared record."""
+        return cls.from_record(shared_product_record(item))
+
+    @classmethod
+    def from_dict(cls, product: dict) -> "CartProduct":
+        """Read a product in the JSON shape produced by `to_dict`, e.g. sent back by the frontend."""
+        details = product.get("item_details")
+        record = shared_product_record(details) if isinstance(details, dict) and details.get("itemId") else None
+        price = product.get("price", PRICE_UNAVAILABLE)
+        if isinstance(price, dict):
+            price = price.get("priceString", PRICE_UNAVAILABLE)
+        item_id = product.get("id", product.get("itemId"))
+        if item_id is None and record is not None:
+            item_id = record.itemId
+        return cls(item_id, product.get("name", "Unknown product"), product.get("image", ""), price, record)
+
+    def to_dict(self) -> dict:
+        product = {"id": self.id, "name": self.name, "image": self.image, "price": self.price}
+        if self.details is not None:
+            product["item_details"] = product_details(self.details)
+        return product
+
+
+@dataclass(slots=True)
+class CartItem:
+    main: CartProduct
+    quantity: str
+    alternatives: list
+    ingredient_name: str
+    ingredient_quantity: str
+
+    @classmethod
+    def placeholder(cls, ingredient_name: str, ingredient_quantity: str, reason: str) -> "CartItem":
+        """A cart row for an ingredient without a product, e.g. reason "Not found"."""
+        return cls(CartProduct(0, f"{ingredient_name} ({reason})", "", "Not available"), ingredient_quantity, [],
+                   ingredient_name, ingredient_quantity)
+
+    @classmethod
+    def from_dict(cls, item: dict) -> "CartItem":
+        main = item.get("main", {})
+        ingredient = item.get("original_ingredient", {})
+        return cls(CartProduct.from_dict(main), main.get("quantity", ""),
+                   [CartProduct.from_dict(alternative) for alternative in item.get("alternatives", [])],
+                   ingredient.get("name", ""), ingredient.get("quantity", ""))
+
+    @property
+    def item_id(self):
+        return self.main.id or (self.main.details.itemId if self.main.details is not None else None)
+
+    def to_dict(self) -> dict:
+        main = self.main.to_dict()
+        main["quantity"] = self.quantity
+        return {
+            "main": main,
+            "alternatives": [alternative.to_dict() for alternative in self.alternatives],
+            "original_ingredient": {"name": self.ingredient_name, "quantity": self.ingredient_quantity},
+        }
+
+
+def to_cart_items(cart_items) -> list[CartItem]:
+    """Return `cart_items` as CartItems, reading any that are still in the JSON shape."""
+    return [item if isinstance(item, CartItem) else CartItem.from_dict(item) for item in cart_items or []]
@@ -0,0 +1,92 @@
+"""
+Server-side cart state, keyed by conversation id.
+
+Each conversation's cart is kept as a list of CartItems (see utils.cart_records)
+together with a version that increases with every change, so items are read and
+replaced by index in O(1) and the frontend only needs the items that changed.
+Writers pass the version they read to `apply`; if the cart changed in between,
+CartVersionConflict is raised instead of applying changes to items they never saw.
+"""
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+
+class CartVersionConflict(Exception):
+    """Raised when changes are applied to a cart version other than the current one."""
+
+    def __init__(self, expected_version, current_version):
+        super().__init__(f"Cart is at version {current_version}, not {expected_version}")
+        self.expected_version = expected_version
+        self.current_version = current_version
+
+
+@dataclass(slots=True)
+class StoredCart:
+    items: list
+    version: int
+
+
+class CartStore:
+    def __init__(self):
+        self._carts = {}
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id) -> Optional[StoredCart]:
+        """The conversation's cart, or None if none was stored. Change it only through `put` and `apply`."""
+        with self._lock:
+            return self._carts.get(conversation_id)
+
+    def put(self, conversation_id, cart_items: list) -> int:
+        """
+        Store a new cart for the conversation and return its version.
+
+        The list itself is kept rather than a copy, so other references to it
+        (e.g. the chat agent's cart_items) see later substitutions.
+        """
+        with self._lock:
+            cart = self._carts.get(conversation_id)
+            if cart is None:
+                self._carts[conversation_id] = cart = StoredCart(cart_items, 1)
+            else:
+                cart.items = cart_items
+                cart.version += 1
+            return cart.version
+
+    def apply(self, conversation_id, changes: dict, expected_version: Optional[int] = None) -> int:
+        """
+        Replace cart items by index and return the new version.
+
+        Parameters:
+            conversation_id (str): Conversation whose cart is changed.
+            changes (dict): CartItems to store, keyed by their index in the cart.
+            expected_version (int, optional): Version the changes were computed from.
+        Raises:
+            KeyError: If the conversation has no cart.
+            CartVersionConflict: If `expected_version` is given and is not the current version.
+        """
+        with self._lock:
+            cart = self._carts[conversation_id]
+            if expected_version is not None and expected_version != cart.version:
+                raise CartVersionConflict(expected_version, cart.version)
+            for index, cart_item in changes.items():
+                cart.items[index] = cart_item
+            cart.version += 1
+            return cart.version
+
+    def drop(self, conversation_id):
+        with self._lock:
+            self._carts.pop(conversation_id, None)
+
+
+_shared_cart_store = None
+_shared_cart_store_lock = threading.Lock()
+
+
+def get_shared_cart_store() -> CartStore:
+    """Return the process-wide cart store, creating it on first use."""
+    global _shared_cart_store
+    with _shared_cart_store_lock:
+        if _shared_cart_store is None:
+            _shared_cart_store = CartStore()
+        return _shared_cart_store
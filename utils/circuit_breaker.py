@@ -0,0 +1,186 @@
+"""
+Circuit breaker for Walmart affiliate API requests.
+
+The breaker watches the outcome of the most recent requests. When too many of
+them failed (connection errors, timeouts, 5xx responses) or were slow, it
+opens: requests are refused straight away with CircuitOpenError, so callers
+can answer from a fallback instead of each waiting for its own timeout. After
+a cool-down the breaker lets a few probe requests through (half-open); if they
+all succeed it closes again, and if any fails it reopens for another cool-down.
+"""
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_WINDOW_SIZE = 20
+DEFAULT_MIN_CALLS = 10
+DEFAULT_FAILURE_RATE_THRESHOLD = 0.5
+DEFAULT_SLOW_CALL_SECONDS = 5.0
+DEFAULT_SLOW_CALL_RATE_THRESHOLD = 0.8
+DEFAULT_OPEN_SECONDS = 30.0
+DEFAULT_HALF_OPEN_PROBES = 3
+
+# Responses with a status code at or above this count as failures.
+FAILURE_STATUS_CODE = 500
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, window_size: int = DEFAULT_WINDOW_SIZE, min_calls: int = DEFAULT_MIN_CALLS,
+                 failure_rate_threshold: float = DEFAULT_FAILURE_RATE_THRESHOLD,
+                 slow_call_seconds: float = DEFAULT_SLOW_CALL_SECONDS,
+                 slow_call_rate_threshold: float = DEFAULT_SLOW_CALL_RATE_THRESHOLD,
+                 open_seconds: float = DEFAULT_OPEN_SECONDS, half_open_probes: int = DEFAULT_HALF_OPEN_PROBES):
+        """
+        Parameters:
+            window_size (int): Number of most recent requests the rates are computed over.
+            min_calls (int): Requests the window must hold before the breaker can open.
+            failure_rate_threshold (float): Fraction of failed requests that opens the breaker.
+            slow_call_seconds (float): Requests taking longer than this count as slow.
+            slow_call_rate_threshold (float): Fraction of slow requests that opens the breaker.
+            open_seconds (float): How long the breaker stays open before probing.
+            half_open_probes (int): Successful probes needed to close the breaker again.
+        """
+        if not 1 <= min_calls <= window_size or half_open_probes < 1:
+            raise ValueError("Expected 1 <= min_calls <= window_size and half_open_probes >= 1")
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        # (failed, slow) outcome of each recent request.
+        self._outcomes = deque(maxlen=window_size)
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_succeeded = 0
+        self.stats = {
+            "rejected": 0,
+            "failures": 0,
+            "slow_calls": 0,
+            "opened": 0,
+            "closed": 0,
+        }
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._advance_locked(time.monotonic())
+            return self._state
+
+    def _advance_locked(self, now: float):
+        """Move an open breaker whose cool-down has passed to half-open."""
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes_started = 0
+            self._probes_succeeded = 0
+
+    def _open_locked(self, now: float):
+        self._state = OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        self.stats["opened"] += 1
+
+    def allow_request(self) -> bool:
+        """
+        Whether a request may be sent now. While half-open, only `half_open_probes` requests are let through.
+
+        Every admitted request must be reported with `record_response`, `record_failure` or `release`.
+        """
+        with self._lock:
+            self._advance_locked(time.monotonic())
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes_started < self.half_open_probes:
+                self._probes_started += 1
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def record_response(self, status_code: int, latency: float):
+        """Record an admitted request that got a response after `latency` seconds."""
+        self._record(status_code >= FAILURE_STATUS_CODE, latency > self.slow_call_seconds)
+
+    def record_failure(self):
+        """Record an admitted request that failed without a response (connection error, timeout)."""
+        self._record(True, False)
+
+    def release(self):
+        """Give back an admitted request that was abandoned (e.g. cancelled) without an outcome."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes_started = max(self._probes_started - 1, 0)
+
+    def _record(self, failed: bool, slow: bool):
+        now = time.monotonic()
+        with self._lock:
+            self.stats["failures"] += failed
+            self.stats["slow_calls"] += slow
+            if self._state == HALF_OPEN:
+                if failed or slow:
+                    self._open_locked(now)
+                else:
+                    self._probes_succeeded += 1
+                    if self._probes_succeeded >= self.half_open_probes:
+                        self._state = CLOSED
+                        self.stats["closed"] += 1
+                return
+            if self._state == OPEN:
+                # A request admitted before the breaker opened; its outcome is already accounted for.
+                return
+            self._outcomes.append((failed, slow))
+            calls = len(self._outcomes)
+            if calls < self.min_calls:
+                return
+            failure_rate = sum(outcome[0] for outcome in self._outcomes) / calls
+            slow_call_rate = sum(outcome[1] for outcome in self._outcomes) / calls
+            if failure_rate >= self.failure_rate_threshold or slow_call_rate >= self.slow_call_rate_threshold:
+                self._open_locked(now)
+
+    def get_stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            self._advance_locked(now)
+            stats = dict(self.stats)
+            calls = len(self._outcomes)
+            stats.update({
+                "state": self._state,
+                "window_calls": calls,
+                "failure_rate": round(sum(outcome[0] for outcome in self._outcomes) / calls, 3) if calls else 0.0,
+                "slow_call_rate": round(sum(outcome[1] for outcome in self._outcomes) / calls, 3) if calls else 0.0,
+                "open_seconds_left": round(max(self._opened_at + self.open_seconds - now, 0.0), 3)
+                if self._state == OPEN else 0.0,
+            })
+        return stats
+
+
+_shared_circuit_breaker = None
+_shared_circuit_breaker_lock = threading.Lock()
+
+
+def get_shared_circuit_breaker() -> CircuitBreaker:
+    """Return the process-wide Walmart API circuit breaker, creating it with default settings on first use."""
+    global _shared_circuit_breaker
+    with _shared_circuit_breaker_lock:
+        if _shared_circuit_breaker is None:
+            _shared_circuit_breaker = CircuitBreaker()
+        return _shared_circuit_breaker
+
+
+def configure_shared_circuit_breaker(**circuit_breaker_kwargs) -> CircuitBreaker:
+    """Replace the process-wide circuit breaker with one built from `circuit_breaker_kwargs`."""
+    global _shared_circuit_breaker
+    with _shared_circuit_breaker_lock:
+        _shared_circuit_breaker = CircuitBreaker(**circuit_breaker_kwargs)
+        return _shared_circuit_breaker
@@ -3,6 +3,8 @@ import logging
 from uuid import uuid4
 
 from config import active_conversations, create_chat_agent
+from utils.cart_records import to_cart_items
+from utils.cart_store import get_shared_cart_store
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +21,18 @@ def get_or_create_conversation(conversation_id=None):
     active_conversations[new_id] = create_chat_agent()
     return new_id, active_conversations[new_id]
 
+def end_conversation(conversation_id):
+    """
+    Forget a conversation and drop its cart from the shared cart store
+
+    Returns True if the conversation existed.
+    """
+    get_shared_cart_store().drop(conversation_id)
+    if active_conversations.pop(conversation_id, None) is None:
+        return False
+    logger.info(f"Ended conversation: {conversation_id}")
+    return True
+
 def load_conversation_history(chat_agent, conversation_history):
     """
     Load conversation history into the chat agent
@@ -54,13 +68,13 @@ def process_agent_message(chat_agent, user_message, extracted_ingredients=None,
 
 def get_cart_items(chat_agent, frontend_cart_items=None):
     """
-    Get cart items from the agent or frontend
+    Get cart items from the agent or frontend, as CartItems (see utils.cart_records)
     """
     logger.debug("Retrieving cart items")
     
     if frontend_cart_items and len(frontend_cart_items) > 0:
         logger.debug(f"Using {len(frontend_cart_items)} cart items from frontend")
-        return frontend_cart_items
+        return to_cart_items(frontend_cart_items)
     
     
     if hasattr(chat_agent, 'cart_items') and chat_agent.cart_items:
@@ -87,17 +101,20 @@ def get_cart_items(chat_agent, frontend_cart_items=None):
     logger.warning("No cart items found")
     return []
 
-def store_cart_items(chat_agent, cart_items):
+def store_cart_items(chat_agent, cart_items, conversation_id=None):
     """
-    Store cart items on the chat agent
+    Store cart items on the chat agent, and in the shared cart store under `conversation_id` if given
+
+    Returns the cart's version in the cart store, or None if it was not stored there.
     """
     if not cart_items:
         logger.warning("Attempted to store empty cart items")
-        return
+        return None
     
     logger.info(f"Stored {len(cart_items)} cart items on the agent")
     
     chat_agent.cart_items = cart_items
+    version = get_shared_cart_store().put(conversation_id, cart_items) if conversation_id else None
     
     if hasattr(chat_agent, 'set_cart_items') and callable(chat_agent.set_cart_items):
         try:
@@ -107,6 +124,8 @@ def store_cart_items(chat_agent, cart_items):
     
     if hasattr(chat_agent, 'last_response_data'):
         chat_agent.last_response_data['cart_items'] = cart_items
+    
+    return version
 
 def parse_request_data(request):
     """
@@ -119,7 +138,8 @@ def parse_request_data(request):
         'conversation_history': [],
         'extracted_ingredients': None,
         'skip_cart_generation': False,
-        'force_complete': False
+        'force_complete': False,
+        'zip_code': None
     }
     
     if request.content_type and request.content_type.startswith('application/json'):
@@ -131,6 +151,7 @@ def parse_request_data(request):
         data['extracted_ingredients'] = req_data.get('extracted_ingredients')
         data['skip_cart_generation'] = req_data.get('skip_cart_generation', False)
         data['force_complete'] = req_data.get('force_complete', False)
+        data['zip_code'] = req_data.get('zip_code')
     else:  # Form data
         data['is_text'] = request.form.get('isText', 'true').lower() == 'true'
         data['recipe_text'] = request.form.get('recipe_text')
@@ -151,5 +172,6 @@ def parse_request_data(request):
         
         data['skip_cart_generation'] = request.form.get('skip_cart_generation', 'false').lower() == 'true'
         data['force_complete'] = request.form.get('force_complete', 'false').lower() == 'true'
+        data['zip_code'] = request.form.get('zip_code')
     
     return data
\ No newline at end of file
@@ -0,0 +1,114 @@
+"""
+One long-lived asyncio event loop per worker process, for synchronous Flask views.
+
+Calling `asyncio.run(...)` in a view creates and closes an event loop for every
+request. The async Walmart and LLM clients keep their connection pools per loop
+(see utils.http_transport.AsyncHTTPTransport), so every request also paid for
+new connections and TLS handshakes. Instead, views hand their coroutines to
+`run_async`, which runs them on a loop that lives in a background thread for the
+life of the worker. Pools stay warm across requests, and concurrent requests
+served by the worker's threads share that loop.
+
+The loop thread is started on first use, and again in a forked child process,
+so pre-forking servers such as gunicorn get one loop per worker.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+
+class EventLoopThread:
+    def __init__(self, name: str = "event-loop"):
+        self.name = name
+        self._loop = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The running loop, started in its thread on first use (and after a fork)."""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid() or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                started = threading.Event()
+
+                def run_loop():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(started.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run_loop, name=self.name, daemon=True)
+                self._thread.start()
+                started.wait()
+                self._loop = loop
+                self._pid = os.getpid()
+            return self._loop
+
+    def run(self, coro, timeout: float = None):
+        """
+        Run a coroutine on the loop and return its result, blocking the calling thread.
+
+        Raises:
+            RuntimeError: If called from the loop's own thread, which would deadlock.
+            TimeoutError: If `timeout` seconds pass first; the coroutine is cancelled.
+        """
+        loop = self.loop
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("run() cannot be called from the event loop thread; await the coroutine instead")
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Coroutine did not finish within {timeout} seconds")
+
+    def iterate(self, agen):
+        """
+        Iterate an async generator on the loop from synchronous code, e.g. to stream a response.
+
+        The generator is closed on the loop if the consumer stops early.
+        """
+        try:
+            while True:
+                try:
+                    yield self.run(agen.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            self.run(agen.aclose())
+
+    def stop(self):
+        """Stop the loop and wait for its thread to finish."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is not None and thread.is_alive():
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+
+_shared_event_loop = None
+_shared_event_loop_lock = threading.Lock()
+
+
+def get_shared_event_loop() -> EventLoopThread:
+    """Return the worker's long-lived event loop thread, creating it on first use."""
+    global _shared_event_loop
+    with _shared_event_loop_lock:
+        if _shared_event_loop is None:
+            _shared_event_loop = EventLoopThread("app-event-loop")
+        return _shared_event_loop
+
+
+def run_async(coro, timeout: float = None):
+    """Run a coroutine on the worker's shared event loop and return its result (see EventLoopThread.run)."""
+    return get_shared_event_loop().run(coro, timeout=timeout)
+
+
+def iterate_async(agen):
+    """Iterate an async generator on the worker's shared event loop (see EventLoopThread.iterate)."""
+    return get_shared_event_loop().iterate(agen)
@@ -0,0 +1,313 @@
+import asyncio
+import logging
+import random
+import threading
+import weakref
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 10.0
+DEFAULT_POOL_CONNECTIONS = 4
+DEFAULT_POOL_MAXSIZE = 32
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.25
+DEFAULT_BACKOFF_JITTER = 0.25
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+
+class HTTPTransport:
+    """
+    Pooled keep-alive HTTP transport built on a single requests.Session.
+
+    Connections are reused across calls (and across every client sharing the
+    transport), every request carries a (connect, read) timeout, responses are
+    gzip-compressed on the wire, and idempotent requests are retried with
+    jittered exponential backoff on 5xx responses and connection errors.
+    """
+
+    def __init__(self, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 pool_connections: int = DEFAULT_POOL_CONNECTIONS, pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 max_retries: int = DEFAULT_MAX_RETRIES, backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+                 backoff_jitter: float = DEFAULT_BACKOFF_JITTER):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pool_maxsize = pool_maxsize
+
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_jitter,
+            respect_retry_after_header=True,
+            raise_on_status=False,  # Hand the last 5xx response back to the caller instead of raising
+        )
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.session.headers.update({"Accept-Encoding": "gzip, deflate"})
+
+        self._lock = threading.Lock()
+        self.stats = {
+            "requests": 0,
+            "errors": 0,
+            "retries": 0,
+            "in_flight": 0,
+            "peak_in_flight": 0,
+        }
+
+    @property
+    def timeout(self) -> tuple:
+        return self.connect_timeout, self.read_timeout
+
+    def get(self, url: str, headers: dict = None, params: dict = None, timeout=None) -> requests.Response:
+        """
+        Send a GET request through the pooled session.
+
+        Parameters:
+            url (str): The request URL.
+            headers (dict): Extra request headers.
+            params (dict): Query string parameters.
+            timeout (float or tuple): Overrides the transport's (connect, read) timeout.
+        Returns:
+            requests.Response: The final response after any retries.
+        Raises:
+            requests.RequestException: If the request still fails after all retries.
+        """
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["in_flight"] += 1
+            self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.stats["in_flight"])
+        try:
+            response = self.session.get(url, headers=headers, params=params,
+                                        timeout=timeout if timeout is not None else self.timeout)
+        except requests.RequestException:
+            with self._lock:
+                self.stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self.stats["in_flight"] -= 1
+
+        retry_history = getattr(getattr(response.raw, "retries", None), "history", None)
+        if retry_history:
+            with self._lock:
+                self.stats["retries"] += len(retry_history)
+        return response
+
+    def get_stats(self) -> dict:
+        """
+        Return request counters plus connection pool utilization.
+
+        `connections_opened` counts TCP/TLS connections established, so
+        `requests - connections_opened` is roughly the number of handshakes saved
+        by keep-alive. `idle_connections` are open connections parked in the pools.
+        """
+        with self._lock:
+            stats = dict(self.stats)
+        connections_opened = 0
+        pooled_requests = 0
+        idle_connections = 0
+        host_pools = 0
+        for pool_key in list(self.adapter.poolmanager.pools.keys()):
+            pool = self.adapter.poolmanager.pools.get(pool_key)
+            if pool is None:
+                continue
+            host_pools += 1
+            connections_opened += pool.num_connections
+            pooled_requests += pool.num_requests
+            if pool.pool is not None:
+                idle_connections += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+        stats.update({
+            "host_pools": host_pools,
+            "pool_maxsize": self.pool_maxsize,
+            "connections_opened": connections_opened,
+            "connections_reused": max(pooled_requests - connections_opened, 0),
+            "idle_connections": idle_connections,
+            "pool_utilization": stats["in_flight"] / self.pool_maxsize if self.pool_maxsize else 0.0,
+        })
+        return stats
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncHTTPTransport:
+    """
+    Pooled keep-alive HTTP transport for asyncio code, built on httpx.AsyncClient.
+
+    Mirrors HTTPTransport: (connect, read) timeouts, gzip, and jittered
+    exponential backoff retries on 5xx responses and connection errors. HTTP/2
+    is negotiated when the optional `h2` package is installed, so concurrent
+    requests to one host are multiplexed over a single connection.
+
+    httpx clients are bound to the event loop they were first used on, so one
+    client is kept per running loop and dropped when that loop is garbage collected.
+    """
+
+    def __init__(self, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 pool_maxsize: int = DEFAULT_POOL_MAXSIZE, max_retries: int = DEFAULT_MAX_RETRIES,
+                 backoff_factor: float = DEFAULT_BACKOFF_FACTOR, backoff_jitter: float = DEFAULT_BACKOFF_JITTER,
+                 http2: bool = True):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+        self.http2 = http2 and _h2_available()
+
+        self._clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.stats = {
+            "requests": 0,
+            "errors": 0,
+            "retries": 0,
+            "in_flight": 0,
+            "peak_in_flight": 0,
+            "http_versions": {},
+        }
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=self.pool_maxsize, max_keepalive_connections=self.pool_maxsize),
+                headers={"Accept-Encoding": "gzip, deflate"},
+            )
+            self._clients[loop] = client
+        return client
+
+    def _backoff_seconds(self, attempt: int) -> float:
+        return self.backoff_factor * (2 ** (attempt - 1)) + random.uniform(0, self.backoff_jitter)
+
+    async def get(self, url: str, headers: dict = None, params: dict = None, timeout=None) -> httpx.Response:
+        """
+        Send a GET request through the pooled client for the running event loop.
+
+        Parameters:
+            url (str): The request URL.
+            headers (dict): Extra request headers.
+            params (dict): Query string parameters.
+            timeout (float or httpx.Timeout): Overrides the transport's timeout.
+        Returns:
+            httpx.Response: The final response after any retries.
+        Raises:
+            httpx.HTTPError: If the request still fails after all retries.
+        """
+        client = self._get_client()
+        request_kwargs = {"headers": headers, "params": params}
+        if timeout is not None:
+            request_kwargs["timeout"] = timeout
+
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["in_flight"] += 1
+            self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.stats["in_flight"])
+        try:
+            attempt = 0
+            while True:
+                try:
+                    response = await client.get(url, **request_kwargs)
+                    if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                        break
+                except httpx.TransportError:
+                    if attempt >= self.max_retries:
+                        with self._lock:
+                            self.stats["errors"] += 1
+                        raise
+                attempt += 1
+                with self._lock:
+                    self.stats["retries"] += 1
+                await asyncio.sleep(self._backoff_seconds(attempt))
+        finally:
+            with self._lock:
+                self.stats["in_flight"] -= 1
+
+        with self._lock:
+            http_versions = self.stats["http_versions"]
+            http_versions[response.http_version] = http_versions.get(response.http_version, 0) + 1
+        return response
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["http_versions"] = dict(self.stats["http_versions"])
+        stats.update({
+            "http2_enabled": self.http2,
+            "clients": len(self._clients),
+            "pool_maxsize": self.pool_maxsize,
+            "pool_utilization": stats["in_flight"] / self.pool_maxsize if self.pool_maxsize else 0.0,
+        })
+        return stats
+
+    async def aclose(self):
+        """Close the client bound to the running event loop."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.info("Package 'h2' is not installed; async Walmart requests will use HTTP/1.1")
+        return False
+    return True
+
+
+_shared_transport = None
+_shared_async_transport = None
+_shared_transport_lock = threading.Lock()
+
+
+def get_shared_transport() -> HTTPTransport:
+    """Return the process-wide HTTP transport, creating it with default settings on first use."""
+    global _shared_transport
+    with _shared_transport_lock:
+        if _shared_transport is None:
+            _shared_transport = HTTPTransport()
+        return _shared_transport
+
+
+def configure_shared_transport(**transport_kwargs) -> HTTPTransport:
+    """
+    Replace the process-wide HTTP transport with one built from `transport_kwargs`.
+
+    Clients that use the shared transport pick up the new one on their next
+    request; clients constructed with an explicit transport keep using it. The
+    replaced transport's session is closed, releasing its pooled connections.
+    """
+    global _shared_transport
+    with _shared_transport_lock:
+        old_transport = _shared_transport
+        _shared_transport = new_transport = HTTPTransport(**transport_kwargs)
+        if old_transport is not None:
+            old_transport.close()
+    if old_transport is not None:
+        logger.info("Replaced shared HTTP transport")
+    return new_transport
+
+
+def get_shared_async_transport() -> AsyncHTTPTransport:
+    """Return the process-wide asyncio HTTP transport, creating it with default settings on first use."""
+    global _shared_async_transport
+    with _shared_transport_lock:
+        if _shared_async_transport is None:
+            _shared_async_transport = AsyncHTTPTransport()
+        return _shared_async_transport
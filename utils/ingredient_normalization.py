@@ -0,0 +1,142 @@
+"""
+Ingredient normalization and de-duplication before product search.
+
+Recipes often list one product on several lines, e.g. "salt" for a marinade
+and "salt" for a sauce, or "butter, softened" and "butter, melted". Such lines
+get the same canonical name: preparation notes are dropped, then the name is
+normalized like a search query. Lines with the same canonical name merge into
+one IngredientGroup with their quantities summed, so each product is searched
+(and chosen by the LLM) once. Each group remembers its original line indices,
+so results can be mapped back onto every line.
+"""
+import re
+from fractions import Fraction
+from typing import NamedTuple
+
+from utils.search_cache import normalize_query
+
+# Words that describe how an ingredient is prepared rather than what to buy.
+# Words naming a product form that is sold as such ("ground beef", "shredded cheese", "fresh basil") are kept.
+PREPARATION_WORDS = {
+    "chopped", "minced", "diced", "peeled", "seeded", "softened", "melted", "cubed", "julienned", "halved",
+    "quartered", "beaten", "sifted", "packed", "divided", "drained", "rinsed", "trimmed", "thawed", "room",
+    "temperature", "finely", "roughly", "coarsely", "thinly", "freshly", "lightly", "optional",
+    "to", "taste",
+}
+
+# Joins quantities that cannot be added into one, e.g. "1 can + 2 cup" (see sum_quantities).
+QUANTITY_SEPARATOR = " + "
+
+# Canonical spelling of common recipe units.
+UNIT_ALIASES = {
+    "t": "tsp", "teaspoon": "tsp", "tsp": "tsp",
+    "tbsp": "tbsp", "tbs": "tbsp", "tablespoon": "tbsp",
+    "c": "cup", "cup": "cup",
+    "oz": "oz", "ounce": "oz", "fl oz": "fl oz", "fluid ounce": "fl oz",
+    "lb": "lb", "lbs": "lb", "pound": "lb",
+    "g": "g", "gram": "g", "kg": "kg", "kgs": "kg", "kilogram": "kg", "mg": "mg",
+    "ml": "ml", "milliliter": "ml", "l": "l", "liter": "l",
+    "pt": "pint", "pint": "pint", "qt": "quart", "qts": "quart", "quart": "quart", "gal": "gal", "gallon": "gal",
+    "ct": "ct", "count": "ct", "each": "each", "ea": "each", "dozen": "dozen",
+    "clove": "clove", "can": "can", "pinch": "pinch", "dash": "dash", "stick": "stick",
+    "slice": "slice", "package": "package", "bunch": "bunch",
+}
+
+_UNICODE_FRACTIONS = {
+    "½": " 1/2", "¼": " 1/4", "¾": " 3/4", "⅓": " 1/3", "⅔": " 2/3", "⅛": " 1/8", "⅜": " 3/8", "⅝": " 5/8", "⅞": " 7/8",
+}
+_QUANTITY_PATTERN = re.compile(r"^\s*(\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)\s*(.*?)\s*$")
+_PARENTHETICAL_PATTERN = re.compile(r"\([^)]*\)")
+
+
+class IngredientGroup(NamedTuple):
+    name: str
+    quantity: str
+    line_indices: list
+
+
+def canonical_ingredient_name(name: str) -> str:
+    """
+    Canonicalize an ingredient line's name: "Butter, softened" and "melted butter" both become "butter".
+    """
+    name = _PARENTHETICAL_PATTERN.sub(" ", str(name or "")).split(",")[0]
+    words = [word for word in normalize_query(name).split() if word not in PREPARATION_WORDS]
+    return " ".join(words) or normalize_query(name)
+
+
+def parse_quantity(quantity: str):
+    """
+    Split a quantity such as "1 1/2 cups" into an amount and a canonical unit.
+
+    Returns:
+        tuple: (Fraction, unit str, "" if there is none), or None if the quantity has no leading number.
+    """
+    text = str(quantity or "")
+    for unicode_fraction, replacement in _UNICODE_FRACTIONS.items():
+        text = text.replace(unicode_fraction, replacement)
+    match = _QUANTITY_PATTERN.match(text)
+    if match is None:
+        return None
+    amount = sum((Fraction(part) for part in match.group(1).split()), Fraction(0))
+    unit = normalize_query(match.group(2))
+    return amount, UNIT_ALIASES.get(unit, unit)
+
+
+def format_quantity(amount: Fraction, unit: str) -> str:
+    """Format an amount as a mixed number with its unit, e.g. (Fraction(3, 2), "cup") -> "1 1/2 cup"."""
+    amount = amount.limit_denominator(16)
+    whole, remainder = divmod(amount.numerator, amount.denominator)
+    if remainder == 0:
+        number = str(whole)
+    elif whole == 0:
+        number = f"{remainder}/{amount.denominator}"
+    else:
+        number = f"{whole} {remainder}/{amount.denominator}"
+    return f"{number} {unit}".strip()
+
+
+def sum_quantities(quantities: list) -> str:
+    """
+    Sum quantities per unit ("1 tbsp" + "2 tablespoons" -> "3 tbsp").
+
+    The totals of different units are joined with " + ", in order of first appearance:
+    ["1 can", "1 can", "2 cups"] -> "2 can + 2 cup". Quantities without a number
+    ("to taste") are kept once each.
+    """
+    quantities = [str(quantity).strip() for quantity in quantities if str(quantity or "").strip()]
+    if len(quantities) <= 1:
+        return quantities[0] if quantities else ""
+    totals = {}  # unit -> summed amount, or unparsed quantity text -> None
+    for quantity in quantities:
+        parsed = parse_quantity(quantity)
+        if parsed is None:
+            totals.setdefault(quantity, None)
+        else:
+            amount, unit = parsed
+            totals[unit] = totals.get(unit, Fraction(0)) + amount
+    return QUANTITY_SEPARATOR.join(
+        part if amount is None else format_quantity(amount, part) for part, amount in totals.items()
+    )
+
+
+def group_ingredients(lines: list, name_key: str = "ingredient", quantity_key: str = "quantity") -> list:
+    """
+    Merge ingredient lines that name the same product.
+
+    Parameters:
+        lines (list of dict): Ingredient or shopping list lines.
+        name_key (str): Key holding the name to de-duplicate on, e.g. "product" for shopping lists.
+        quantity_key (str): Key holding the line's quantity.
+    Returns:
+        list of IngredientGroup: One group per distinct canonical name, in order of first
+            appearance, with the summed quantity and the indices of its lines.
+    """
+    groups = {}
+    for index, line in enumerate(lines):
+        name = canonical_ingredient_name(line.get(name_key, ""))
+        groups.setdefault(name, []).append(index)
+    return [
+        IngredientGroup(name, sum_quantities([lines[index].get(quantity_key, "") for index in line_indices]),
+                        line_indices)
+        for name, line_indices in groups.items()
+    ]
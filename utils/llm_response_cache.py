@@ -0,0 +1,190 @@
+"""
+Content-addressed cache of deterministic LLM responses.
+
+The cart agent's temperature-0 tool calls are asked again and again with the
+same inputs: the same recipe is extracted on every retry, and the same ingredient
+is matched against the same search results for every user who cooks that dish.
+OpenAIClientWrapper.query looks such queries up here before calling the API.
+
+Entries are keyed by a SHA-256 digest of the chat.completions.create() arguments
+(model, normalized messages, tools, tool_choice, response_format, ...), and hold
+the response message as JSON. They are kept in memory (a TTLLRUCache) in front
+of a SQLite tier (a PersistentResponseCache of its own) that survives restarts.
+
+Set LLM_RESPONSE_CACHE=0 to turn the cache off for the process, or pass
+`use_cache=False` to a single query.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from typing import Optional
+
+from pydantic import BaseModel
+
+from utils.response_cache import PersistentResponseCache
+from utils.search_cache import TTLLRUCache
+
+LLM_RESPONSE_CACHE_ENABLED = os.getenv("LLM_RESPONSE_CACHE", "1").lower() not in ("0", "false", "no", "off")
+DEFAULT_LLM_RESPONSE_CACHE_PATH = os.getenv(
+    "LLM_RESPONSE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "llm_responses.sqlite3")
+)
+DEFAULT_LLM_RESPONSE_CACHE_MAXSIZE = 1024
+DEFAULT_LLM_RESPONSE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Bump to orphan every stored entry when the key or stored format changes.
+LLM_CACHE_KEY_VERSION = 1
+
+# Responses cut short (finish_reason "length" or "content_filter") are not worth replaying.
+CACHEABLE_FINISH_REASONS = {"stop", "tool_calls"}
+
+# Message fields the model sees; anything else (refusal, annotations, audio, ...) is response metadata.
+_MESSAGE_FIELDS = ("role", "content", "name", "tool_calls", "tool_call_id")
+
+
+def is_deterministic_query(query_args: dict) -> bool:
+    """Whether chat.completions.create() arguments ask for a temperature-0, non-streamed response."""
+    return query_args.get("temperature") == 0 and not query_args.get("stream")
+
+
+def normalize_message(message, tool_call_ids: dict) -> dict:
+    """
+    Reduce a context message to the fields the model sees, as a plain dict.
+
+    Response messages echoed back into the context (ChatCompletionMessage objects)
+    compare equal to the same message written as a dict. Tool call ids are random
+    per response, so each is renumbered by order of appearance through `tool_call_ids`,
+    which is shared by all messages of a context.
+    """
+    if isinstance(message, BaseModel):
+        message = message.model_dump(exclude_none=True)
+    normalized = {field: message[field] for field in _MESSAGE_FIELDS if message.get(field) is not None}
+
+    def renumber(tool_call_id):
+        return tool_call_ids.setdefault(tool_call_id, f"call_{len(tool_call_ids)}")
+
+    if normalized.get("tool_calls"):
+        normalized["tool_calls"] = [
+            {"id": renumber(tool_call["id"]), "type": tool_call.get("type", "function"),
+             "function": {"name": tool_call["function"]["name"],
+                          "arguments": tool_call["function"]["arguments"]}}
+            for tool_call in normalized["tool_calls"]
+        ]
+    else:
+        normalized.pop("tool_calls", None)
+    if "tool_call_id" in normalized:
+        normalized["tool_call_id"] = renumber(normalized["tool_call_id"])
+    return normalized
+
+
+def _to_json_value(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump(exclude_none=True)
+    return str(value)
+
+
+def llm_cache_key(query_args: dict) -> str:
+    """
+    Content address of a query: SHA-256 of its arguments as canonical JSON, with normalized messages.
+
+    Parameters:
+        query_args (dict): chat.completions.create() arguments, as built by OpenAIClientWrapper.build_query_args.
+    Returns:
+        str: Hex digest, prefixed with "llm:".
+    """
+    tool_call_ids = {}
+    payload = dict(query_args, messages=[normalize_message(message, tool_call_ids)
+                                         for message in query_args["messages"]])
+    payload["cache_key_version"] = LLM_CACHE_KEY_VERSION
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_to_json_value)
+    return "llm:" + hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    def __init__(self, db_path: Optional[str] = DEFAULT_LLM_RESPONSE_CACHE_PATH,
+                 maxsize: int = DEFAULT_LLM_RESPONSE_CACHE_MAXSIZE, ttl: float = DEFAULT_LLM_RESPONSE_TTL_SECONDS):
+        """
+        Parameters:
+            db_path (str, optional): SQLite file of the disk tier; None keeps responses in memory only.
+            maxsize (int): Responses kept in memory.
+            ttl (float): Seconds a response is served for, in either tier.
+        """
+        self.memory = TTLLRUCache(maxsize=maxsize, ttl=ttl)
+        # Equal fresh and stale TTLs: a replayed LLM response is never served while being refreshed.
+        self.disk = PersistentResponseCache(db_path, ttls={"llm": (ttl, ttl)}) if db_path else None
+        self._lock = threading.Lock()
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+        }
+
+    def _count(self, stat_name: str):
+        with self._lock:
+            self.stats[stat_name] += 1
+
+    def get(self, cache_key: str) -> Optional[str]:
+        """The stored response JSON for `cache_key`, or None. Disk hits are copied into memory."""
+        value = self._get_from_memory(cache_key)
+        return value if value is not None else self._get_from_disk(cache_key)
+
+    async def get_async(self, cache_key: str) -> Optional[str]:
+        """`get` for coroutines: the memory tier is read on the event loop, the disk tier on a worker thread."""
+        value = self._get_from_memory(cache_key)
+        if value is not None or self.disk is None:
+            return value if value is not None else self._get_from_disk(cache_key)
+        return await asyncio.to_thread(self._get_from_disk, cache_key)
+
+    def _get_from_memory(self, cache_key: str) -> Optional[str]:
+        value = self.memory.get(cache_key)
+        if value is not None:
+            self._count("memory_hits")
+        return value
+
+    def _get_from_disk(self, cache_key: str) -> Optional[str]:
+        cached_response = self.disk.get(cache_key) if self.disk is not None else None
+        if cached_response is None:
+            self._count("misses")
+            return None
+        self.memory.set(cache_key, cached_response.value)
+        self._count("disk_hits")
+        return cached_response.value
+
+    def set(self, cache_key: str, value: str):
+        self.memory.set(cache_key, value)
+        if self.disk is not None:
+            self.disk.set(cache_key, "llm", value)
+        self._count("writes")
+
+    async def set_async(self, cache_key: str, value: str):
+        """`set` for coroutines, writing the disk tier on a worker thread."""
+        self.memory.set(cache_key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, cache_key, "llm", value)
+        self._count("writes")
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        stats["memory_entries"] = len(self.memory)
+        if self.disk is not None:
+            stats["disk"] = self.disk.get_stats()
+        return stats
+
+
+_shared_llm_response_cache = None
+_shared_llm_response_cache_lock = threading.Lock()
+
+
+def get_shared_llm_response_cache() -> LLMResponseCache:
+    """Return the process-wide LLM response cache, opening it on first use."""
+    global _shared_llm_response_cache
+    with _shared_llm_response_cache_lock:
+        if _shared_llm_response_cache is None:
+            _shared_llm_response_cache = LLMResponseCache()
+        return _shared_llm_response_cache
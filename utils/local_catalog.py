@@ -0,0 +1,132 @@
+"""
+Local product catalog used to answer searches while the Walmart API is unavailable.
+
+The catalog is a snapshot loaded once per process from a JSON mirror of Walmart
+items (`{"items": [...]}`, e.g. saved from search or lookup responses) named by
+the WALMART_LOCAL_CATALOG_PATH environment variable. Its item ids end up in
+Walmart add-to-cart URLs, so without a mirror there is no fallback at all:
+grocery_DB/products.csv (SAMPLE_CATALOG_PATH) holds synthetic ids, brands and
+prices, and is only loaded explicitly, for tests and offline development.
+
+An inverted index from normalized name words to items answers a search with a
+few dictionary reads, and results come back as a Walmart-shaped `search`
+response so callers parse them exactly like live results.
+"""
+import csv
+import json
+import logging
+import os
+import threading
+
+from utils.search_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCAL_CATALOG_PATH = os.getenv("WALMART_LOCAL_CATALOG_PATH")
+# Synthetic products (made-up item ids, brands and prices); never a default, as its ids are not Walmart's.
+SAMPLE_CATALOG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "grocery_DB",
+                                   "products.csv")
+DEFAULT_NUM_ITEMS = 10
+
+# Marks responses built from the local catalog rather than returned by Walmart.
+LOCAL_CATALOG_SOURCE = "local_catalog"
+
+_STOCK_BY_AVAILABILITY = {
+    "In Stock": "Available",
+    "Limited Stock": "Available",
+    "Out of Stock": "Not available",
+}
+
+
+def _item_from_row(row: dict) -> dict:
+    """Shape a grocery_DB/products.csv row like an item of a Walmart `search` response."""
+    return {
+        "itemId": int(row["product_id"]),
+        "name": f"{row['Brand']} {row['item']}" if row.get("Brand") not in (None, "", "N/A") else row["item"],
+        "salePrice": float(row["Price"]) if row.get("Price") else None,
+        "brandName": row.get("Brand"),
+        "categoryPath": f"Food/{row['Category']}" if row.get("Category") else None,
+        "customerRating": row.get("CustomerRating"),
+        "stock": _STOCK_BY_AVAILABILITY.get(row.get("Availability"), "Available"),
+        "offerType": "ONLINE_AND_STORE",
+    }
+
+
+class LocalCatalog:
+    """Word-indexed product snapshot answering `search` requests offline."""
+
+    def __init__(self, items: list[dict]):
+        self.items = items
+        self._name_words = []
+        self._items_by_word = {}
+        for i, item in enumerate(items):
+            words = set(normalize_query(item.get("name") or "").split())
+            self._name_words.append(words)
+            for word in words:
+                self._items_by_word.setdefault(word, []).append(i)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalCatalog":
+        """Load a products CSV in the grocery_DB format, or a JSON mirror of Walmart items."""
+        if path.endswith(".json"):
+            with open(path, "r", encoding="utf-8") as catalog_file:
+                return cls(json.load(catalog_file).get("items", []))
+        with open(path, newline="", encoding="utf-8") as catalog_file:
+            return cls([_item_from_row(row) for row in csv.DictReader(catalog_file)])
+
+    def __len__(self):
+        return len(self.items)
+
+    def search(self, search_term: str, num_items: int = None, start: int = None) -> dict:
+        """
+        Search the catalog like the `search` endpoint.
+
+        Items sharing the most words with the term rank first; ties go to items whose
+        name is mostly made of matched words, then to in-stock items.
+
+        Parameters:
+            search_term (str): The query string.
+            num_items (int): Page size. Defaults to the API's 10.
+            start (int): 1-based index of the first result to return.
+        Returns:
+            dict: A `search` response with an extra "source": "local_catalog" key.
+        """
+        query_words = set(normalize_query(search_term).split())
+        candidates = {i for word in query_words for i in self._items_by_word.get(word, ())}
+        ranked = sorted(candidates, key=lambda i: (
+            -len(self._name_words[i] & query_words),
+            -len(self._name_words[i] & query_words) / len(self._name_words[i]),
+            self.items[i].get("stock") != "Available",
+            i,
+        ))
+        num_items = num_items or DEFAULT_NUM_ITEMS
+        start = max(int(start or 1), 1)
+        page = [self.items[i] for i in ranked[start - 1:start - 1 + num_items]]
+        return {"query": search_term, "totalResults": len(ranked), "start": start, "numItems": len(page),
+                "items": page, "source": LOCAL_CATALOG_SOURCE}
+
+    def search_response_text(self, params: dict) -> str:
+        """Answer the query parameters of a `search` request (see build_search_params) with response text."""
+        return json.dumps(self.search(params.get("query", ""), params.get("numItems"), params.get("start")))
+
+
+_shared_local_catalog = None
+_shared_local_catalog_loaded = False
+_shared_local_catalog_lock = threading.Lock()
+
+
+def get_shared_local_catalog(path: str = DEFAULT_LOCAL_CATALOG_PATH) -> LocalCatalog:
+    """Return the process-wide local catalog, loading it on first use, or None if none is configured or readable."""
+    global _shared_local_catalog, _shared_local_catalog_loaded
+    with _shared_local_catalog_lock:
+        if _shared_local_catalog is None and not _shared_local_catalog_loaded:
+            _shared_local_catalog_loaded = True
+            if not path:
+                logger.info("No local product catalog configured (WALMART_LOCAL_CATALOG_PATH); searches will not "
+                            "fall back while the Walmart API is unavailable")
+                return None
+            try:
+                _shared_local_catalog = LocalCatalog.load(path)
+            except (OSError, ValueError, KeyError, AttributeError) as e:
+                logger.warning(f"Could not load local product catalog {path}: {e}")
+        return _shared_local_catalog
@@ -0,0 +1,178 @@
+"""
+Deterministic pack-size math: how many packages of a product cover a recipe quantity.
+
+A recipe quantity ("2 1/2 cups", "1 lb", "3") and a product's package size
+(the Walmart `size` field, or the size in its name such as "Whole Milk, 1 gal")
+are each parsed into an amount in one of three dimensions: grams, milliliters
+or items. When the two dimensions differ, the amount is converted through a
+density or per-item weight looked up by ingredient name. Quantities already
+counted in packages ("2 cans") are bought as stated. If a quantity or size
+cannot be parsed or converted, one package is bought. Summed quantities that
+mix units ("1 can + 2 cup", see sum_quantities) add up the packages each part
+needs before rounding up.
+
+Parsing is memoized, so `packages_for_cart` handles a whole cart while each
+distinct quantity, size and ingredient is parsed only once.
+"""
+import math
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+from utils.ingredient_normalization import QUANTITY_SEPARATOR, UNIT_ALIASES, canonical_ingredient_name, parse_quantity
+from utils.search_cache import normalize_query
+
+MASS, VOLUME, COUNT, PACKAGE = "g", "ml", "count", "package"
+
+# Base amount of each unit: grams for mass, milliliters for volume, items for counts.
+UNIT_AMOUNTS = {
+    "mg": (MASS, 0.001), "g": (MASS, 1.0), "kg": (MASS, 1000.0), "oz": (MASS, 28.3495), "lb": (MASS, 453.592),
+    "stick": (MASS, 113.4),
+    "ml": (VOLUME, 1.0), "l": (VOLUME, 1000.0), "tsp": (VOLUME, 4.92892), "tbsp": (VOLUME, 14.7868),
+    "fl oz": (VOLUME, 29.5735), "cup": (VOLUME, 236.588), "pint": (VOLUME, 473.176), "quart": (VOLUME, 946.353),
+    "gal": (VOLUME, 3785.41), "pinch": (VOLUME, 0.3), "dash": (VOLUME, 0.6),
+    "each": (COUNT, 1.0), "ct": (COUNT, 1.0), "clove": (COUNT, 1.0), "slice": (COUNT, 1.0), "dozen": (COUNT, 12.0),
+}
+
+# Units that already name a store package: "2 cans" means two of the product.
+PACKAGE_UNITS = {"can", "package", "jar", "bottle", "box", "bag", "bunch", "head", "loaf", "carton", "container",
+                 "pack", "pk"}
+
+# Grams per milliliter of common ingredients, matched against the words of the canonical ingredient name.
+DENSITIES = {
+    "water": 1.0, "milk": 1.03, "cream": 1.0, "buttermilk": 1.03, "yogurt": 1.05, "broth": 1.0, "stock": 1.0,
+    "juice": 1.04, "vinegar": 1.01, "wine": 0.99, "oil": 0.92, "butter": 0.96, "honey": 1.42, "syrup": 1.33,
+    "molasses": 1.4, "flour": 0.53, "sugar": 0.85, "brown sugar": 0.93, "powdered sugar": 0.56, "salt": 1.2,
+    "baking soda": 0.92, "baking powder": 0.9, "cocoa": 0.42, "rice": 0.85, "oat": 0.41, "cornstarch": 0.54,
+    "cornmeal": 0.65, "cheese": 0.45, "parmesan": 0.4, "chocolate chip": 0.72, "peanut butter": 1.09,
+    "mayonnaise": 0.91, "ketchup": 1.15, "sour cream": 1.01, "breadcrumb": 0.45, "nut": 0.55, "bean": 0.75,
+}
+
+# Grams per item of produce and other things recipes count.
+ITEM_WEIGHTS = {
+    "egg": 50, "onion": 150, "potato": 200, "sweet potato": 250, "apple": 180, "banana": 120, "lemon": 100,
+    "lime": 65, "orange": 150, "tomato": 120, "carrot": 60, "bell pepper": 150, "jalapeno": 15, "avocado": 170,
+    "zucchini": 200, "cucumber": 300, "shallot": 40, "garlic": 5, "chicken breast": 225, "tortilla": 45,
+}
+
+_SIZE_PATTERN = re.compile(r"(?:(\d+)\s*(?:x|×)\s*)?(\d+(?:\.\d+)?|\.\d+)\s*(fl\.?\s*oz\b|[a-z]+)", re.IGNORECASE)
+
+
+class Amount(NamedTuple):
+    dimension: str
+    value: float
+
+
+def _unit_amount(unit_text: str) -> Optional[Amount]:
+    """The base amount of one `unit_text` ("cups packed" -> one cup in ml), or None if it names no known unit."""
+    words = normalize_query(unit_text).split()
+    for length in (2, 1):
+        unit = UNIT_ALIASES.get(" ".join(words[:length]), " ".join(words[:length]))
+        if unit in UNIT_AMOUNTS:
+            return Amount(*UNIT_AMOUNTS[unit])
+        if length == 1 and unit in PACKAGE_UNITS:
+            return Amount(PACKAGE, 1.0)
+    return None
+
+
+@lru_cache(maxsize=4096)
+def recipe_amount(quantity: str) -> Optional[Amount]:
+    """
+    Parse a recipe quantity: "2 1/2 cups" -> Amount("ml", 591.47), "3" -> Amount("count", 3.0).
+
+    A number followed by an unknown word ("2 large") counts items. Returns None without a leading number.
+    """
+    parsed = parse_quantity(quantity)
+    if parsed is None:
+        return None
+    amount, unit = parsed
+    unit_amount = _unit_amount(unit) if unit else None
+    if unit_amount is None:
+        return Amount(COUNT, float(amount))
+    return Amount(unit_amount.dimension, float(amount) * unit_amount.value)
+
+
+@lru_cache(maxsize=4096)
+def package_amount(size: Optional[str], name: Optional[str] = None) -> Optional[Amount]:
+    """
+    Parse a package size from a Walmart `size` field, or failing that from the product name.
+
+    Multipacks multiply out: "12 x 12 fl oz" -> Amount("ml", 4258.58). Returns None if neither names a size.
+    """
+    for text in (size, name):
+        for count, number, unit in _SIZE_PATTERN.findall(str(text or "")):
+            unit_amount = _unit_amount(unit)
+            if unit_amount is None or unit_amount.dimension == PACKAGE:
+                continue
+            return Amount(unit_amount.dimension, float(number) * unit_amount.value * int(count or 1))
+    return None
+
+
+def _lookup(table: dict, ingredient: str) -> Optional[float]:
+    """The entry of `table` for the longest key found in a canonical ingredient name."""
+    name = f" {ingredient} "
+    matches = [key for key in table if f" {key} " in name]
+    return table[max(matches, key=len)] if matches else None
+
+
+@lru_cache(maxsize=4096)
+def convert_amount(amount: Amount, dimension: str, ingredient: str) -> Optional[float]:
+    """
+    Convert `amount` to `dimension` via grams, using the density or item weight of a canonical ingredient name.
+
+    Returns None if a needed density or item weight is unknown.
+    """
+    if amount.dimension == dimension:
+        return amount.value
+    density = _lookup(DENSITIES, ingredient)
+    item_weight = _lookup(ITEM_WEIGHTS, ingredient)
+    to_grams = {MASS: 1.0, VOLUME: density, COUNT: item_weight}
+    if to_grams.get(amount.dimension) is None or to_grams.get(dimension) is None:
+        return None
+    return amount.value * to_grams[amount.dimension] / to_grams[dimension]
+
+
+def _packages_needed(needed: Amount, package: Optional[Amount], ingredient: str) -> Optional[float]:
+    """How many packages (possibly a fraction of one) cover `needed`, or None if it cannot be worked out."""
+    if needed.dimension == PACKAGE:
+        return needed.value
+    if package is None:
+        # Products without a size are sold by the item.
+        return needed.value if needed.dimension == COUNT else None
+    needed_value = convert_amount(needed, package.dimension, canonical_ingredient_name(ingredient))
+    if needed_value is None or package.value <= 0:
+        return None
+    return needed_value / package.value
+
+
+def packages_to_buy(quantity: str, ingredient: str, size: Optional[str] = None, name: Optional[str] = None) -> int:
+    """
+    How many packages of a product cover a recipe quantity of an ingredient.
+
+    Parameters:
+        quantity (str): Recipe quantity, e.g. "2 1/2 cups", or summed quantities such as "1 can + 2 cup".
+        ingredient (str): Ingredient or search term, used for densities and item weights.
+        size (str, optional): The product's Walmart `size` field, e.g. "5 lb".
+        name (str, optional): The product name, searched for a size when `size` has none.
+    Returns:
+        int: At least 1.
+    """
+    package = package_amount(size, name)
+    packages = 0.0
+    for part in str(quantity or "").split(QUANTITY_SEPARATOR):
+        needed = recipe_amount(part)
+        part_packages = _packages_needed(needed, package, ingredient) if needed is not None else None
+        packages += part_packages if part_packages is not None else 1
+    # Tolerate rounding in unit factors, so 16 oz of a "1 lb" product is one package.
+    return max(1, math.ceil(packages - 1e-3))
+
+
+def packages_for_cart(lines) -> list[int]:
+    """
+    `packages_to_buy` for every (quantity, ingredient, size, name) tuple of a cart.
+
+    Identical lines are computed once.
+    """
+    lines = [tuple(line) for line in lines]
+    counts = {line: packages_to_buy(*line) for line in dict.fromkeys(lines)}
+    return [counts[line] for line in lines]
@@ -0,0 +1,154 @@
+"""
+Projected parsing of Walmart search responses into compact product records.
+
+A search response carries ~25 items with dozens of fields each, but callers
+only use a handful. When `msgspec` is installed the response is decoded
+straight into typed structs declaring just those fields, so everything else is
+skipped without ever becoming Python objects. Otherwise `orjson` (or the
+standard library `json`) decodes the payload and the fields are picked out
+afterwards. Either way the stock and offerType filters are applied while the
+records are built.
+
+Records are immutable and hashable, so equal records can be shared: carts keep
+the one pooled instance from `shared_product_record` rather than their own copies.
+"""
+import json
+from typing import NamedTuple, Optional
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from utils.search_cache import TTLLRUCache
+
+AVAILABLE_STOCK = "Available"
+IN_STORE_OFFER_TYPES = ("ONLINE_AND_STORE", "STORE_ONLY")
+
+
+class ProductRecord(NamedTuple):
+    itemId: int
+    name: str
+    salePrice: Optional[float] = None
+    size: Optional[str] = None
+    stock: Optional[str] = None
+    offerType: Optional[str] = None
+    thumbnailImage: Optional[str] = None
+    categoryPath: Optional[str] = None
+
+
+def is_available_in_store(stock, offer_type) -> bool:
+    """Whether an item is in stock and can be bought in a store."""
+    return stock == AVAILABLE_STOCK and offer_type in IN_STORE_OFFER_TYPES
+
+
+_loads = orjson.loads if orjson is not None else json.loads
+_RECORD_FIELDS = ProductRecord._fields
+
+# Pool of recently seen records, so equal products across carts and conversations share one instance.
+_record_pool = TTLLRUCache(maxsize=8192, ttl=float("inf"))
+
+
+def record_from_item(item: dict) -> ProductRecord:
+    """Keep only the record fields of a raw Walmart item."""
+    return ProductRecord(*(item.get(field) for field in _RECORD_FIELDS))
+
+
+def shared_product_record(item) -> ProductRecord:
+    """
+    Return the pooled record equal to `item` (a raw Walmart item or a ProductRecord), adding it if it is new.
+    """
+    record = item if isinstance(item, ProductRecord) else record_from_item(item)
+    try:
+        pooled = _record_pool.get(record)
+    except TypeError:
+        # An unhashable field value (e.g. a nested dict from an unexpected payload) cannot be pooled.
+        return record
+    if pooled is None:
+        _record_pool.set(record, record)
+        return record
+    return pooled
+
+
+def _project_items(response_text) -> list[ProductRecord]:
+    """Decode the whole payload, then keep only the record fields of each item."""
+    return [
+        record_from_item(item)
+        for item in _loads(response_text).get("items") or []
+        if item.get("itemId") is not None
+    ]
+
+
+if msgspec is not None:
+    class _SearchItem(msgspec.Struct, gc=False):
+        itemId: Optional[int] = None
+        name: Optional[str] = None
+        salePrice: Optional[float] = None
+        size: Optional[str] = None
+        stock: Optional[str] = None
+        offerType: Optional[str] = None
+        thumbnailImage: Optional[str] = None
+        categoryPath: Optional[str] = None
+
+    class _SearchResponse(msgspec.Struct, gc=False):
+        items: list[_SearchItem] = []
+
+    _search_response_decoder = msgspec.json.Decoder(_SearchResponse, strict=False)
+
+    def _decode_items(response_text) -> list[ProductRecord]:
+        try:
+            items = _search_response_decoder.decode(response_text).items
+        except msgspec.ValidationError:
+            # A field with an unexpected type; the generic path keeps it as-is.
+            return _project_items(response_text)
+        return [
+            ProductRecord(item.itemId, item.name, item.salePrice, item.size, item.stock, item.offerType,
+                          item.thumbnailImage, item.categoryPath)
+            for item in items
+            if item.itemId is not None
+        ]
+else:
+    _decode_items = _project_items
+
+
+def parse_search_response(response_text, available_only: bool = True) -> list[ProductRecord]:
+    """
+    Decode a raw `search` response into product records.
+
+    Parameters:
+        response_text (str or bytes): Raw response body.
+        available_only (bool): Keep only items that are in stock and sold in stores,
+            like filter_walmart_search_result_props.
+    Returns:
+        list of ProductRecord: The items in response order; empty for an empty or malformed response.
+    """
+    if not response_text:
+        return []
+    try:
+        records = _decode_items(response_text)
+    except (ValueError, TypeError, AttributeError):
+        # msgspec.DecodeError, orjson.JSONDecodeError and json.JSONDecodeError are all ValueErrors.
+        return []
+    if available_only:
+        return [record for record in records if is_available_in_store(record.stock, record.offerType)]
+    return records
+
+
+def product_details(record: ProductRecord) -> dict:
+    """The record's fields that are set, e.g. as a cart item's "item_details"."""
+    return {field: value for field, value in zip(_RECORD_FIELDS, record) if value is not None}
+
+
+def prompt_props(record: ProductRecord) -> dict:
+    """The properties shown to the LLM when choosing a product (see filter_walmart_search_result_props)."""
+    props = {"itemId": record.itemId, "name": record.name}
+    if record.salePrice is not None:
+        props["salePrice"] = record.salePrice
+    if record.size is not None:
+        props["size"] = record.size
+    return props
@@ -0,0 +1,353 @@
+"""
+Process-wide rate limiting for Walmart affiliate API requests.
+
+Requests need both a token from a token bucket (the sustained request rate
+plus a burst allowance) and a concurrency slot. The number of slots is tuned
+with AIMD: it grows by roughly one slot per window of fast successful
+responses and is halved when Walmart answers 429 or latency exceeds the target.
+Callers that cannot be admitted right away wait in a FIFO queue instead of failing.
+Threads and asyncio tasks share the same queue.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+DEFAULT_RATE_PER_SECOND = 5.0
+DEFAULT_BURST = 10
+DEFAULT_INITIAL_CONCURRENCY = 8
+DEFAULT_MIN_CONCURRENCY = 1
+DEFAULT_MAX_CONCURRENCY = 32
+DEFAULT_TARGET_LATENCY_SECONDS = 2.0
+DEFAULT_DECREASE_FACTOR = 0.5
+MAX_RETRY_AFTER_SECONDS = 30.0
+THROTTLED_STATUS_CODE = 429
+
+# Smoothing factor of the exponentially weighted moving average of response latency.
+_LATENCY_EWMA_ALPHA = 0.2
+
+
+class RateLimiterTimeout(Exception):
+    """Raised when a caller waited longer than its timeout for a request slot."""
+
+
+class _ThreadWaiter:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def wake(self):
+        self._event.set()
+
+    def wait(self, timeout: float = None):
+        self._event.wait(timeout)
+        self._event.clear()
+
+
+class _AsyncWaiter:
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+
+    def wake(self):
+        # Waiters may be woken from another thread or event loop.
+        self._loop.call_soon_threadsafe(self._event.set)
+
+    async def wait(self, timeout: float = None):
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._event.clear()
+
+
+class RatePermit:
+    """
+    Admission to send one request. Report the response with `record()` so the limiter can adapt.
+    """
+
+    def __init__(self, limiter, granted_at: float):
+        self._limiter = limiter
+        self._granted_at = granted_at
+        self.status_code = None
+        self.retry_after = None
+
+    def record(self, status_code: int, retry_after=None):
+        """
+        Record the response status (and any Retry-After header) of the permitted request.
+        """
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def throttled(self) -> bool:
+        return self.status_code == THROTTLED_STATUS_CODE
+
+    def _release(self):
+        self._limiter._release(self, time.monotonic() - self._granted_at)
+
+
+class RateLimiter:
+    def __init__(self, rate_per_second: float = DEFAULT_RATE_PER_SECOND, burst: int = DEFAULT_BURST,
+                 initial_concurrency: int = DEFAULT_INITIAL_CONCURRENCY,
+                 min_concurrency: int = DEFAULT_MIN_CONCURRENCY, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 target_latency: float = DEFAULT_TARGET_LATENCY_SECONDS,
+                 decrease_factor: float = DEFAULT_DECREASE_FACTOR):
+        if rate_per_second <= 0 or burst < 1:
+            raise ValueError("rate_per_second must be positive and burst at least 1")
+        if not 1 <= min_concurrency <= initial_concurrency <= max_concurrency:
+            raise ValueError("Expected 1 <= min_concurrency <= initial_concurrency <= max_concurrency")
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+
+        self._lock = threading.Lock()
+        self._waiters = deque()
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._concurrency_limit = float(initial_concurrency)
+        self._last_decrease_at = 0.0
+        self._in_flight = 0
+        self._latency_ewma = None
+        self.stats = {
+            "acquired": 0,
+            "queued": 0,
+            "timeouts": 0,
+            "throttled_responses": 0,
+            "slow_responses": 0,
+            "limit_increases": 0,
+            "limit_decreases": 0,
+            "peak_in_flight": 0,
+            "peak_queue_depth": 0,
+            "total_wait_seconds": 0.0,
+        }
+
+    def _refill_locked(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate_per_second)
+        self._refilled_at = now
+
+    def _try_grant_locked(self, waiter, now: float):
+        """
+        Admit `waiter` if it is first in line and a slot and a token are free.
+
+        Returns:
+            float or None: 0 if admitted, seconds until a token is available, or
+                None if the waiter must wait to be woken by a release.
+        """
+        if not self._waiters or self._waiters[0] is not waiter:
+            return None
+        if self._in_flight >= int(self._concurrency_limit):
+            return None
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._refill_locked(now)
+        if self._tokens < 1.0:
+            return (1.0 - self._tokens) / self.rate_per_second
+        self._waiters.popleft()
+        self._tokens -= 1.0
+        self._in_flight += 1
+        self.stats["acquired"] += 1
+        self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self._in_flight)
+        self._wake_next_locked()
+        return 0
+
+    def _wake_next_locked(self):
+        if self._waiters:
+            self._waiters[0].wake()
+
+    def _enqueue_locked(self, waiter):
+        self._waiters.append(waiter)
+        if len(self._waiters) > 1 or self._in_flight >= int(self._concurrency_limit):
+            self.stats["queued"] += 1
+        self.stats["peak_queue_depth"] = max(self.stats["peak_queue_depth"], len(self._waiters))
+
+    def _abandon(self, waiter, waited: float):
+        with self._lock:
+            self.stats["total_wait_seconds"] += waited
+            if waiter in self._waiters:
+                was_first = self._waiters[0] is waiter
+                self._waiters.remove(waiter)
+                if was_first:
+                    self._wake_next_locked()
+
+    def acquire(self, timeout: float = None) -> RatePermit:
+        """
+        Block until a request may be sent.
+
+        Parameters:
+            timeout (float): Maximum seconds to wait in the queue, or None to wait indefinitely.
+        Returns:
+            RatePermit: Pass it to `release()` once the response has been received.
+        Raises:
+            RateLimiterTimeout: If no slot became free within `timeout`.
+        """
+        waiter = _ThreadWaiter()
+        started_at = time.monotonic()
+        deadline = None if timeout is None else started_at + timeout
+        with self._lock:
+            self._enqueue_locked(waiter)
+        try:
+            while True:
+                now = time.monotonic()
+                with self._lock:
+                    delay = self._try_grant_locked(waiter, now)
+                    if delay == 0:
+                        self.stats["total_wait_seconds"] += now - started_at
+                        return RatePermit(self, now)
+                if deadline is not None:
+                    if now >= deadline:
+                        with self._lock:
+                            self.stats["timeouts"] += 1
+                        raise RateLimiterTimeout(f"No Walmart API request slot became free within {timeout}s")
+                    delay = deadline - now if delay is None else min(delay, deadline - now)
+                waiter.wait(delay)
+        except BaseException:
+            self._abandon(waiter, time.monotonic() - started_at)
+            raise
+
+    async def acquire_async(self, timeout: float = None) -> RatePermit:
+        """
+        Wait on the event loop until a request may be sent. See `acquire()`.
+        """
+        waiter = _AsyncWaiter()
+        started_at = time.monotonic()
+        deadline = None if timeout is None else started_at + timeout
+        with self._lock:
+            self._enqueue_locked(waiter)
+        try:
+            while True:
+                now = time.monotonic()
+                with self._lock:
+                    delay = self._try_grant_locked(waiter, now)
+                    if delay == 0:
+                        self.stats["total_wait_seconds"] += now - started_at
+                        return RatePermit(self, now)
+                if deadline is not None:
+                    if now >= deadline:
+                        with self._lock:
+                            self.stats["timeouts"] += 1
+                        raise RateLimiterTimeout(f"No Walmart API request slot became free within {timeout}s")
+                    delay = deadline - now if delay is None else min(delay, deadline - now)
+                await waiter.wait(delay)
+        except BaseException:
+            self._abandon(waiter, time.monotonic() - started_at)
+            raise
+
+    def release(self, permit: RatePermit):
+        """Return the slot held by `permit` and adapt the concurrency limit to the response it recorded."""
+        permit._release()
+
+    def _release(self, permit: RatePermit, latency: float):
+        now = time.monotonic()
+        with self._lock:
+            self._in_flight -= 1
+            self._latency_ewma = latency if self._latency_ewma is None else (
+                _LATENCY_EWMA_ALPHA * latency + (1 - _LATENCY_EWMA_ALPHA) * self._latency_ewma
+            )
+            if permit.throttled:
+                self.stats["throttled_responses"] += 1
+                self._tokens = 0.0
+                retry_after = _parse_retry_after(permit.retry_after)
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+                self._decrease_locked(now)
+            elif permit.status_code is not None and latency > self.target_latency:
+                self.stats["slow_responses"] += 1
+                self._decrease_locked(now)
+            elif permit.status_code is not None and self._concurrency_limit < self.max_concurrency:
+                # Additive increase: about one extra slot per window of successful responses.
+                previous_limit = int(self._concurrency_limit)
+                self._concurrency_limit = min(self.max_concurrency,
+                                              self._concurrency_limit + 1.0 / self._concurrency_limit)
+                if int(self._concurrency_limit) > previous_limit:
+                    self.stats["limit_increases"] += 1
+            self._wake_next_locked()
+
+    def _decrease_locked(self, now: float):
+        # Responses already in flight reflect the old limit, so cut at most once per latency window.
+        if now - self._last_decrease_at < max(self.target_latency, self._latency_ewma or 0.0):
+            return
+        self._concurrency_limit = max(self.min_concurrency, self._concurrency_limit * self.decrease_factor)
+        self._last_decrease_at = now
+        self.stats["limit_decreases"] += 1
+
+    @contextmanager
+    def limit(self, timeout: float = None):
+        """
+        Context manager holding a request slot for the duration of the block.
+
+        Usage:
+            with limiter.limit() as permit:
+                response = transport.get(url)
+                permit.record(response.status_code, response.headers.get("Retry-After"))
+        """
+        permit = self.acquire(timeout=timeout)
+        try:
+            yield permit
+        finally:
+            self.release(permit)
+
+    @asynccontextmanager
+    async def limit_async(self, timeout: float = None):
+        """Async counterpart of `limit()`."""
+        permit = await self.acquire_async(timeout=timeout)
+        try:
+            yield permit
+        finally:
+            self.release(permit)
+
+    def get_stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            self._refill_locked(now)
+            stats = dict(self.stats)
+            stats.update({
+                "rate_per_second": self.rate_per_second,
+                "burst": self.burst,
+                "tokens": round(self._tokens, 3),
+                "paused_seconds": round(max(self._paused_until - now, 0.0), 3),
+                "concurrency_limit": int(self._concurrency_limit),
+                "in_flight": self._in_flight,
+                "queue_depth": len(self._waiters),
+                "latency_ewma_ms": round(self._latency_ewma * 1000, 1) if self._latency_ewma is not None else None,
+            })
+        stats["total_wait_seconds"] = round(stats["total_wait_seconds"], 3)
+        stats["avg_wait_ms"] = round(stats["total_wait_seconds"] * 1000 / stats["acquired"], 1) if stats["acquired"] else 0.0
+        return stats
+
+
+def _parse_retry_after(retry_after) -> float:
+    """Return a Retry-After header given in seconds as a float, capped at MAX_RETRY_AFTER_SECONDS."""
+    try:
+        return min(max(float(retry_after), 0.0), MAX_RETRY_AFTER_SECONDS)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+_shared_rate_limiter = None
+_shared_rate_limiter_lock = threading.Lock()
+
+
+def get_shared_rate_limiter() -> RateLimiter:
+    """Return the process-wide Walmart API rate limiter, creating it with default settings on first use."""
+    global _shared_rate_limiter
+    with _shared_rate_limiter_lock:
+        if _shared_rate_limiter is None:
+            _shared_rate_limiter = RateLimiter()
+        return _shared_rate_limiter
+
+
+def configure_shared_rate_limiter(**rate_limiter_kwargs) -> RateLimiter:
+    """
+    Replace the process-wide rate limiter with one built from `rate_limiter_kwargs`.
+
+    Requests already holding a permit from the old limiter release it there.
+    """
+    global _shared_rate_limiter
+    with _shared_rate_limiter_lock:
+        _shared_rate_limiter = RateLimiter(**rate_limiter_kwargs)
+        return _shared_rate_limiter
@@ -1,4 +1,5 @@
-from flask import jsonify
+import json
+from flask import Response, jsonify
 
 def success_response(message, data=None, status=200):
     """
@@ -13,4 +14,17 @@ def error_response(message, status=400):
     """
     Create a standardized error response
     """
-    return jsonify({'success': False, 'message': message}), status
\ No newline at end of file
+    return jsonify({'success': False, 'message': message}), status
+
+def format_sse_event(event, data):
+    """
+    Format one server-sent event whose data is `data` as JSON
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(events):
+    """
+    Create a streaming text/event-stream response from an iterable of formatted events
+    """
+    return Response(events, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
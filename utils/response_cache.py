@@ -0,0 +1,334 @@
+"""
+Persistent SQLite cache for Walmart affiliate API responses.
+
+Entries survive process restarts, so a freshly deployed app starts warm. Each
+entry is "fresh" for its kind's fresh TTL, then "stale" until its stale TTL runs
+out: stale entries are still served immediately while the caller refreshes them
+in the background (stale-while-revalidate). The cache is capped by entry count
+and total bytes, evicting least recently used entries first.
+
+Command line usage:
+    python -m utils.response_cache stats
+    python -m utils.response_cache list [--kind search] [--limit 20]
+    python -m utils.response_cache purge [--kind search] [--expired-only]
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESPONSE_CACHE_PATH = os.getenv(
+    "WALMART_RESPONSE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "walmart_responses.sqlite3")
+)
+DEFAULT_MAX_ENTRIES = 50_000
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# (fresh_ttl_seconds, stale_ttl_seconds) per response kind. Prices move faster than catalog structure.
+DEFAULT_TTLS = {
+    "search": (6 * 60 * 60, 7 * 24 * 60 * 60),
+    "lookup": (60 * 60, 24 * 60 * 60),
+    "stores": (7 * 24 * 60 * 60, 30 * 24 * 60 * 60),
+    "taxonomy": (7 * 24 * 60 * 60, 90 * 24 * 60 * 60),
+}
+_FALLBACK_TTL = (60 * 60, 24 * 60 * 60)
+
+# Eviction scans the table, so only run it every this many writes.
+_EVICTION_CHECK_INTERVAL = 64
+# Reads note their access time in memory; the times are written back (for LRU eviction) in batches of this many
+# entries, and before every eviction, so a cache hit costs a single SELECT.
+_ACCESS_FLUSH_INTERVAL = 64
+
+
+class CachedResponse(NamedTuple):
+    value: str
+    is_stale: bool
+    stored_at: float
+
+
+def serialize_cache_key(cache_key) -> str:
+    """Turn a tuple cache key (as built for the in-memory caches) into a stable string."""
+    if isinstance(cache_key, str):
+        return cache_key
+    return json.dumps(list(cache_key), separators=(",", ":"), default=str)
+
+
+class PersistentResponseCache:
+    def __init__(self, db_path: str = DEFAULT_RESPONSE_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES, ttls: dict = None):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes_since_eviction = 0
+        self._pending_accesses = {}  # key -> last access time not yet written
+        self._revalidating = set()
+        self.stats = {
+            "fresh_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "evictions": 0,
+            "revalidations": 0,
+        }
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " stored_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections may not be shared across threads, so keep one per thread.
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _count(self, stat_name: str, amount: int = 1):
+        with self._lock:
+            self.stats[stat_name] += amount
+
+    def get(self, cache_key):
+        """
+        Return the cached response for `cache_key`, or None if missing or past its stale TTL.
+
+        Returns:
+            CachedResponse or None: `is_stale` is True once the entry is past its fresh TTL,
+                in which case the caller should serve it and refresh it in the background.
+        """
+        key = serialize_cache_key(cache_key)
+        now = time.time()
+        try:
+            row = self._connection().execute(
+                "SELECT kind, value, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache read failed: {e}")
+            return None
+
+        if row is None:
+            self._count("misses")
+            return None
+        kind, value, stored_at = row
+        fresh_ttl, stale_ttl = self.ttls.get(kind, _FALLBACK_TTL)
+        age = now - stored_at
+        if age > stale_ttl:
+            self._count("misses")
+            return None
+        is_stale = age > fresh_ttl
+        with self._lock:
+            self.stats["stale_hits" if is_stale else "fresh_hits"] += 1
+            self._pending_accesses[key] = now
+            flush_accesses = len(self._pending_accesses) >= _ACCESS_FLUSH_INTERVAL
+        if flush_accesses:
+            self.flush_accesses()
+        return CachedResponse(value=value, is_stale=is_stale, stored_at=stored_at)
+
+    def flush_accesses(self):
+        """Write the access times of recent hits, which eviction orders entries by."""
+        with self._lock:
+            accesses, self._pending_accesses = self._pending_accesses, {}
+        if not accesses:
+            return
+        try:
+            with self._connection() as connection:
+                connection.executemany("UPDATE responses SET last_access = ? WHERE key = ?",
+                                       [(last_access, key) for key, last_access in accesses.items()])
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache access time update failed: {e}")
+
+    def set(self, cache_key, kind: str, value: str):
+        key = serialize_cache_key(cache_key)
+        now = time.time()
+        try:
+            with self._connection() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO responses (key, kind, value, size, stored_at, last_access)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, kind, value, len(value.encode("utf-8")), now, now)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache write failed: {e}")
+            return
+        with self._lock:
+            self.stats["writes"] += 1
+            self._writes_since_eviction += 1
+            run_eviction = self._writes_since_eviction >= _EVICTION_CHECK_INTERVAL
+            if run_eviction:
+                self._writes_since_eviction = 0
+        if run_eviction:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Delete least recently used entries until the cache is within its entry and byte caps.
+
+        Returns:
+            int: The number of entries evicted.
+        """
+        evicted = 0
+        self.flush_accesses()
+        with self._connection() as connection:
+            entry_count, total_bytes = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            if entry_count <= self.max_entries and total_bytes <= self.max_bytes:
+                return 0
+            rows = connection.execute("SELECT key, size FROM responses ORDER BY last_access ASC").fetchall()
+            keys_to_delete = []
+            for key, size in rows:
+                if entry_count <= self.max_entries and total_bytes <= self.max_bytes:
+                    break
+                keys_to_delete.append((key,))
+                entry_count -= 1
+                total_bytes -= size
+            connection.executemany("DELETE FROM responses WHERE key = ?", keys_to_delete)
+            evicted = len(keys_to_delete)
+        self._count("evictions", evicted)
+        return evicted
+
+    def begin_revalidation(self, cache_key) -> bool:
+        """
+        Claim the background refresh of `cache_key`.
+
+        Returns:
+            bool: False if another caller is already refreshing this entry.
+        """
+        key = serialize_cache_key(cache_key)
+        with self._lock:
+            if key in self._revalidating:
+                return False
+            self._revalidating.add(key)
+            self.stats["revalidations"] += 1
+            return True
+
+    def end_revalidation(self, cache_key):
+        with self._lock:
+            self._revalidating.discard(serialize_cache_key(cache_key))
+
+    def list_entries(self, kind: str = None, limit: int = 50) -> list[dict]:
+        self.flush_accesses()
+        query = "SELECT key, kind, size, stored_at, last_access FROM responses"
+        params = ()
+        if kind:
+            query += " WHERE kind = ?"
+            params = (kind,)
+        query += " ORDER BY last_access DESC LIMIT ?"
+        now = time.time()
+        entries = []
+        for key, entry_kind, size, stored_at, last_access in self._connection().execute(query, params + (limit,)):
+            fresh_ttl, stale_ttl = self.ttls.get(entry_kind, _FALLBACK_TTL)
+            age = now - stored_at
+            entries.append({
+                "key": key,
+                "kind": entry_kind,
+                "size": size,
+                "age_seconds": round(age),
+                "state": "fresh" if age <= fresh_ttl else "stale" if age <= stale_ttl else "expired",
+            })
+        return entries
+
+    def purge(self, kind: str = None, expired_only: bool = False) -> int:
+        """
+        Delete entries, optionally only those of one kind and/or past their stale TTL.
+
+        Returns:
+            int: The number of entries deleted.
+        """
+        with self._connection() as connection:
+            if not expired_only:
+                if kind:
+                    cursor = connection.execute("DELETE FROM responses WHERE kind = ?", (kind,))
+                else:
+                    cursor = connection.execute("DELETE FROM responses")
+                return cursor.rowcount
+            deleted = 0
+            now = time.time()
+            kinds = [kind] if kind else [row[0] for row in connection.execute("SELECT DISTINCT kind FROM responses")]
+            for entry_kind in kinds:
+                stale_ttl = self.ttls.get(entry_kind, _FALLBACK_TTL)[1]
+                cursor = connection.execute(
+                    "DELETE FROM responses WHERE kind = ? AND stored_at < ?", (entry_kind, now - stale_ttl)
+                )
+                deleted += cursor.rowcount
+            return deleted
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        by_kind = {}
+        for kind, entry_count, total_bytes in self._connection().execute(
+                "SELECT kind, COUNT(*), COALESCE(SUM(size), 0) FROM responses GROUP BY kind"):
+            by_kind[kind] = {"entries": entry_count, "bytes": total_bytes}
+        stats.update({
+            "db_path": self.db_path,
+            "entries": sum(kind_stats["entries"] for kind_stats in by_kind.values()),
+            "bytes": sum(kind_stats["bytes"] for kind_stats in by_kind.values()),
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "by_kind": by_kind,
+        })
+        return stats
+
+
+_shared_response_cache = None
+_shared_response_cache_lock = threading.Lock()
+
+
+def get_shared_response_cache() -> PersistentResponseCache:
+    """Return the process-wide persistent response cache, opening it on first use."""
+    global _shared_response_cache
+    with _shared_response_cache_lock:
+        if _shared_response_cache is None:
+            _shared_response_cache = PersistentResponseCache()
+        return _shared_response_cache
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or purge the persistent Walmart response cache.")
+    parser.add_argument("--db-path", default=DEFAULT_RESPONSE_CACHE_PATH, help="Path of the SQLite cache file.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="Show entry counts and sizes by kind.")
+    list_parser = subparsers.add_parser("list", help="List the most recently used entries.")
+    list_parser.add_argument("--kind", choices=sorted(DEFAULT_TTLS))
+    list_parser.add_argument("--limit", type=int, default=20)
+    purge_parser = subparsers.add_parser("purge", help="Delete entries.")
+    purge_parser.add_argument("--kind", choices=sorted(DEFAULT_TTLS))
+    purge_parser.add_argument("--expired-only", action="store_true", help="Only delete entries past their stale TTL.")
+    args = parser.parse_args(argv)
+
+    response_cache = PersistentResponseCache(db_path=args.db_path)
+    if args.command == "stats":
+        print(json.dumps(response_cache.get_stats(), indent=2))
+    elif args.command == "list":
+        for entry in response_cache.list_entries(kind=args.kind, limit=args.limit):
+            print(f"{entry['state']:<8} {entry['kind']:<9} {entry['size']:>9} B {entry['age_seconds']:>9} s  {entry['key']}")
+    elif args.command == "purge":
+        deleted = response_cache.purge(kind=args.kind, expired_only=args.expired_only)
+        print(f"Deleted {deleted} entries from {response_cache.db_path}")
+
+
+if __name__ == "__main__":
+    main()
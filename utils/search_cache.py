@@ -0,0 +1,128 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import unquote_plus
+
+DEFAULT_SEARCH_CACHE_MAXSIZE = 2048
+DEFAULT_SEARCH_CACHE_TTL_SECONDS = 60 * 60
+
+# Words ending in "s" that are not plurals (or whose singular would be a worse search term).
+_NON_PLURAL_WORDS = {"molasses", "brussels", "grits", "oats", "greens", "series", "species"}
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_PUNCTUATION_PATTERN = re.compile(r"[^\w\s%&'-]")
+
+
+def singularize_word(word: str) -> str:
+    """
+    Reduce a simple English plural to its singular form ("eggs" -> "egg", "berries" -> "berry").
+
+    Only handles the regular patterns common in ingredient names; anything
+    ambiguous is returned unchanged.
+    """
+    if len(word) <= 3 or word in _NON_PLURAL_WORDS or not word.endswith("s"):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("ches", "shes", "xes", "zes", "oes", "sses")):
+        return word[:-2]
+    if word.endswith(("ss", "us", "is")):
+        return word
+    return word[:-1]
+
+
+def normalize_query(query: str) -> str:
+    """
+    Canonicalize a product search term so trivially different spellings share a cache entry.
+
+    URL-decodes the term, lower-cases it, drops stray punctuation, collapses
+    whitespace and singularizes each word: "Chicken%20Breasts " -> "chicken breast".
+    """
+    query = unquote_plus(str(query))
+    query = _PUNCTUATION_PATTERN.sub(" ", query.lower())
+    words = _WHITESPACE_PATTERN.split(query.strip())
+    return " ".join(singularize_word(word) for word in words if word)
+
+
+class TTLLRUCache:
+    """
+    Thread-safe in-process cache with a size bound, per-entry TTL and LRU eviction.
+
+    Entries expire `ttl` seconds after they were stored. When the cache is full,
+    the least recently used entry is evicted to make room.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_SEARCH_CACHE_MAXSIZE, ttl: float = DEFAULT_SEARCH_CACHE_TTL_SECONDS):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return default
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._entries[key] = (expires_at, value)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["maxsize"] = self.maxsize
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+# Process-wide cache shared by every Walmart search path (sync client, async client, services and routes).
+search_cache = TTLLRUCache()
+
+
+def search_cache_key(search_term: str, **search_params) -> tuple:
+    """
+    Build the cache key for a search: the normalized term plus any non-empty search parameters.
+    """
+    return ("search", normalize_query(search_term)) + tuple(
+        sorted((name, str(value)) for name, value in search_params.items() if value not in (None, ""))
+    )
@@ -1,4 +1,6 @@
 import logging
+from utils.cart_records import CartItem
+from utils.product_records import ProductRecord, product_details
 
 logger = logging.getLogger(__name__)
 
@@ -43,4 +45,25 @@ def serialize_context(context):
                 'content': str(message)
             })
     
-    return serializable_context
\ No newline at end of file
+    return serializable_context
+
+def serialize_cart_items(cart_items):
+    """
+    Convert cart items (see utils.cart_records) to their JSON shape; items already in it pass through
+    """
+    return [item.to_dict() if isinstance(item, CartItem) else item for item in cart_items or []]
+
+def serialize_product_selection(selection):
+    """
+    Convert a product selection from UnifiedCartAutofillAgent.select_product to its JSON shape
+    """
+    selection = dict(selection)
+    if isinstance(selection.get('item_details'), ProductRecord):
+        selection['item_details'] = product_details(selection['item_details'])
+    if selection.get('substitutes'):
+        selection['substitutes'] = [
+            {'item_details': product_details(substitute['item_details'])}
+            if isinstance(substitute.get('item_details'), ProductRecord) else substitute
+            for substitute in selection['substitutes']
+        ]
+    return selection
@@ -0,0 +1,145 @@
+"""
+Request coalescing ("single flight") for identical concurrent calls.
+
+While a call for a key is in flight, further callers with the same key do not
+start their own call; they wait for the first one and share its result (or
+exception). Once the call finishes the key is forgotten, so later callers start
+a fresh call. Completed results are the caches' job, not this module's.
+"""
+import asyncio
+import threading
+import weakref
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls made from threads."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "calls": 0,
+            "coalesced": 0,
+        }
+
+    def do(self, key, function):
+        """
+        Return `function()`, or the result of the identical call already in flight for `key`.
+
+        Parameters:
+            key (hashable): Identifies equivalent calls.
+            function (callable): Called with no arguments if no call for `key` is in flight.
+        Returns:
+            The shared result. An exception raised by the call is re-raised in every caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+                self.stats["calls"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["in_flight"] = len(self._calls)
+        return stats
+
+
+class _AsyncCall:
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """
+    Coalesces identical concurrent coroutine calls.
+
+    The shared call runs in a task of its own, which every caller awaits through
+    `asyncio.shield`: cancelling one caller, even the one that started the call,
+    leaves the others waiting. The task is cancelled only once all of its callers
+    have been. Tasks belong to one event loop, so in-flight calls are tracked per
+    running loop; calls on different loops are never coalesced with each other.
+    """
+
+    def __init__(self):
+        self._calls_by_loop = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.stats = {
+            "calls": 0,
+            "coalesced": 0,
+        }
+
+    def _forget(self, calls: dict, key, call: _AsyncCall):
+        with self._lock:
+            if calls.get(key) is call:
+                del calls[key]
+
+    async def do(self, key, coroutine_function):
+        """
+        Return `await coroutine_function()`, or the result of the identical call already in flight for `key`.
+
+        An exception raised by the call is re-raised in every caller.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            calls = self._calls_by_loop.setdefault(loop, {})
+            call = calls.get(key)
+            if call is None:
+                call = _AsyncCall(loop.create_task(coroutine_function()))
+                calls[key] = call
+                call.task.add_done_callback(lambda task: self._forget(calls, key, call))
+                self.stats["calls"] += 1
+            else:
+                self.stats["coalesced"] += 1
+            call.waiters += 1
+
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            with self._lock:
+                call.waiters -= 1
+                abandoned = call.waiters == 0 and not call.task.done()
+            if abandoned:
+                # Every caller was cancelled; later callers must not join the cancelled call.
+                self._forget(calls, key, call)
+                call.task.cancel()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["in_flight"] = sum(len(calls) for calls in self._calls_by_loop.values())
+        return stats
+
+
+# Process-wide coalescers shared by every Walmart search path.
+search_single_flight = SingleFlight()
+async_search_single_flight = AsyncSingleFlight()
@@ -0,0 +1,47 @@
+"""
+Cached zip code -> nearest Walmart store resolution for store-aware searches.
+
+Resolving a zip code costs a `stores` request, and a user's zip code rarely
+changes between searches, so resolved stores are kept in a process-wide
+TTL+LRU index. The underlying `stores` responses are also kept in the
+persistent response cache, so the index is rebuilt without requests after a restart.
+"""
+import json
+import re
+
+from utils.search_cache import TTLLRUCache
+
+DEFAULT_STORE_INDEX_MAXSIZE = 4096
+DEFAULT_STORE_INDEX_TTL_SECONDS = 24 * 60 * 60
+
+_ZIP_CODE_PATTERN = re.compile(r"^\s*(\d{5})(?:-?\d{4})?\s*$")
+
+# Process-wide zip code -> nearest store index shared by every Walmart client.
+store_index = TTLLRUCache(maxsize=DEFAULT_STORE_INDEX_MAXSIZE, ttl=DEFAULT_STORE_INDEX_TTL_SECONDS)
+
+
+def normalize_zip_code(zip_code) -> str:
+    """Return the 5-digit form of a US zip code ("72701-1234" -> "72701"), or None if it is not one."""
+    match = _ZIP_CODE_PATTERN.match(str(zip_code)) if zip_code is not None else None
+    return match.group(1) if match else None
+
+
+def parse_nearest_store(stores_text: str) -> dict:
+    """
+    Pick the nearest store out of a raw `stores` response, which lists stores nearest first.
+
+    Returns:
+        dict or None: {'storeId', 'name', 'zip'} of the nearest store, or None if there is none.
+    """
+    try:
+        stores = json.loads(stores_text) if stores_text else []
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(stores, list) or not stores or stores[0].get("no") is None:
+        return None
+    nearest_store = stores[0]
+    return {
+        "storeId": str(nearest_store["no"]),
+        "name": nearest_store.get("name", ""),
+        "zip": nearest_store.get("zip", ""),
+    }
@@ -0,0 +1,246 @@
+"""
+Local index of the Walmart category taxonomy.
+
+The taxonomy is downloaded once, flattened into parallel id/name/parent lists
+and persisted as compact JSON, so later processes load it from disk instead of
+the API. An inverted index from normalized name words to categories makes
+ingredient-to-category lookups a handful of dictionary reads, which lets
+searches be scoped with `categoryId` to the grocery category an ingredient belongs to.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from utils.search_cache import TTLLRUCache, normalize_query
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TAXONOMY_INDEX_PATH = os.getenv(
+    "WALMART_TAXONOMY_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "walmart_taxonomy_index.json")
+)
+TAXONOMY_INDEX_FORMAT_VERSION = 1
+
+# Walmart's top-level "Food" category; ingredient lookups are restricted to its subtree when present.
+GROCERY_ROOT_CATEGORY_ID = "976759"
+
+# How long to wait before downloading the taxonomy again after a failed download.
+TAXONOMY_DOWNLOAD_RETRY_SECONDS = 10 * 60
+
+# Ingredient words and phrases whose category name shares no word with them, mapped to words that do.
+# Hints match whole phrases of the normalized term, longest first, so "bell pepper" takes the vegetable hint
+# and never the spice hint of "pepper"; phrases mapped to None get no hint at all.
+INGREDIENT_CATEGORY_HINTS = {
+    "thyme": "spice", "oregano": "spice", "basil": "spice", "cumin": "spice", "paprika": "spice",
+    "cinnamon": "spice", "nutmeg": "spice", "rosemary": "spice", "sage": "spice", "parsley": "herb",
+    "cilantro": "herb", "dill": "herb", "salt": "spice", "pepper": "spice", "vanilla": "baking",
+    "flour": "baking", "sugar": "baking", "yeast": "baking", "cornstarch": "baking", "cocoa": "baking",
+    "butter": "dairy", "cheese": "cheese", "cream": "dairy", "yogurt": "yogurt", "egg": "egg",
+    "beef": "meat", "pork": "meat", "chicken": "chicken", "turkey": "meat", "bacon": "bacon",
+    "salmon": "seafood", "shrimp": "seafood", "tuna": "seafood", "fish": "seafood",
+    "apple": "fruit", "banana": "fruit", "lemon": "fruit", "lime": "fruit", "berry": "fruit",
+    "strawberry": "fruit", "onion": "vegetable", "garlic": "vegetable", "carrot": "vegetable",
+    "potato": "vegetable", "tomato": "vegetable", "celery": "vegetable", "spinach": "vegetable",
+    "lettuce": "vegetable", "broccoli": "vegetable", "rice": "rice", "pasta": "pasta",
+    "spaghetti": "pasta", "noodle": "pasta", "bean": "bean", "oil": "oil", "vinegar": "condiment",
+    "ketchup": "condiment", "mustard": "condiment", "mayonnaise": "condiment", "sauce": "sauce",
+    "broth": "soup", "stock": "soup", "bread": "bread", "tortilla": "tortilla", "milk": "milk",
+    "juice": "juice", "coffee": "coffee", "tea": "tea",
+    "black pepper": "spice", "white pepper": "spice", "red pepper flake": "spice", "cayenne pepper": "spice",
+    "bell pepper": "vegetable", "red pepper": "vegetable", "green pepper": "vegetable", "jalapeno pepper": "vegetable",
+    "chili pepper": "vegetable", "peanut butter": None, "apple butter": None, "cream cheese": "cheese",
+    "ice cream": None, "sour cream": "dairy", "apple cider vinegar": "condiment", "lemon juice": "juice",
+    "lime juice": "juice", "tomato sauce": "sauce", "tomato paste": "sauce", "fish sauce": "sauce",
+}
+_MAX_HINT_PHRASE_WORDS = max(len(phrase.split()) for phrase in INGREDIENT_CATEGORY_HINTS)
+
+
+def category_hint_words(words: list) -> set:
+    """The hinted category words for the words of a normalized term (see INGREDIENT_CATEGORY_HINTS)."""
+    hint_words = set()
+    i = 0
+    while i < len(words):
+        for length in range(min(_MAX_HINT_PHRASE_WORDS, len(words) - i), 0, -1):
+            phrase = " ".join(words[i:i + length])
+            if phrase in INGREDIENT_CATEGORY_HINTS:
+                if INGREDIENT_CATEGORY_HINTS[phrase]:
+                    hint_words.add(INGREDIENT_CATEGORY_HINTS[phrase])
+                i += length
+                break
+        else:
+            i += 1
+    return hint_words
+
+
+class TaxonomyIndex:
+    """
+    Flattened, word-indexed Walmart category tree.
+
+    Categories are stored in parallel lists (`ids`, `names`, `parents`) where
+    `parents[i]` is the list index of category i's parent, or -1 for roots.
+    """
+
+    def __init__(self, ids: list[str], names: list[str], parents: list[int]):
+        self.ids = ids
+        self.names = names
+        self.parents = parents
+        self._index_by_id = {category_id: i for i, category_id in enumerate(ids)}
+        self._depths = [0] * len(ids)
+        for i, parent in enumerate(parents):
+            # Parents always precede their children, so their depth is already known.
+            self._depths[i] = self._depths[parent] + 1 if parent >= 0 else 0
+
+        root = self._index_by_id.get(GROCERY_ROOT_CATEGORY_ID)
+        self._lookup_indices = range(len(ids)) if root is None else [
+            i for i in range(len(ids)) if self._is_descendant(i, root)
+        ]
+        self._name_words = {}
+        self._categories_by_word = {}
+        for i in self._lookup_indices:
+            words = normalize_query(names[i]).replace("&", " ").split()
+            self._name_words[i] = set(words)
+            for word in words:
+                self._categories_by_word.setdefault(word, []).append(i)
+        self._lookup_cache = TTLLRUCache(maxsize=4096, ttl=float("inf"))
+
+    @classmethod
+    def from_taxonomy(cls, taxonomy: dict) -> "TaxonomyIndex":
+        """Build an index from the JSON returned by the `taxonomy` endpoint."""
+        ids, names, parents = [], [], []
+        stack = [(category, -1) for category in reversed(taxonomy.get("categories", []))]
+        while stack:
+            category, parent = stack.pop()
+            ids.append(str(category.get("id")))
+            names.append(category.get("name", ""))
+            parents.append(parent)
+            index = len(ids) - 1
+            stack.extend((child, index) for child in reversed(category.get("children") or []))
+        return cls(ids, names, parents)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_TAXONOMY_INDEX_PATH) -> "TaxonomyIndex":
+        with open(path, "r", encoding="utf-8") as index_file:
+            data = json.load(index_file)
+        if data.get("version") != TAXONOMY_INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported taxonomy index version: {data.get('version')}")
+        return cls(data["ids"], data["names"], data["parents"])
+
+    def save(self, path: str = DEFAULT_TAXONOMY_INDEX_PATH):
+        """Write the index atomically, so a concurrent reader never sees a partial file."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as index_file:
+            json.dump({"version": TAXONOMY_INDEX_FORMAT_VERSION, "ids": self.ids, "names": self.names,
+                       "parents": self.parents}, index_file, separators=(",", ":"))
+        os.replace(temp_path, path)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _is_descendant(self, index: int, ancestor: int) -> bool:
+        while index >= 0:
+            if index == ancestor:
+                return True
+            index = self.parents[index]
+        return False
+
+    def get_path(self, category_id: str) -> str:
+        """Return the category's full path, e.g. "Food/Baking/Spices & Seasonings", or None if unknown."""
+        index = self._index_by_id.get(str(category_id))
+        if index is None:
+            return None
+        names = []
+        while index >= 0:
+            names.append(self.names[index])
+            index = self.parents[index]
+        return "/".join(reversed(names))
+
+    def lookup_category(self, ingredient: str):
+        """
+        Find the most specific grocery category for an ingredient or product search term.
+
+        Categories sharing the most words with the term win; ties go to the category
+        whose name is mostly made of matched words, then to the deepest one. Words
+        and phrases listed in INGREDIENT_CATEGORY_HINTS also match their hinted category word.
+
+        Parameters:
+            ingredient (str): An ingredient or search term, e.g. "fresh thyme".
+        Returns:
+            dict or None: {'id', 'name', 'path'} of the category, or None if nothing matches.
+        """
+        words = normalize_query(ingredient).split()
+        cache_key = tuple(words)
+        cached = self._lookup_cache.get(cache_key, default=False)
+        if cached is not False:
+            return cached
+
+        search_words = set(words)
+        search_words.update(category_hint_words(words))
+        best_index, best_score = None, None
+        candidates = {i for word in search_words for i in self._categories_by_word.get(word, ())}
+        for i in candidates:
+            matched = len(self._name_words[i] & search_words)
+            score = (matched, matched / len(self._name_words[i]), self._depths[i])
+            if best_score is None or score > best_score:
+                best_index, best_score = i, score
+
+        category = None if best_index is None else {
+            "id": self.ids[best_index],
+            "name": self.names[best_index],
+            "path": self.get_path(self.ids[best_index]),
+        }
+        self._lookup_cache.set(cache_key, category)
+        return category
+
+
+_shared_taxonomy_index = None
+_shared_taxonomy_index_loaded = False
+_retry_download_after = 0.0
+_shared_taxonomy_index_lock = threading.Lock()
+
+
+def get_shared_taxonomy_index(path: str = DEFAULT_TAXONOMY_INDEX_PATH) -> TaxonomyIndex:
+    """Return the process-wide taxonomy index, loading it from disk on first use, or None if there is none yet."""
+    global _shared_taxonomy_index, _shared_taxonomy_index_loaded
+    with _shared_taxonomy_index_lock:
+        if _shared_taxonomy_index is None and not _shared_taxonomy_index_loaded:
+            _shared_taxonomy_index_loaded = True
+            if os.path.exists(path):
+                try:
+                    _shared_taxonomy_index = TaxonomyIndex.load(path)
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning(f"Ignoring unreadable taxonomy index {path}: {e}")
+        return _shared_taxonomy_index
+
+
+def taxonomy_download_due() -> bool:
+    """Whether the taxonomy should be downloaded: there is no index and no recent download failed."""
+    return _shared_taxonomy_index is None and time.time() >= _retry_download_after
+
+
+def build_shared_taxonomy_index(taxonomy_text: str, path: str = DEFAULT_TAXONOMY_INDEX_PATH) -> TaxonomyIndex:
+    """
+    Build the process-wide taxonomy index from a raw `taxonomy` response and persist it to `path`.
+
+    Returns:
+        TaxonomyIndex or None: None if the response holds no categories; the download
+            is then not retried for TAXONOMY_DOWNLOAD_RETRY_SECONDS.
+    """
+    global _shared_taxonomy_index, _retry_download_after
+    try:
+        taxonomy_index = TaxonomyIndex.from_taxonomy(json.loads(taxonomy_text)) if taxonomy_text else None
+    except (json.JSONDecodeError, AttributeError) as e:
+        logger.warning(f"Could not parse Walmart taxonomy response: {e}")
+        taxonomy_index = None
+    if not taxonomy_index:
+        _retry_download_after = time.time() + TAXONOMY_DOWNLOAD_RETRY_SECONDS
+        return None
+    try:
+        taxonomy_index.save(path)
+    except OSError as e:
+        logger.warning(f"Could not persist taxonomy index to {path}: {e}")
+    with _shared_taxonomy_index_lock:
+        _shared_taxonomy_index = taxonomy_index
+    return taxonomy_index
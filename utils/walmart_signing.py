@@ -0,0 +1,166 @@
+import base64
+import os
+import threading
+import time
+
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding
+
+# Walmart rejects requests whose WM_CONSUMER.INTIMESTAMP is older than this many seconds.
+WALMART_SIGNATURE_VALIDITY_SECONDS = 180
+
+# Fraction of the validity window a signed header set is reused for before re-signing.
+DEFAULT_SIGNATURE_REUSE_FRACTION = 0.5
+
+
+class WalmartRequestSigner:
+    """
+    Generates signed Walmart affiliate API headers.
+
+    The PEM private key is parsed once and cached; it is only re-read when the
+    key file's modification time or size changes. Signed headers are reused for
+    `reuse_fraction` of Walmart's timestamp validity window, so a burst of
+    requests shares one RSA signature instead of paying for one each.
+    """
+
+    def __init__(self, consumer_id: str, key_version: str, key_file_path: str,
+                 reuse_fraction: float = DEFAULT_SIGNATURE_REUSE_FRACTION,
+                 validity_seconds: float = WALMART_SIGNATURE_VALIDITY_SECONDS):
+        if not 0.0 <= reuse_fraction < 1.0:
+            raise ValueError("reuse_fraction must be in the range [0.0, 1.0)")
+        self.consumer_id = consumer_id
+        self.key_version = key_version
+        self.key_file_path = key_file_path
+        self.reuse_seconds = validity_seconds * reuse_fraction
+
+        self._lock = threading.Lock()
+        self._private_key = None
+        self._key_file_signature = None  # (mtime_ns, size) of the key file when it was last parsed
+        self._cached_headers = None
+        self._cached_at = 0.0
+
+        self.stats = {
+            "key_loads": 0,
+            "signatures": 0,
+            "reused_headers": 0,
+        }
+
+    def _load_private_key(self):
+        """
+        Return the parsed private key, re-reading the key file only if it changed on disk.
+        """
+        try:
+            key_stat = os.stat(self.key_file_path)
+        except OSError as e:
+            raise RuntimeError(f"Error reading the private key file: {e}")
+
+        key_file_signature = (key_stat.st_mtime_ns, key_stat.st_size)
+        if self._private_key is not None and key_file_signature == self._key_file_signature:
+            return self._private_key
+
+        try:
+            with open(self.key_file_path, "rb") as key_file:
+                key_data = key_file.read()
+        except IOError as e:
+            raise RuntimeError(f"Error reading the private key file: {e}")
+
+        try:
+            private_key = serialization.load_pem_private_key(key_data, password=None)
+        except Exception as e:
+            raise RuntimeError(f"Error loading private key: {e}")
+
+        self._private_key = private_key
+        self._key_file_signature = key_file_signature
+        self.stats["key_loads"] += 1
+        return private_key
+
+    def sign(self, timestamp: str = None) -> dict:
+        """
+        Build and sign a fresh set of Walmart request headers.
+
+        Constructs a canonicalized string from header values, signs it using
+        SHA256 with RSA (PKCS1v15 padding), and returns a dictionary
+        containing all the required headers.
+
+        Parameters:
+            timestamp (str): Milliseconds since the epoch. Defaults to now.
+        Returns:
+            dict: The signed request headers.
+        """
+        if timestamp is None:
+            timestamp = str(int(time.time() * 1000))
+        private_key = self._load_private_key()
+
+        headers = {
+            "WM_CONSUMER.ID": self.consumer_id,
+            "WM_CONSUMER.INTIMESTAMP": timestamp,
+            "WM_SEC.KEY_VERSION": self.key_version,
+        }
+
+        # Build canonicalized string: sorted keys, trimmed values, each ended with a newline.
+        canonicalized_str = ""
+        for key in sorted(headers.keys()):
+            canonicalized_str += headers[key].strip() + "\n"
+
+        try:
+            signature_bytes = private_key.sign(
+                canonicalized_str.encode("utf-8"),
+                padding.PKCS1v15(),
+                hashes.SHA256()
+            )
+        except Exception as e:
+            raise RuntimeError(f"Error generating signature: {e}")
+
+        headers["WM_SEC.AUTH_SIGNATURE"] = base64.b64encode(signature_bytes).decode("ascii")
+        self.stats["signatures"] += 1
+        return headers
+
+    def get_headers(self) -> dict:
+        """
+        Return signed headers, reusing the last signature while it is inside the reuse window.
+
+        Returns:
+            dict: A copy of the signed request headers, safe for the caller to modify.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._cached_headers is not None and now - self._cached_at < self.reuse_seconds:
+                self.stats["reused_headers"] += 1
+                return dict(self._cached_headers)
+            headers = self.sign()
+            self._cached_headers = headers
+            self._cached_at = now
+            return dict(headers)
+
+    def invalidate(self):
+        """Drop the cached key and headers so the next call re-reads the key file and re-signs."""
+        with self._lock:
+            self._private_key = None
+            self._key_file_signature = None
+            self._cached_headers = None
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
+
+
+_shared_signers = {}
+_shared_signers_lock = threading.Lock()
+
+
+def get_shared_signer(consumer_id: str, key_version: str, key_file_path: str,
+                      reuse_fraction: float = DEFAULT_SIGNATURE_REUSE_FRACTION) -> WalmartRequestSigner:
+    """
+    Return the process-wide signer for a set of credentials, creating it on first use.
+
+    Every WalmartAPI instance built with the same credentials shares one signer,
+    so the key is parsed once per process rather than once per instance.
+    """
+    key_file_path_key = os.path.abspath(key_file_path) if key_file_path else key_file_path
+    signer_key = (consumer_id, key_version, key_file_path_key, reuse_fraction)
+    with _shared_signers_lock:
+        signer = _shared_signers.get(signer_key)
+        if signer is None:
+            signer = WalmartRequestSigner(consumer_id, key_version, key_file_path, reuse_fraction=reuse_fraction)
+            _shared_signers[signer_key] = signer
+        return signer
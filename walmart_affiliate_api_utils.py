@@ -1,12 +1,42 @@
+import asyncio
 import json
+import os
+import time
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 
+import httpx
 import requests
-import time
-import base64
 
-from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import padding
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError, get_shared_circuit_breaker
+from utils.http_transport import AsyncHTTPTransport, HTTPTransport, get_shared_async_transport, get_shared_transport
+from utils.local_catalog import LocalCatalog, get_shared_local_catalog
+from utils.product_records import ProductRecord, is_available_in_store, parse_search_response
+from utils.rate_limiter import THROTTLED_STATUS_CODE, RateLimiter, get_shared_rate_limiter
+from utils.response_cache import get_shared_response_cache
+from utils.search_cache import search_cache, search_cache_key
+from utils.single_flight import async_search_single_flight, search_single_flight
+from utils.store_index import normalize_zip_code, parse_nearest_store, store_index
+from utils.taxonomy_index import (TaxonomyIndex, build_shared_taxonomy_index, get_shared_taxonomy_index,
+                                  taxonomy_download_due)
+from utils.walmart_signing import DEFAULT_SIGNATURE_REUSE_FRACTION, get_shared_signer
+
+# Set WALMART_API_BASE_URL to point every client at another server, e.g. testing/walmart_standin_server.py.
+WALMART_AFFILIATE_API_BASE_URL = os.getenv(
+    "WALMART_API_BASE_URL", "https://developer.api.walmart.com/api-proxy/service/affil/product/v2"
+)
+
+# Maximum number of comma-separated ids the affiliate `items?ids=` endpoint accepts per request.
+WALMART_LOOKUP_MAX_IDS = 20
+
+# Largest page the `search` endpoint returns (its `numItems` parameter).
+WALMART_SEARCH_MAX_NUM_ITEMS = 25
+
+# How many times a request answered with 429 is re-queued behind the rate limiter before giving up.
+WALMART_THROTTLE_RETRIES = 2
+
+# Background threads that refresh stale cache entries for the synchronous client.
+_background_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="walmart-background")
 
 
 def filter_walmart_search_result_props(search_results: list[dict]):
@@ -26,75 +56,279 @@ def filter_walmart_search_result_props(search_results: list[dict]):
     ]
     filtered_results = []
     for item in search_results:
-        if item.get('stock') != "Available":
-            continue
-        if item.get('offerType') not in ["ONLINE_AND_STORE", "STORE_ONLY"]:
+        if not is_available_in_store(item.get('stock'), item.get('offerType')):
             continue
         filtered_props = {prop: item[prop] for prop in props_to_include if prop in item}
         filtered_results.append(filtered_props)
     return filtered_results
 
 
-class WalmartAPI:
-    def __init__(self, consumer_id: str, key_version: str, key_file_path: str):
+def chunk_item_ids(item_ids, chunk_size: int = WALMART_LOOKUP_MAX_IDS) -> list[list[str]]:
+    """
+    De-duplicate item ids (keeping first-seen order) and split them into lookup-sized chunks.
+
+    Parameters:
+        item_ids (iterable of int or str): The item ids to look up.
+        chunk_size (int): Maximum ids per chunk.
+    Returns:
+        list of list of str: The chunks of item ids.
+    """
+    unique_ids = list(dict.fromkeys(str(item_id).strip() for item_id in item_ids if str(item_id).strip()))
+    return [unique_ids[i:i + chunk_size] for i in range(0, len(unique_ids), chunk_size)]
+
+
+def merge_lookup_responses(requested_ids: list[str], response_texts: list[str]) -> dict:
+    """
+    Merge raw `items` lookup responses into one de-duplicated result.
+
+    Parameters:
+        requested_ids (list of str): Every item id that was requested.
+        response_texts (list of str): Raw response text of each chunk request.
+    Returns:
+        dict: {'items': [...], 'missing_ids': [...]} with items in request order and
+            the requested ids that no response contained.
+    """
+    items_by_id = {}
+    for response_text in response_texts:
+        try:
+            response_json = json.loads(response_text) if response_text else {}
+        except json.JSONDecodeError:
+            continue
+        for item in response_json.get('items', []):
+            item_id = str(item.get('itemId'))
+            if item_id not in items_by_id:
+                items_by_id[item_id] = item
+    return {
+        'items': [items_by_id[item_id] for item_id in requested_ids if item_id in items_by_id],
+        'missing_ids': [item_id for item_id in requested_ids if item_id not in items_by_id],
+    }
+
+
+class WalmartAPIBase:
+    def __init__(self, consumer_id: str, key_version: str, key_file_path: str,
+                 signature_reuse_fraction: float = DEFAULT_SIGNATURE_REUSE_FRACTION,
+                 base_url: str = WALMART_AFFILIATE_API_BASE_URL, use_search_cache: bool = True,
+                 use_response_cache: bool = True, rate_limiter: RateLimiter = None, use_rate_limiter: bool = True,
+                 circuit_breaker: CircuitBreaker = None, use_circuit_breaker: bool = True,
+                 local_catalog: LocalCatalog = None, use_local_catalog: bool = True):
         """
-        Initialize the WalmartAPI instance with Walmart-specific credentials.
+        Initialize the Walmart API client with Walmart-specific credentials.
+
+        Request signing is delegated to a process-wide WalmartRequestSigner shared by
+        every instance with the same credentials. `signature_reuse_fraction` is the
+        portion of Walmart's timestamp validity window a signature is reused for.
+
+        Unless `use_search_cache` is False, search responses are cached in the
+        process-wide TTL+LRU search cache shared by every client. Unless
+        `use_response_cache` is False, search, lookup, store and taxonomy responses
+        are also kept in the persistent SQLite response cache, which survives restarts.
+
+        Unless `use_rate_limiter` is False, requests wait for admission from
+        `rate_limiter`, or the process-wide RateLimiter shared by every client.
+
+        Unless `use_circuit_breaker` is False, requests go through `circuit_breaker`,
+        or the process-wide CircuitBreaker, which stops sending them while Walmart
+        is failing or slow. Unless `use_local_catalog` is False, searches that
+        cannot be answered by Walmart or the caches are then served from
+        `local_catalog`, or the process-wide LocalCatalog snapshot if a mirror of
+        Walmart items is configured (see utils.local_catalog).
         """
+        self.base_url = base_url.rstrip("/")
+        self.search_cache = search_cache if use_search_cache else None
+        self.response_cache = get_shared_response_cache() if use_response_cache else None
+        self._rate_limiter = rate_limiter
+        self.use_rate_limiter = use_rate_limiter
+        self._circuit_breaker = circuit_breaker
+        self.use_circuit_breaker = use_circuit_breaker
+        self._local_catalog = local_catalog
+        self.use_local_catalog = use_local_catalog
         self.consumer_id = consumer_id
         self.key_version = key_version
         self.key_file_path = key_file_path
+        self.signer = get_shared_signer(consumer_id, key_version, key_file_path,
+                                        reuse_fraction=signature_reuse_fraction)
 
     def generate_walmart_request_headers(self) -> dict:
         """
         Generate Walmart API headers with a timestamp and signature.
 
-        Reads the private key from the file specified in the instance,
-        constructs a canonicalized string from header values, signs it using
-        SHA256 with RSA (PKCS1v15 padding), and returns a dictionary
-        containing all the required headers.
+        The private key is parsed once and cached by the signer, and a signed
+        header set is reused while it is inside the signer's reuse window.
         """
-        # Get current timestamp in milliseconds
-        timestamp = str(int(time.time() * 1000))
+        return self.signer.get_headers()
+
+    def get_signing_stats(self) -> dict:
+        """Return key load, signature and header reuse counters for this instance's signer."""
+        return self.signer.get_stats()
+
+    def get_search_cache_stats(self) -> dict:
+        """Return hit, miss and eviction counters for the shared search cache."""
+        return self.search_cache.get_stats() if self.search_cache is not None else {}
+
+    def get_response_cache_stats(self) -> dict:
+        """Return hit, miss, revalidation and size counters for the persistent response cache."""
+        return self.response_cache.get_stats() if self.response_cache is not None else {}
+
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        if not self.use_rate_limiter:
+            return None
+        return self._rate_limiter if self._rate_limiter is not None else get_shared_rate_limiter()
+
+    def get_single_flight_stats(self) -> dict:
+        """Return how many searches were sent upstream and how many were coalesced onto one in flight."""
+        return self.search_single_flight.get_stats()
+
+    def get_rate_limiter_stats(self) -> dict:
+        """Return the token bucket, concurrency limit and queue state of the rate limiter."""
+        return self.rate_limiter.get_stats() if self.rate_limiter is not None else {}
+
+    @property
+    def circuit_breaker(self) -> CircuitBreaker:
+        if not self.use_circuit_breaker:
+            return None
+        return self._circuit_breaker if self._circuit_breaker is not None else get_shared_circuit_breaker()
+
+    def get_circuit_breaker_stats(self) -> dict:
+        """Return the state and recent failure and slow call rates of the circuit breaker."""
+        return self.circuit_breaker.get_stats() if self.circuit_breaker is not None else {}
+
+    @property
+    def local_catalog(self) -> LocalCatalog:
+        if not self.use_local_catalog:
+            return None
+        return self._local_catalog if self._local_catalog is not None else get_shared_local_catalog()
+
+    def search_local_catalog(self, params: dict) -> str:
+        """Answer search `params` from the local catalog, or return "" if there is none."""
+        local_catalog = self.local_catalog
+        if local_catalog is None:
+            return ""
+        return local_catalog.search_response_text(params)
 
-        # Load the private key from the instance's file path
-        try:
-            with open(self.key_file_path, "rb") as key_file:
-                key_data = key_file.read()
-        except IOError as e:
-            raise RuntimeError(f"Error reading the private key file: {e}")
+    @staticmethod
+    def _record_response(permit, response):
+        """Report a response's status, and its Retry-After header if throttled, to the rate limiter."""
+        retry_after = response.headers.get("Retry-After") if response.status_code == THROTTLED_STATUS_CODE else None
+        permit.record(response.status_code, retry_after)
 
-        try:
-            private_key = serialization.load_pem_private_key(key_data, password=None)
-        except Exception as e:
-            raise RuntimeError(f"Error loading private key: {e}")
-
-        # Create base headers using instance attributes
-        headers = {
-            "WM_CONSUMER.ID": self.consumer_id,
-            "WM_CONSUMER.INTIMESTAMP": timestamp,
-            "WM_SEC.KEY_VERSION": self.key_version,
-        }
-
-        # Build canonicalized string: sorted keys, trimmed values, each ended with a newline.
-        canonicalized_str = ""
-        for key in sorted(headers.keys()):
-            canonicalized_str += headers[key].strip() + "\n"
-
-        # Sign the canonicalized string with RSA using SHA256
-        try:
-            signature_bytes = private_key.sign(
-                canonicalized_str.encode("utf-8"),
-                padding.PKCS1v15(),
-                hashes.SHA256()
-            )
-        except Exception as e:
-            raise RuntimeError(f"Error generating signature: {e}")
+    @staticmethod
+    def build_search_params(search_term: str, category_id: str = None, store_id: str = None,
+                            num_items: int = None, start: int = None) -> dict:
+        """Build the query parameters for the `search` endpoint, leaving out defaults."""
+        params = {"query": search_term}
+        if category_id:
+            params["categoryId"] = category_id
+        if store_id:
+            params["storeId"] = store_id
+        if num_items:
+            params["numItems"] = min(int(num_items), WALMART_SEARCH_MAX_NUM_ITEMS)
+        if start and int(start) > 1:
+            params["start"] = int(start)
+        return params
+
+    @staticmethod
+    def build_lookup_params(itemIds, storeId: int = None, zipCode: str = None) -> dict:
+        """Build the query parameters for the `items` endpoint from one id or a list of ids."""
+        if isinstance(itemIds, (list, tuple)):
+            itemIds = ",".join(str(item_id) for item_id in itemIds)
+        params = {"ids": itemIds}
+        if storeId:
+            params["storeId"] = storeId
+        elif zipCode:
+            params["zipCode"] = zipCode
+        return params
+
+    def _read_cached_response(self, cache_key, memory_cache=None):
+        """
+        Look a response up in `memory_cache` (if given), then in the persistent response cache.
+
+        Returns:
+            tuple: (response text or None, whether the text is stale and should be refreshed).
+        """
+        if memory_cache is not None:
+            cached_response_text = memory_cache.get(cache_key)
+            if cached_response_text is not None:
+                return cached_response_text, False
+        if self.response_cache is not None:
+            return self._read_persistent_response(cache_key, memory_cache)
+        return None, False
+
+    def _read_persistent_response(self, cache_key, memory_cache=None):
+        """Look a response up in the persistent response cache, copying fresh hits into `memory_cache`."""
+        cached_response = self.response_cache.get(cache_key)
+        if cached_response is None:
+            return None, False
+        if not cached_response.is_stale and memory_cache is not None:
+            memory_cache.set(cache_key, cached_response.value)
+        return cached_response.value, cached_response.is_stale
+
+    def _store_response(self, cache_key, kind: str, response, memory_cache=None):
+        """Cache a successful response in `memory_cache` (if given) and the persistent response cache."""
+        if (memory_cache is None and self.response_cache is None) or response.status_code != 200:
+            return
+        if memory_cache is not None:
+            memory_cache.set(cache_key, response.text)
+        if self.response_cache is not None:
+            self.response_cache.set(cache_key, kind, response.text)
+
+    @staticmethod
+    def generate_walmart_cart_url(items: list[dict]) -> str:
+        """
+        Generate a Walmart shopping cart URL by concatenating item IDs and quantities.
+
+        Parameters:
+            items (list of dict): Each dict should have 'item_id' and 'quantity' keys.
+        Returns:
+            str: URL for adding items to the Walmart cart.
+        """
+        items_parameter = "items="
+        for item in items:
+            itemId = item.get('itemId')
+            items_parameter += f"{itemId}"
+            item_quantity = int(item.get('quantity'))
+            if item_quantity < 1:
+                # Skip the item if its quantity is less than one
+                warnings.warn(f"Skipping item {itemId} with {item_quantity} quantity", RuntimeWarning)
+                continue
+            elif item_quantity != 1:
+                # Include quantity in the URL if it exists and is not "1"
+                items_parameter += f"_{item_quantity}"
+            items_parameter += ","
+        items_parameter = items_parameter.rstrip(',')
+        return f"https://affil.walmart.com/cart/addToCart?{items_parameter}"
 
-        # Base64-encode the signature and add it to the headers
-        signature_base64 = base64.b64encode(signature_bytes).decode("ascii")
-        headers["WM_SEC.AUTH_SIGNATURE"] = signature_base64
 
-        return headers
+class WalmartAPI(WalmartAPIBase):
+    def __init__(self, consumer_id: str, key_version: str, key_file_path: str,
+                 signature_reuse_fraction: float = DEFAULT_SIGNATURE_REUSE_FRACTION,
+                 transport: HTTPTransport = None, base_url: str = WALMART_AFFILIATE_API_BASE_URL,
+                 use_search_cache: bool = True, use_response_cache: bool = True,
+                 rate_limiter: RateLimiter = None, use_rate_limiter: bool = True,
+                 circuit_breaker: CircuitBreaker = None, use_circuit_breaker: bool = True,
+                 local_catalog: LocalCatalog = None, use_local_catalog: bool = True):
+        """
+        Initialize the WalmartAPI instance with Walmart-specific credentials.
+
+        Requests go through `transport`, or the process-wide pooled HTTPTransport
+        if none is given, so all instances share keep-alive connections.
+        """
+        super().__init__(consumer_id, key_version, key_file_path, signature_reuse_fraction=signature_reuse_fraction,
+                         base_url=base_url, use_search_cache=use_search_cache,
+                         use_response_cache=use_response_cache, rate_limiter=rate_limiter,
+                         use_rate_limiter=use_rate_limiter, circuit_breaker=circuit_breaker,
+                         use_circuit_breaker=use_circuit_breaker, local_catalog=local_catalog,
+                         use_local_catalog=use_local_catalog)
+        self._transport = transport
+        self.search_single_flight = search_single_flight
+
+    @property
+    def transport(self) -> HTTPTransport:
+        return self._transport if self._transport is not None else get_shared_transport()
+
+    def get_transport_stats(self) -> dict:
+        """Return request counters and connection pool utilization for this instance's transport."""
+        return self.transport.get_stats()
 
     @staticmethod
     def with_walmart_headers(method):
@@ -109,117 +343,563 @@ class WalmartAPI:
 
         return wrapper
 
-    @with_walmart_headers
-    def get_walmart_taxonomy(self, *, headers: dict) -> str:
+    def _cached_request(self, cache_key, kind: str, send_request, memory_cache=None, fallback=None) -> str:
         """
-        Fetch taxonomy information from the Walmart API.
+        Serve a response from the caches, or call `send_request()` and cache what it returns.
 
-        The decorator automatically adds the required headers.
-
-        Returns:
-            str: Raw response text from the API.
+        A stale persistent entry is returned immediately and refreshed on a
+        background thread, so callers never wait on revalidation. If the request
+        fails, is refused by the circuit breaker or gets a server error, the
+        uncached result of `fallback()` is returned instead, or "" without a fallback.
         """
-        url = "https://developer.api.walmart.com/api-proxy/service/affil/product/v2/taxonomy"
+        cached_response_text, is_stale = self._read_cached_response(cache_key, memory_cache)
+        if cached_response_text is not None:
+            if is_stale and self.response_cache.begin_revalidation(cache_key):
+                _background_executor.submit(self._revalidate, cache_key, kind, send_request, memory_cache)
+            return cached_response_text
         try:
-            response = requests.get(url, headers=headers)
-            return response.text
+            response = self._send_request(send_request)
+        except CircuitOpenError:
+            return fallback() if fallback is not None else ""
         except requests.RequestException as error:
             print("An error occurred during the request:", error)
-            return ""
+            return fallback() if fallback is not None else ""
+        if response.status_code >= 500 and fallback is not None:
+            return fallback()
+        self._store_response(cache_key, kind, response, memory_cache)
+        return response.text
+
+    def _send_request(self, send_request) -> requests.Response:
+        """
+        Call `send_request()` once the circuit breaker and rate limiter admit it, re-queueing it if Walmart answers 429.
+
+        Raises CircuitOpenError without sending anything while the circuit breaker is open.
+        """
+        circuit_breaker = self.circuit_breaker
+        if circuit_breaker is not None and not circuit_breaker.allow_request():
+            raise CircuitOpenError("Walmart API circuit breaker is open")
+        try:
+            response, latency = self._send_rate_limited_request(send_request)
+        except requests.RequestException:
+            if circuit_breaker is not None:
+                circuit_breaker.record_failure()
+            raise
+        except BaseException:
+            if circuit_breaker is not None:
+                circuit_breaker.release()
+            raise
+        if circuit_breaker is not None:
+            circuit_breaker.record_response(response.status_code, latency)
+        return response
+
+    def _send_rate_limited_request(self, send_request) -> tuple:
+        """Return the response and how long its last attempt took, in seconds, excluding time queued for admission."""
+        rate_limiter = self.rate_limiter
+        for _ in range(WALMART_THROTTLE_RETRIES + 1):
+            if rate_limiter is None:
+                sent_at = time.monotonic()
+                return send_request(), time.monotonic() - sent_at
+            with rate_limiter.limit() as permit:
+                sent_at = time.monotonic()
+                response = send_request()
+                latency = time.monotonic() - sent_at
+                self._record_response(permit, response)
+            if not permit.throttled:
+                break
+        return response, latency
+
+    def _revalidate(self, cache_key, kind: str, send_request, memory_cache=None):
+        try:
+            self._store_response(cache_key, kind, self._send_request(send_request), memory_cache)
+        except CircuitOpenError:
+            pass
+        except requests.RequestException as error:
+            print("An error occurred while refreshing a cached response:", error)
+        finally:
+            self.response_cache.end_revalidation(cache_key)
+
+    def get_walmart_taxonomy(self) -> str:
+        """
+        Fetch taxonomy information from the Walmart API.
+
+        Returns:
+            str: Raw response text from the API.
+        """
+        return self._cached_request(("taxonomy",), "taxonomy", self._request_walmart_taxonomy)
 
     @with_walmart_headers
-    def get_walmart_search_results(self, search_term: str, *, headers: dict) -> str:
+    def _request_walmart_taxonomy(self, *, headers: dict) -> requests.Response:
+        """Send a taxonomy request. The decorator automatically provides the headers."""
+        url = f"{self.base_url}/taxonomy"
+        return self.transport.get(url, headers=headers)
+
+    def get_taxonomy_index(self) -> TaxonomyIndex:
+        """
+        Return the local taxonomy index, downloading and persisting the taxonomy on first use.
+
+        Returns:
+            TaxonomyIndex or None: None if the taxonomy could not be downloaded.
+        """
+        taxonomy_index = get_shared_taxonomy_index()
+        if taxonomy_index is None and taxonomy_download_due():
+            taxonomy_text = self.search_single_flight.do(("taxonomy",), self.get_walmart_taxonomy)
+            taxonomy_index = get_shared_taxonomy_index() or build_shared_taxonomy_index(taxonomy_text)
+        return taxonomy_index
+
+    def get_nearest_store(self, zip_code: str) -> dict:
+        """
+        Resolve a zip code to its nearest store through the shared zip code -> store index.
+
+        Parameters:
+            zip_code (str): A US zip code.
+        Returns:
+            dict or None: {'storeId', 'name', 'zip'}, or None if the zip code is invalid or has no store.
+        """
+        zip_code = normalize_zip_code(zip_code)
+        if zip_code is None:
+            return None
+        store = store_index.get(zip_code)
+        if store is None:
+            store = parse_nearest_store(self.get_stores_nearby(zip_code))
+            if store is not None:
+                store_index.set(zip_code, store)
+        return store
+
+    def get_walmart_search_results(self, search_term: str, category_id: str = None, store_id: str = None,
+                                   num_items: int = None, start: int = None) -> str:
         """
         Search for products using the Walmart API.
 
-        The decorator automatically provides the headers.
+        Equivalent queries (see utils.search_cache.normalize_query) answered
+        recently are served from the shared search cache without a request, and
+        concurrent equivalent queries share a single upstream request.
+
         Parameters:
             search_term (str): The query string.
+            category_id (str): Restrict results to this taxonomy category (see get_taxonomy_index).
+            store_id (str): Report stock at this store (see get_nearest_store). Results are cached per store.
+            num_items (int): Page size, up to WALMART_SEARCH_MAX_NUM_ITEMS. Defaults to the API's 10.
+            start (int): 1-based index of the first result to return.
         Returns:
-            str: Raw response text from the API.
+            str: Raw response text from the API or, while it is unavailable, a response
+                built from the local catalog (marked with "source": "local_catalog").
         """
-        url = f"https://developer.api.walmart.com/api-proxy/service/affil/product/v2/search?query={search_term}"
-        try:
-            response = requests.get(url, headers=headers)
-            return response.text
-        except requests.RequestException as error:
-            print("An error occurred during the request:", error)
-            return ""
+        params = self.build_search_params(search_term, category_id, store_id, num_items, start)
+        cache_key = search_cache_key(search_term, **{name: value for name, value in params.items() if name != "query"})
+        return self.search_single_flight.do(cache_key, lambda: self._cached_request(
+            cache_key, "search", lambda: self._request_walmart_search_results(params),
+            memory_cache=self.search_cache, fallback=lambda: self.search_local_catalog(params)
+        ))
+
+    def search_products(self, search_term: str, category_id: str = None, zip_code: str = None,
+                        available_only: bool = True, num_items: int = None,
+                        start: int = None) -> list[ProductRecord]:
+        """
+        Search for products and decode only the fields callers use into ProductRecords.
+
+        Parameters:
+            search_term (str): The query string.
+            category_id (str): Restrict results to this taxonomy category.
+            zip_code (str): Report stock at the store nearest this zip code, if one is found.
+            available_only (bool): Drop items that are out of stock or not sold in stores.
+            num_items (int): Page size to request.
+            start (int): 1-based index of the first result to request.
+        Returns:
+            list of ProductRecord: The matching products in relevance order.
+        """
+        store = self.get_nearest_store(zip_code) if zip_code else None
+        response_text = self.get_walmart_search_results(search_term, category_id=category_id,
+                                                    store_id=store["storeId"] if store else None,
+                                                    num_items=num_items, start=start)
+        return parse_search_response(response_text, available_only=available_only)
 
     @with_walmart_headers
-    def get_stores_nearby(self, zip_code: str, *, headers: dict) -> str:
+    def _request_walmart_search_results(self, params: dict, *, headers: dict) -> requests.Response:
+        """Send a product search request. The decorator automatically provides the headers."""
+        url = f"{self.base_url}/search"
+        return self.transport.get(url, headers=headers, params=params)
+
+    def get_stores_nearby(self, zip_code: str) -> str:
         """
         Fetch nearby store information using the Walmart API.
 
-        The decorator automatically provides the headers.
-
         Parameters:
             zip_code (str): The postal code to search near.
         Returns:
             str: Raw response text from the API.
         """
-        url = f"https://developer.api.walmart.com/api-proxy/service/affil/product/v2/stores?zip={zip_code}"
-        try:
-            response = requests.get(url, headers=headers)
-            return response.text
-        except requests.RequestException as error:
-            print("An error occurred during the request:", error)
-            return ""
+        return self._cached_request(("stores", str(zip_code)), "stores",
+                                    lambda: self._request_stores_nearby(zip_code))
 
     @with_walmart_headers
-    def lookup_walmart_product(self, itemId: int, storeId: int = None, zipCode: str = None, *, headers: dict):
+    def _request_stores_nearby(self, zip_code: str, *, headers: dict) -> requests.Response:
+        """Send a store locator request. The decorator automatically provides the headers."""
+        url = f"{self.base_url}/stores"
+        return self.transport.get(url, headers=headers, params={"zip": zip_code})
+
+    def lookup_walmart_product(self, itemId: int, storeId: int = None, zipCode: str = None) -> str:
         """
         Lookup Walmart product details using the Walmart API.
 
-        The decorator automatically provides the headers.
-
         Parameters:
-            itemId (int): Product IDs to lookup.
+            itemId (int or list): Product ID, or a list of up to WALMART_LOOKUP_MAX_IDS IDs, to lookup.
             storeId (int): Store ID for the lookup.
             zipCode (str): Zip code for the lookup.
         Returns:
             str: Raw response text from the API.
         """
-        if storeId:
-            url = f"https://developer.api.walmart.com/api-proxy/service/affil/product/v2/items?ids={itemId}&storeId={storeId}"
-        elif zipCode:
-            url = f"https://developer.api.walmart.com/api-proxy/service/affil/product/v2/items?ids={itemId}&zipCode={zipCode}"
+        params = self.build_lookup_params(itemId, storeId=storeId, zipCode=zipCode)
+        cache_key = ("lookup",) + tuple(sorted((name, str(value)) for name, value in params.items()))
+        return self._cached_request(cache_key, "lookup", lambda: self._request_walmart_product_lookup(params))
+
+    @with_walmart_headers
+    def _request_walmart_product_lookup(self, params: dict, *, headers: dict) -> requests.Response:
+        """Send a product lookup request. The decorator automatically provides the headers."""
+        url = f"{self.base_url}/items"
+        print("Requesting URL:", url, params)
+        return self.transport.get(url, headers=headers, params=params)
+
+    def lookup_walmart_products(self, itemIds, storeId: int = None, zipCode: str = None, max_workers: int = 8) -> dict:
+        """
+        Lookup any number of Walmart products with as few requests as possible.
+
+        Ids are de-duplicated and split into chunks of WALMART_LOOKUP_MAX_IDS, and the
+        chunks are requested concurrently over the shared connection pool.
+
+        Parameters:
+            itemIds (iterable of int or str): Product IDs to lookup.
+            storeId (int): Store ID for the lookup.
+            zipCode (str): Zip code for the lookup.
+            max_workers (int): Maximum chunk requests in flight at once.
+        Returns:
+            dict: {'items': [...], 'missing_ids': [...]} with items in request order.
+        """
+        chunks = chunk_item_ids(itemIds)
+        if not chunks:
+            return {'items': [], 'missing_ids': []}
+        if len(chunks) == 1:
+            response_texts = [self.lookup_walmart_product(chunks[0], storeId=storeId, zipCode=zipCode)]
         else:
-            url = f"https://developer.api.walmart.com/api-proxy/service/affil/product/v2/items?ids={itemId}"
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+                response_texts = list(executor.map(
+                    lambda chunk: self.lookup_walmart_product(chunk, storeId=storeId, zipCode=zipCode), chunks
+                ))
+        return merge_lookup_responses([item_id for chunk in chunks for item_id in chunk], response_texts)
+
+
+class AsyncWalmartAPI(WalmartAPIBase):
+    def __init__(self, consumer_id: str, key_version: str, key_file_path: str,
+                 signature_reuse_fraction: float = DEFAULT_SIGNATURE_REUSE_FRACTION,
+                 transport: AsyncHTTPTransport = None, base_url: str = WALMART_AFFILIATE_API_BASE_URL,
+                 use_search_cache: bool = True, use_response_cache: bool = True,
+                 rate_limiter: RateLimiter = None, use_rate_limiter: bool = True,
+                 circuit_breaker: CircuitBreaker = None, use_circuit_breaker: bool = True,
+                 local_catalog: LocalCatalog = None, use_local_catalog: bool = True):
+        """
+        Initialize an asyncio-native Walmart API client.
+
+        Offers the same search, lookup, store and taxonomy methods as WalmartAPI as
+        coroutines. Requests are sent through `transport`, or the process-wide
+        AsyncHTTPTransport (httpx.AsyncClient, HTTP/2 when available), so in-flight
+        searches hold a socket rather than an executor thread.
+        """
+        super().__init__(consumer_id, key_version, key_file_path, signature_reuse_fraction=signature_reuse_fraction,
+                         base_url=base_url, use_search_cache=use_search_cache,
+                         use_response_cache=use_response_cache, rate_limiter=rate_limiter,
+                         use_rate_limiter=use_rate_limiter, circuit_breaker=circuit_breaker,
+                         use_circuit_breaker=use_circuit_breaker, local_catalog=local_catalog,
+                         use_local_catalog=use_local_catalog)
+        self._transport = transport
+        self._background_tasks = set()
+        self.search_single_flight = async_search_single_flight
+
+    @property
+    def transport(self) -> AsyncHTTPTransport:
+        return self._transport if self._transport is not None else get_shared_async_transport()
+
+    def get_transport_stats(self) -> dict:
+        """Return request counters and connection pool utilization for this instance's transport."""
+        return self.transport.get_stats()
+
+    @staticmethod
+    def with_walmart_headers(method):
+        """
+        Decorator that automatically injects Walmart request headers into
+        the decorated instance method as a keyword argument 'headers'.
+        """
+
+        async def wrapper(self, *args, **kwargs):
+            headers = self.generate_walmart_request_headers()
+            return await method(self, *args, headers=headers, **kwargs)
+
+        return wrapper
+
+    async def _read_cached_response(self, cache_key, memory_cache=None):
+        """
+        Look a response up in `memory_cache` (if given), then in the persistent response cache on a worker thread.
+
+        SQLite may wait on the disk or on another process's lock, which would stall every request on the event loop.
+
+        Returns:
+            tuple: (response text or None, whether the text is stale and should be refreshed).
+        """
+        if memory_cache is not None:
+            cached_response_text = memory_cache.get(cache_key)
+            if cached_response_text is not None:
+                return cached_response_text, False
+        if self.response_cache is not None:
+            return await asyncio.to_thread(self._read_persistent_response, cache_key, memory_cache)
+        return None, False
+
+    async def _store_response(self, cache_key, kind: str, response, memory_cache=None):
+        """Cache a successful response in `memory_cache` (if given) and, on a worker thread, the persistent cache."""
+        if response.status_code != 200:
+            return
+        if memory_cache is not None:
+            memory_cache.set(cache_key, response.text)
+        if self.response_cache is not None:
+            await asyncio.to_thread(self.response_cache.set, cache_key, kind, response.text)
+
+    async def _cached_request(self, cache_key, kind: str, send_request, memory_cache=None, fallback=None) -> str:
+        """
+        Serve a response from the caches, or await `send_request()` and cache what it returns.
+
+        A stale persistent entry is returned immediately and refreshed in a
+        background task, so callers never wait on revalidation. If the request
+        fails, is refused by the circuit breaker or gets a server error, the
+        uncached result of `fallback()` is returned instead, or "" without a fallback.
+        """
+        cached_response_text, is_stale = await self._read_cached_response(cache_key, memory_cache)
+        if cached_response_text is not None:
+            if is_stale and self.response_cache.begin_revalidation(cache_key):
+                revalidation_task = asyncio.create_task(self._revalidate(cache_key, kind, send_request, memory_cache))
+                # Hold a reference so the task is not garbage collected before it finishes.
+                self._background_tasks.add(revalidation_task)
+                revalidation_task.add_done_callback(self._background_tasks.discard)
+            return cached_response_text
         try:
-            print("Requesting URL:", url)
-            response = requests.get(url, headers=headers)
-            return response.text
-        except requests.RequestException as error:
+            response = await self._send_request(send_request)
+        except CircuitOpenError:
+            return fallback() if fallback is not None else ""
+        except httpx.HTTPError as error:
             print("An error occurred during the request:", error)
-            return ""
+            return fallback() if fallback is not None else ""
+        if response.status_code >= 500 and fallback is not None:
+            return fallback()
+        await self._store_response(cache_key, kind, response, memory_cache)
+        return response.text
 
+    async def _send_request(self, send_request) -> httpx.Response:
+        """
+        Await `send_request()` once the circuit breaker and rate limiter admit it, re-queueing it if Walmart answers 429.
 
-    @staticmethod
-    def generate_walmart_cart_url(items: list[dict]) -> str:
+        Raises CircuitOpenError without sending anything while the circuit breaker is open.
         """
-        Generate a Walmart shopping cart URL by concatenating item IDs and quantities.
+        circuit_breaker = self.circuit_breaker
+        if circuit_breaker is not None and not circuit_breaker.allow_request():
+            raise CircuitOpenError("Walmart API circuit breaker is open")
+        try:
+            response, latency = await self._send_rate_limited_request(send_request)
+        except httpx.HTTPError:
+            if circuit_breaker is not None:
+                circuit_breaker.record_failure()
+            raise
+        except BaseException:
+            if circuit_breaker is not None:
+                circuit_breaker.release()
+            raise
+        if circuit_breaker is not None:
+            circuit_breaker.record_response(response.status_code, latency)
+        return response
+
+    async def _send_rate_limited_request(self, send_request) -> tuple:
+        """Return the response and how long its last attempt took, in seconds, excluding time queued for admission."""
+        rate_limiter = self.rate_limiter
+        for _ in range(WALMART_THROTTLE_RETRIES + 1):
+            if rate_limiter is None:
+                sent_at = time.monotonic()
+                return await send_request(), time.monotonic() - sent_at
+            async with rate_limiter.limit_async() as permit:
+                sent_at = time.monotonic()
+                response = await send_request()
+                latency = time.monotonic() - sent_at
+                self._record_response(permit, response)
+            if not permit.throttled:
+                break
+        return response, latency
+
+    async def _revalidate(self, cache_key, kind: str, send_request, memory_cache=None):
+        try:
+            await self._store_response(cache_key, kind, await self._send_request(send_request), memory_cache)
+        except CircuitOpenError:
+            pass
+        except httpx.HTTPError as error:
+            print("An error occurred while refreshing a cached response:", error)
+        finally:
+            self.response_cache.end_revalidation(cache_key)
+
+    async def get_walmart_taxonomy(self) -> str:
+        """
+        Fetch taxonomy information from the Walmart API without blocking the event loop.
+
+        Returns:
+            str: Raw response text from the API.
+        """
+        return await self._cached_request(("taxonomy",), "taxonomy", self._request_walmart_taxonomy)
+
+    @with_walmart_headers
+    async def _request_walmart_taxonomy(self, *, headers: dict) -> httpx.Response:
+        """Send a taxonomy request. The decorator automatically provides the headers."""
+        url = f"{self.base_url}/taxonomy"
+        return await self.transport.get(url, headers=headers)
+
+    async def get_taxonomy_index(self) -> TaxonomyIndex:
+        """
+        Return the local taxonomy index, downloading and persisting the taxonomy on first use.
+
+        Returns:
+            TaxonomyIndex or None: None if the taxonomy could not be downloaded.
+        """
+        taxonomy_index = get_shared_taxonomy_index()
+        if taxonomy_index is None and taxonomy_download_due():
+            taxonomy_text = await self.search_single_flight.do(("taxonomy",), self.get_walmart_taxonomy)
+            taxonomy_index = get_shared_taxonomy_index() or build_shared_taxonomy_index(taxonomy_text)
+        return taxonomy_index
+
+    async def get_nearest_store(self, zip_code: str) -> dict:
+        """
+        Resolve a zip code to its nearest store through the shared zip code -> store index.
 
         Parameters:
-            items (list of dict): Each dict should have 'item_id' and 'quantity' keys.
+            zip_code (str): A US zip code.
         Returns:
-            str: URL for adding items to the Walmart cart.
+            dict or None: {'storeId', 'name', 'zip'}, or None if the zip code is invalid or has no store.
         """
-        items_parameter = "items="
-        for item in items:
-            itemId = item.get('itemId')
-            items_parameter += f"{itemId}"
-            item_quantity = int(item.get('quantity'))
-            if item_quantity < 1:
-                # Skip the item if its quantity is less than one
-                warnings.warn(f"Skipping item {itemId} with {item_quantity} quantity", RuntimeWarning)
-                continue
-            elif item_quantity != 1:
-                # Include quantity in the URL if it exists and is not "1"
-                items_parameter += f"_{item_quantity}"
-            items_parameter += ","
-        items_parameter = items_parameter.rstrip(',')
-        return f"https://affil.walmart.com/cart/addToCart?{items_parameter}"
+        zip_code = normalize_zip_code(zip_code)
+        if zip_code is None:
+            return None
+        store = store_index.get(zip_code)
+        if store is None:
+            store = parse_nearest_store(await self.get_stores_nearby(zip_code))
+            if store is not None:
+                store_index.set(zip_code, store)
+        return store
+
+    async def get_walmart_search_results(self, search_term: str, category_id: str = None, store_id: str = None,
+                                         num_items: int = None, start: int = None) -> str:
+        """
+        Search for products using the Walmart API without blocking the event loop.
+
+        Equivalent queries (see utils.search_cache.normalize_query) answered
+        recently are served from the shared search cache without a request, and
+        concurrent equivalent queries on the same event loop share a single upstream request.
+
+        Parameters:
+            search_term (str): The query string.
+            category_id (str): Restrict results to this taxonomy category (see get_taxonomy_index).
+            store_id (str): Report stock at this store (see get_nearest_store). Results are cached per store.
+            num_items (int): Page size, up to WALMART_SEARCH_MAX_NUM_ITEMS. Defaults to the API's 10.
+            start (int): 1-based index of the first result to return.
+        Returns:
+            str: Raw response text from the API or, while it is unavailable, a response
+                built from the local catalog (marked with "source": "local_catalog").
+        """
+        params = self.build_search_params(search_term, category_id, store_id, num_items, start)
+        cache_key = search_cache_key(search_term, **{name: value for name, value in params.items() if name != "query"})
+        return await self.search_single_flight.do(cache_key, lambda: self._cached_request(
+            cache_key, "search", lambda: self._request_walmart_search_results(params),
+            memory_cache=self.search_cache, fallback=lambda: self.search_local_catalog(params)
+        ))
+
+    async def search_products(self, search_term: str, category_id: str = None, zip_code: str = None,
+                              available_only: bool = True, num_items: int = None,
+                              start: int = None) -> list[ProductRecord]:
+        """
+        Search for products and decode only the fields callers use into ProductRecords.
+
+        Parameters:
+            search_term (str): The query string.
+            category_id (str): Restrict results to this taxonomy category.
+            zip_code (str): Report stock at the store nearest this zip code, if one is found.
+            available_only (bool): Drop items that are out of stock or not sold in stores.
+            num_items (int): Page size to request.
+            start (int): 1-based index of the first result to request.
+        Returns:
+            list of ProductRecord: The matching products in relevance order.
+        """
+        store = await self.get_nearest_store(zip_code) if zip_code else None
+        response_text = await self.get_walmart_search_results(search_term, category_id=category_id,
+                                                          store_id=store["storeId"] if store else None,
+                                                          num_items=num_items, start=start)
+        return parse_search_response(response_text, available_only=available_only)
+
+    @with_walmart_headers
+    async def _request_walmart_search_results(self, params: dict, *, headers: dict) -> httpx.Response:
+        """Send a product search request. The decorator automatically provides the headers."""
+        url = f"{self.base_url}/search"
+        return await self.transport.get(url, headers=headers, params=params)
+
+    async def get_stores_nearby(self, zip_code: str) -> str:
+        """
+        Fetch nearby store information using the Walmart API without blocking the event loop.
+
+        Parameters:
+            zip_code (str): The postal code to search near.
+        Returns:
+            str: Raw response text from the API.
+        """
+        return await self._cached_request(("stores", str(zip_code)), "stores",
+                                          lambda: self._request_stores_nearby(zip_code))
+
+    @with_walmart_headers
+    async def _request_stores_nearby(self, zip_code: str, *, headers: dict) -> httpx.Response:
+        """Send a store locator request. The decorator automatically provides the headers."""
+        url = f"{self.base_url}/stores"
+        return await self.transport.get(url, headers=headers, params={"zip": zip_code})
+
+    async def lookup_walmart_product(self, itemId: int, storeId: int = None, zipCode: str = None) -> str:
+        """
+        Lookup Walmart product details using the Walmart API without blocking the event loop.
+
+        Parameters:
+            itemId (int or list): Product ID, or a list of up to WALMART_LOOKUP_MAX_IDS IDs, to lookup.
+            storeId (int): Store ID for the lookup.
+            zipCode (str): Zip code for the lookup.
+        Returns:
+            str: Raw response text from the API.
+        """
+        params = self.build_lookup_params(itemId, storeId=storeId, zipCode=zipCode)
+        cache_key = ("lookup",) + tuple(sorted((name, str(value)) for name, value in params.items()))
+        return await self._cached_request(cache_key, "lookup", lambda: self._request_walmart_product_lookup(params))
+
+    @with_walmart_headers
+    async def _request_walmart_product_lookup(self, params: dict, *, headers: dict) -> httpx.Response:
+        """Send a product lookup request. The decorator automatically provides the headers."""
+        url = f"{self.base_url}/items"
+        print("Requesting URL:", url, params)
+        return await self.transport.get(url, headers=headers, params=params)
+
+    async def lookup_walmart_products(self, itemIds, storeId: int = None, zipCode: str = None) -> dict:
+        """
+        Lookup any number of Walmart products with as few requests as possible.
+
+        Ids are de-duplicated, split into chunks of WALMART_LOOKUP_MAX_IDS and the
+        chunks are requested concurrently on the event loop.
+
+        Parameters:
+            itemIds (iterable of int or str): Product IDs to lookup.
+            storeId (int): Store ID for the lookup.
+            zipCode (str): Zip code for the lookup.
+        Returns:
+            dict: {'items': [...], 'missing_ids': [...]} with items in request order.
+        """
+        chunks = chunk_item_ids(itemIds)
+        if not chunks:
+            return {'items': [], 'missing_ids': []}
+        response_texts = await asyncio.gather(*(
+            self.lookup_walmart_product(chunk, storeId=storeId, zipCode=zipCode) for chunk in chunks
+        ))
+        return merge_lookup_responses([item_id for chunk in chunks for item_id in chunk], response_texts)
 
 
 # Example usages: